@@ -0,0 +1,46 @@
+"""Benchmark hierarchical agent names on deep trees.
+
+Compares the cached ``SnoutAgent.name``/``fullname`` against rebuilding the
+name up to the root on every access, as it was done before names were cached.
+
+Usage: python benchmarks/bench_agent_names.py [depth] [accesses]
+"""
+import sys
+import timeit
+
+from snout.api.agent import SnoutAgent
+
+
+def uncached_name(agent):
+    me = f'{agent.__module__}.{agent.__class__.__name__}'
+    if agent._nickname:
+        me += f'_{agent._nickname}'
+    if agent.parent is None:
+        return me
+    return '.'.join([uncached_name(agent.parent), me])
+
+
+def uncached_fullname(agent):
+    return f'{uncached_name(agent)}@{hex(id(agent))}'
+
+
+def chain(depth):
+    agent = SnoutAgent(name='n0')
+    for i in range(1, depth):
+        agent = SnoutAgent(name=f'n{i}', parent=agent)
+    return agent
+
+
+def main(depth=64, accesses=10000):
+    leaf = chain(depth)
+    assert leaf.fullname == uncached_fullname(leaf)
+    t_uncached = timeit.timeit(lambda: uncached_fullname(leaf), number=accesses)
+    t_cached = timeit.timeit(lambda: leaf.fullname, number=accesses)
+    print(f'depth={depth} accesses={accesses}')
+    print(f'uncached fullname: {t_uncached / accesses * 1e6:8.2f} us/access')
+    print(f'cached fullname:   {t_cached / accesses * 1e6:8.2f} us/access')
+    print(f'speedup:           {t_uncached / t_cached:8.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,57 @@
+"""Benchmark the import time of the snout.api modules.
+
+Runs ``python -X importtime`` for every module and reports the best cumulative
+import time, and the slowest modules imported along the way.
+
+Usage: python benchmarks/bench_importtime.py [runs] [module ...]
+"""
+import subprocess
+import sys
+
+MODULES = [
+    'snout.api',
+    'snout.api.status',
+    'snout.api.error',
+    'snout.api.agent',
+    'snout.api.cfg',
+    'snout.api.factory',
+    'snout.api.experiment',
+]
+
+
+def importtimes(module):
+    """Cumulative import times in microseconds of ``module`` and its direct imports."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines()[1:]:
+        _, _, cumulative, name = line.replace(':', '|', 1).split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == module:
+                times[module] = int(cumulative)
+                return times
+            times = {}
+        elif depth == 1:
+            times[name.strip()] = int(cumulative)
+    raise RuntimeError(f'{module} not found in the import time report')
+
+
+def main(runs=5, modules=MODULES):
+    for module in modules:
+        best = min((importtimes(module) for _ in range(runs)), key=lambda times: times[module])
+        top = sorted(
+            ((t, name) for name, t in best.items() if name != module),
+            reverse=True,
+        )[:5]
+        print(f'{module:24s} {best[module] / 1000:8.1f} ms')
+        for t, name in top:
+            print(f'    {name:20s} {t / 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5, sys.argv[2:] or MODULES)
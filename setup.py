@@ -40,6 +40,9 @@ if __name__ == '__main__':
         extras_require={'dev': ['pytest', 'pytest-pep8', 'pytest-cov']},
         dependency_links=links,
         entry_points={
+            'console_scripts': [
+                'snout-logs = snout.api.logcli:cli',
+            ],
             'snout_plugins': [
                 'apitest_ = snout.api.factory:Factory',
                 'apitest_fancy = snout.api.factory:Factory',
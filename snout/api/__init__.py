@@ -1,5 +1,33 @@
+import importlib
+import importlib.util
+
 __version__ = '0.1.6'
 
+# public names of the submodules, imported on first access (e.g. snout.api.SnoutAgent)
+_lazy_attributes = {
+    'Status': 'snout.api.status',
+    'SnoutAgent': 'snout.api.agent',
+    'Config': 'snout.api.cfg',
+    'Settings': 'snout.api.cfg',
+    'Snoutfile': 'snout.api.cfg',
+    'Factory': 'snout.api.factory',
+    'EventSystem': 'snout.api.event',
+    'EventListener': 'snout.api.event',
+    'Logger': 'snout.api.log',
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_attributes))
+
 
 class classproperty(object):
     def __init__(self, f):
@@ -7,3 +35,33 @@ class classproperty(object):
 
     def __get__(self, obj, owner):
         return self.f(owner)
+
+
+class lazymodule(object):
+    """A module that is only imported on first attribute access.
+
+    Heavy dependencies are bound at module level with ``zmq = lazymodule('zmq')``
+    and used as usual; attributes are cached after the first access.
+
+    Args:
+        name (str): Absolute name of the module.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_lazymodule_name'] = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._lazymodule_name), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        return f'<lazymodule {self._lazymodule_name!r}>'
+
+    @classmethod
+    def optional(cls, name):
+        """A lazy module, or None if the module is not installed."""
+        try:
+            return cls(name) if importlib.util.find_spec(name) is not None else None
+        except (ImportError, ValueError):
+            return None
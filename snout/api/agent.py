@@ -1,12 +1,43 @@
+import itertools
 import time
-from enum import IntFlag
+import weakref
 
+from snout.api import classproperty, lazymodule
+from snout.api.error import AgentDependencyError
 from snout.api.event import EventMgmtCapability
 from snout.api.hier import AppHierarchy
 from snout.api.log import Logger
 from snout.api.factory import Factory
+from snout.api.metrics import REGISTRY
+from snout.api.registry import AgentRegistry
+from snout.api.status import Status
+from snout.api.timeline import StatusTimeline
 
-Status = IntFlag('Status', 'Unknown Idle Ready Starting Running Stopping Stopped Complete Failed')
+futures = lazymodule('concurrent.futures')
+
+STATUS_TRANSITIONS = REGISTRY.counter(
+    'snout_agent_status_transitions_total',
+    'Status transitions of the agents, by new status.',
+    labels=('agent', 'status'),
+)
+STATUS_SECONDS = REGISTRY.counter(
+    'snout_agent_status_seconds_total',
+    'Time the agents spent in each status.',
+    labels=('agent', 'status'),
+)
+RUN_SECONDS = REGISTRY.histogram(
+    'snout_agent_run_seconds', 'Duration of SnoutAgent.run().', labels=('agent',)
+)
+STOP_SECONDS = REGISTRY.histogram(
+    'snout_agent_stop_seconds', 'Duration of SnoutAgent.stop().', labels=('agent',)
+)
+
+
+_metrics_ids = itertools.count()
+
+
+def _statusname(status):
+    return getattr(status, 'name', None) or str(int(status))
 
 
 class SnoutAgent(EventMgmtCapability, AppHierarchy):
@@ -17,31 +48,58 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
         parent (SnoutAgent, optional): The parent object.
 
     Attributes:
-        instances (list): Retains a list of active SnoutAgent instances.
+        registry (AgentRegistry): Weakly referenced index of the live SnoutAgent instances.
+        instances (list): The live SnoutAgent instances.
+        statuslog_capacity (int): Maximum number of status transitions kept in the statuslog
+            (its storage grows on demand).
     """
 
-    instances = []
+    registry = AgentRegistry()
+    statuslog_capacity = 4096
 
     __request_exit__ = False
 
     def __init__(self, *args, **kwargs):
+        self._nickname = kwargs.get('name', None)
+        self._name = None
+        self._fullname = None
         super().__init__(*args, **kwargs)
-        SnoutAgent.instances.append(self)
         self.logger = Logger(agent=self)
         self.args = args
         self.kwargs = kwargs
-        self._nickname = kwargs.get('name', None)
         self._app = kwargs.get('app', None)
+        SnoutAgent.registry.add(self)
         # State
-        self._statuslog = []
+        self._statuslog = StatusTimeline(capacity=self.statuslog_capacity, flag_type=Status)
         self._status = Status.Unknown
+        self._status_since = time.time()
+        # metric series are labelled with a process-unique id (fullnames are only unique
+        # among live agents), and removed with the agent
+        self._metrics_id = f'{self.name}#{next(_metrics_ids)}'
+        weakref.finalize(self, REGISTRY.forget, 'agent', self._metrics_id).atexit = False
 
         # Runtime
         self.status = Status.Idle
 
+    @classproperty
+    def instances(cls):
+        return list(SnoutAgent.registry)
+
     @classmethod
     def find_instance(cls, searchterm):
-        return [i for i in SnoutAgent.instances if searchterm in i.name]
+        return SnoutAgent.registry.search(searchterm)
+
+    def _reparented(self):
+        # the names (and possibly the app) of the whole subtree have changed;
+        # parents are visited before their children, which build on their names
+        stack = [self]
+        while stack:
+            agent = stack.pop()
+            if isinstance(agent, SnoutAgent):
+                agent._name = None
+                agent._fullname = None
+                SnoutAgent.registry.reindex(agent)
+            stack.extend(agent.children)
 
     @classmethod
     def factory(cls, variant, *args, **kwargs):
@@ -51,6 +109,28 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
         else:
             raise AttributeError(f'To use factory, {cls.__class__.__name__} must have a __base_agent__ attribute set')
 
+    @classmethod
+    def factory_many(cls, variants, *args, **kwargs):
+        """Create many agents from their plugin variants at once.
+
+        Args:
+            variants (iterable): Variant names, or ``(variant, kwargs)`` tuples whose
+                kwargs override the common keyword arguments.
+            *args: Positional arguments of every agent.
+            **kwargs: Common keyword arguments of every agent.
+
+        Returns:
+            list: The agents, or None for variants that are not registered.
+        """
+        if not hasattr(cls, '__base_agent__'):
+            raise AttributeError(f'To use factory, {cls.__class__.__name__} must have a __base_agent__ attribute set')
+        specs = [v if isinstance(v, tuple) else (v, {}) for v in variants]
+        plugins = Factory.resolve_many((cls.__base_agent__, variant) for variant, _ in specs)
+        return [
+            plugin(*args, **dict(kwargs, **overrides)) if plugin else None
+            for plugin, (_, overrides) in zip(plugins, specs)
+        ]
+
     @property
     def app(self):
         if self._app:
@@ -59,20 +139,34 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
             return self.parent.app
         return None
 
+    @property
+    def nickname(self):
+        return self._nickname
+
+    @nickname.setter
+    def nickname(self, value):
+        self._nickname = value
+        self._reparented()
+
     @property
     def name(self):
         """Hierarchical name of the SnoutAgent object.
 
+        The name is cached, and invalidated for the whole subtree when the
+        parent or the nickname of an agent changes.
+
         Returns:
             str: Hierarchical name of the SnoutAgent object.
         """
-        me = f'{self.__module__}.{self.__class__.__name__}'
-        try:
+        if self._name is None:
+            me = f'{self.__module__}.{self.__class__.__name__}'
             if self._nickname:
                 me += f'_{self._nickname}'
-            return '.'.join([self.parent.name, me])
-        except AttributeError:
-            return me
+            try:
+                self._name = '.'.join([self.parent.name, me])
+            except AttributeError:
+                self._name = me
+        return self._name
 
     @property
     def fullname(self):
@@ -81,14 +175,16 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
         Returns:
             str: The SnoutAgent's fullname, guaranteed to be unique.
         """
-        return f'{self.name}@{hex(id(self))}'
+        if self._fullname is None:
+            self._fullname = f'{self.name}@{hex(id(self))}'
+        return self._fullname
 
     @property
     def statuslog(self):
         """Timestamped history of the SnoutAgent's status
 
         Returns:
-            list: A list of (timestamp, old_status, new_status) tuples.
+            StatusTimeline: A bounded sequence of (timestamp, old_status, new_status) tuples.
         """
         return self._statuslog
 
@@ -105,9 +201,14 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
     def status(self, value):
         # if isinstance(value, Status):
         if value != self._status:
-            self.logger.debug(f'Status {repr(self._status)} -> {repr(value)}')
-            self.statuslog.append((time.time(), self._status, value))
+            now = time.time()
+            self.logger.debug('Status %r -> %r', self._status, value)
+            self.statuslog.append((now, self._status, value))
+            agent = self._metrics_id
+            STATUS_SECONDS.inc(now - self._status_since, (agent, _statusname(self._status)))
+            STATUS_TRANSITIONS.inc(labels=(agent, _statusname(value)))
             self._status = value
+            self._status_since = now
         # else:
         #    raise TypeError(
         #        f"The status of {self.__class__.__name__} must be a Status flag.")
@@ -121,7 +222,11 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
         self.status = Status.Running
         # create argument set from base arguments + custom arguments
         oargs, okwargs = self.arg_override(*args, **kwargs)
-        self.runlogic(oargs, okwargs)
+        start = time.perf_counter()
+        try:
+            self.runlogic(oargs, okwargs)
+        finally:
+            RUN_SECONDS.observe(time.perf_counter() - start, (self._metrics_id,))
         self.status |= Status.Complete
 
     def runlogic(self, *args, **kwargs):
@@ -132,10 +237,134 @@ class SnoutAgent(EventMgmtCapability, AppHierarchy):
     def stop(self):
         if self.status & Status.Running:
             self.status |= Status.Stopping
-        self.stoplogic()
+        start = time.perf_counter()
+        try:
+            self.stoplogic()
+        finally:
+            STOP_SECONDS.observe(time.perf_counter() - start, (self._metrics_id,))
         self.status = (self.status & ~(Status.Running | Status.Stopping)) | Status.Stopped
 
     def stoplogic(self):
         raise NotImplementedError(
             f'Please subclass SnoutAgent.stoplogic() in {self.__class__.__name__}.'
         )
+
+    def run_tree(self, *args, workers=None, dependencies=None, **kwargs):
+        """Run the SnoutAgent and all SnoutAgents of its subtree.
+
+        Parents run before their children, and independent agents (e.g. siblings)
+        run concurrently on a thread pool. Agents whose prerequisites failed are
+        not run.
+
+        Args:
+            *args: Passed on to every :meth:`run`.
+            workers (int, optional): Size of the thread pool.
+            dependencies (dict, optional): Maps agents to the agents of the subtree
+                they must run after (and stop before).
+            **kwargs: Passed on to every :meth:`run`.
+
+        Returns:
+            dict: The final Status of every agent, with Status.Failed set for failures.
+        """
+        return self._tree_apply(
+            lambda agent: agent.run(*args, **kwargs), 'run', workers, dependencies
+        )
+
+    def stop_tree(self, workers=None, dependencies=None):
+        """Stop the SnoutAgent and all SnoutAgents of its subtree.
+
+        Children stop before their parents, and independent agents stop
+        concurrently on a thread pool. Failures don't prevent other agents from
+        stopping.
+
+        Args:
+            workers (int, optional): Size of the thread pool.
+            dependencies (dict, optional): See :meth:`run_tree`.
+
+        Returns:
+            dict: The final Status of every agent, with Status.Failed set for failures.
+        """
+        return self._tree_apply(lambda agent: agent.stop(), 'stop', workers, dependencies)
+
+    def _tree_apply(self, operation, action, workers, dependencies):
+        agents = [node for node in self.iter_breadth_first() if isinstance(node, SnoutAgent)]
+        prerequisites = self._tree_prerequisites(agents, action, dependencies)
+        dependents = {agent: [] for agent in agents}
+        for agent, before in prerequisites.items():
+            for other in before:
+                dependents[other].append(agent)
+        self._check_cycles(agents, prerequisites, dependents, action)
+        return self._tree_schedule(agents, prerequisites, dependents, operation, action, workers)
+
+    def _tree_prerequisites(self, agents, action, dependencies):
+        # maps every agent to the agents that must be done before it
+        prerequisites = {agent: set() for agent in agents}
+        for agent in agents:
+            before = list((dependencies or {}).get(agent, ()))
+            parent = agent.parent
+            while agent is not self and parent is not None and not isinstance(parent, SnoutAgent):
+                parent = parent.parent
+            if agent is not self and parent is not None:
+                before.append(parent)
+            for other in before:
+                if other in prerequisites and other is not agent:
+                    if action == 'stop':
+                        prerequisites[other].add(agent)
+                    else:
+                        prerequisites[agent].add(other)
+        return prerequisites
+
+    @staticmethod
+    def _check_cycles(agents, prerequisites, dependents, action):
+        # reject cycles before anything runs
+        remaining = {agent: len(before) for agent, before in prerequisites.items()}
+        ready = [agent for agent in agents if not remaining[agent]]
+        ordered = 0
+        while ready:
+            ordered += 1
+            for other in dependents[ready.pop()]:
+                remaining[other] -= 1
+                if not remaining[other]:
+                    ready.append(other)
+        if ordered < len(agents):
+            cyclic = [agent.name for agent in agents if remaining[agent]]
+            raise AgentDependencyError(f'Cyclic {action} dependencies between {cyclic}.')
+
+    @staticmethod
+    def _tree_schedule(agents, prerequisites, dependents, operation, action, workers):
+        waiting = {agent: len(before) for agent, before in prerequisites.items()}
+        results = {}
+        failed = set()
+        pending = {}
+        with futures.ThreadPoolExecutor(max_workers=workers or min(32, len(agents))) as pool:
+
+            def schedule(agent):
+                if action == 'run' and prerequisites[agent] & failed:
+                    agent.logger.error('Not run: a prerequisite failed.')
+                    agent.status |= Status.Failed
+                    failed.add(agent)
+                    release(agent)
+                else:
+                    pending[pool.submit(operation, agent)] = agent
+
+            def release(agent):
+                results[agent] = agent.status
+                for other in dependents[agent]:
+                    waiting[other] -= 1
+                    if not waiting[other]:
+                        schedule(other)
+
+            for agent in agents:
+                if not waiting[agent]:
+                    schedule(agent)
+            while pending:
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    agent = pending.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        agent.logger.exception('Failed to %s.', action, exc_info=error)
+                        agent.status |= Status.Failed
+                        failed.add(agent)
+                    release(agent)
+        return {agent: results[agent] for agent in agents}
@@ -1,15 +1,33 @@
+import atexit
+import copy
 import os
+import stat
+import tempfile
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
 from datetime import datetime
 from glob import glob
 from pathlib import Path
 
 import appdirs
-from strictyaml import Datetime, EmptyDict, Float, Int, Map, MapPattern, Optional, Seq, Str, load
 
-from snout.api import classproperty
+from snout.api import classproperty, lazymodule
 from snout.api.agent import SnoutAgent
+from snout.api.error import SnoutfileError
 from snout.api.log import Logger
 
+futures = lazymodule('concurrent.futures')
+multiprocessing = lazymodule('multiprocessing')
+hashlib = lazymodule('hashlib')
+strictyaml = lazymodule('strictyaml')
+umsgpack = lazymodule('umsgpack')
+
+# msgpack extension type of naive datetimes (which umsgpack would turn into UTC ones)
+EXT_DATETIME = 0x30
+
 
 class Config(object):
     appname = 'Snout'
@@ -18,11 +36,13 @@ class Config(object):
     custom_snoutfile_paths = []
 
     _settings = None
+    _settings_lock = threading.RLock()
 
     @classproperty
     def settings(cls):
-        if not cls._settings:
-            cls._settings = Settings()
+        with cls._settings_lock:
+            if not cls._settings:
+                cls._settings = Settings()
         return cls._settings
 
     # def __getattribute__(self, key):
@@ -61,75 +81,111 @@ class Config(object):
         snoutfiles = []
         for path in searchpath:
             snoutfiles += sorted(glob(os.sep.join([path, pattern])))
-        snoutfiles = list(set(snoutfiles))
-        return snoutfiles
+        return list(dict.fromkeys(snoutfiles))  # remove duplicates, keep the order
 
 
 class Settings(Logger):
-    schema = Map(
-        {
-            'meta': Map(
+    """The application settings, persisted in ``settings.yaml``.
+
+    Changes are written behind: a background thread saves the settings once no
+    change was made for ``save_delay`` seconds, so many changes result in a
+    single write, but no later than ``save_max_delay`` seconds after the first
+    unsaved change. The thread exits once everything is saved. Files are
+    replaced atomically, by writing a temporary file and renaming it, and keep
+    their permissions. Use :meth:`flush` to save pending changes immediately.
+    """
+
+    save_delay = 0.5
+    save_max_delay = 5.0
+
+    # pending changes of all live instances are saved at exit
+    _instances = weakref.WeakSet()
+    _atexit = None
+
+    _schema = None
+
+    @classproperty
+    def schema(cls):
+        """The strictyaml schema of the settings file (built on first use)."""
+        if Settings._schema is None:
+            from strictyaml import (
+                Datetime,
+                EmptyDict,
+                Float,
+                Int,
+                Map,
+                MapPattern,
+                Optional,
+                Seq,
+                Str,
+            )
+
+            Settings._schema = Map(
                 {
-                    'created': Datetime(),
-                    'modified': Datetime(),
-                }
-            ),
-            Optional('app', default=None): MapPattern(
-                Str(),
-                Str()
-                | Int()
-                | Float()
-                | Datetime()
-                | Seq(Str() | Int() | Float() | Datetime())
-                | EmptyDict()
-                | MapPattern(
-                    Str(),
-                    Str()
-                    | Int()
-                    | Float()
-                    | Datetime()
-                    | Seq(Str() | Int() | Float() | Datetime())
-                    | EmptyDict()
-                    | MapPattern(
+                    'meta': Map(
+                        {
+                            'created': Datetime(),
+                            'modified': Datetime(),
+                        }
+                    ),
+                    Optional('app', default=None): MapPattern(
                         Str(),
                         Str()
                         | Int()
                         | Float()
                         | Datetime()
                         | Seq(Str() | Int() | Float() | Datetime())
-                        | EmptyDict(),
+                        | EmptyDict()
+                        | MapPattern(
+                            Str(),
+                            Str()
+                            | Int()
+                            | Float()
+                            | Datetime()
+                            | Seq(Str() | Int() | Float() | Datetime())
+                            | EmptyDict()
+                            | MapPattern(
+                                Str(),
+                                Str()
+                                | Int()
+                                | Float()
+                                | Datetime()
+                                | Seq(Str() | Int() | Float() | Datetime())
+                                | EmptyDict(),
+                            ),
+                        ),
                     ),
-                ),
-            ),
-            Optional('docker', default=None): MapPattern(
-                Str(),
-                Str()
-                | Int()
-                | Float()
-                | Datetime()
-                | Seq(Str() | Int() | Float() | Datetime())
-                | EmptyDict()
-                | MapPattern(
-                    Str(),
-                    Str()
-                    | Int()
-                    | Float()
-                    | Datetime()
-                    | Seq(Str() | Int() | Float() | Datetime())
-                    | EmptyDict()
-                    | MapPattern(
+                    Optional('docker', default=None): MapPattern(
                         Str(),
                         Str()
                         | Int()
                         | Float()
                         | Datetime()
                         | Seq(Str() | Int() | Float() | Datetime())
-                        | EmptyDict(),
+                        | EmptyDict()
+                        | MapPattern(
+                            Str(),
+                            Str()
+                            | Int()
+                            | Float()
+                            | Datetime()
+                            | Seq(Str() | Int() | Float() | Datetime())
+                            | EmptyDict()
+                            | MapPattern(
+                                Str(),
+                                Str()
+                                | Int()
+                                | Float()
+                                | Datetime()
+                                | Seq(Str() | Int() | Float() | Datetime())
+                                | EmptyDict(),
+                            ),
+                        ),
                     ),
-                ),
-            ),
-        }
-    )
+                }
+            )
+        return Settings._schema
+
     _schema_depth = {
         'meta': 2,
         'app': 4,
@@ -138,6 +194,19 @@ class Settings(Logger):
 
     def __init__(self, __configfile=None):
         super().__init__()
+        self._lock = threading.RLock()
+        self._changes = threading.Condition(self._lock)
+        self._version = 0
+        self._saved = 0
+        self._deadline = None
+        self._dirty_since = None
+        self._batch_depth = 0
+        self._snapshot = None
+        self._tree = None
+        self._flat = None
+        self._keys = None
+        self._writer = None
+        self._write_lock = threading.Lock()
 
         # Set up settings file
         self._configfile = (
@@ -151,10 +220,10 @@ class Settings(Logger):
         # Read settings or apply default template
         try:
             with open(self._configfile) as f:
-                self._data = load(f.read(), Settings.schema)
+                self._data = strictyaml.load(f.read(), Settings.schema)
         except FileNotFoundError:
             curdate = datetime.now()
-            defaultconf = load(
+            defaultconf = strictyaml.load(
                 f"""
 meta:
     created: {curdate}
@@ -164,29 +233,269 @@ meta:
             )
             self._data = defaultconf
             self.save()
+        Settings._instances.add(self)
+        if not Settings._atexit:
+            Settings._atexit = atexit.register(Settings._flush_all)
 
-    def save(self):
+    @staticmethod
+    def _flush_all():
+        for settings in list(Settings._instances):
+            settings.close()
+
+    @staticmethod
+    def _file_mode(path):
         try:
-            with open(self._configfile, 'w') as f:
-                f.write(self._data.as_yaml())
-            return True
-        except Exception as e:
-            self.logger.error(f'Config file could not be written ({e})')
-            return False
+            return stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+    def save(self):
+        """Write the settings file now.
+
+        Returns:
+            bool: True if the file was written.
+        """
+        with self._lock:
+            if self._snapshot:
+                text, version = self._snapshot  # don't write uncommitted batches
+            else:
+                text, version = self._data.as_yaml(), self._version
+        with self._write_lock:
+            if version < self._saved:
+                return True  # a newer version has been written meanwhile
+            directory = os.path.dirname(os.path.abspath(self._configfile))
+            try:
+                fd, tmp = tempfile.mkstemp(dir=directory, prefix='.settings-', suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(text)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    # mkstemp creates the file with mode 0600
+                    os.chmod(tmp, self._file_mode(self._configfile))
+                    os.replace(tmp, self._configfile)
+                except BaseException:
+                    os.remove(tmp)
+                    raise
+            except Exception as e:
+                self.logger.error(f'Config file could not be written ({e})')
+                return False
+            self._saved = max(self._saved, version)
+        with self._lock:
+            if self._saved >= self._version:
+                # nothing left to write, let the writer thread finish
+                self._deadline = self._dirty_since = None
+                self._changes.notify_all()
+        return True
+
+    def flush(self):
+        """Write pending changes now.
+
+        Returns:
+            bool: True if there were no pending changes or they were written.
+        """
+        with self._lock:
+            if self._saved >= self._version:
+                return True
+        return self.save()
+
+    def close(self):
+        """Write pending changes and wait for the writer thread to finish.
+
+        Returns:
+            bool: True if there were no pending changes or they were written.
+        """
+        with self._lock:
+            writer = self._writer
+            if writer and self._deadline is not None:
+                self._deadline = time.monotonic()
+                self._changes.notify_all()
+        written = self.flush()
+        if writer and writer is not threading.current_thread():
+            writer.join()
+        return written
+
+    @property
+    def pending(self):
+        """Whether there are changes that have not been written yet."""
+        with self._lock:
+            return self._saved < self._version
+
+    def _changed(self):
+        with self._lock:
+            self._version += 1
+            if not self._batch_depth:
+                self._schedule()
+
+    def _schedule(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._dirty_since is None:
+                self._dirty_since = now
+            # debounce, but don't let a steady stream of changes postpone the write forever
+            self._deadline = min(now + self.save_delay, self._dirty_since + self.save_max_delay)
+            if not self._writer:
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+                self._writer.start()
+            self._changes.notify()
+
+    def _writer_loop(self):
+        while True:
+            with self._lock:
+                while self._deadline is None or time.monotonic() < self._deadline:
+                    if self._deadline is None and self._saved >= self._version:
+                        self._writer = None
+                        return
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._changes.wait(timeout)
+                self._deadline = None
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """Group changes into a transaction.
+
+        The changes made within the block are saved together once it is left. If
+        the block raises an exception, all of its changes are rolled back. The
+        settings are locked for the calling thread while in the block, so other
+        threads' changes wait for it and are never rolled back with it.
+        """
+        with self._lock:
+            if not self._batch_depth:
+                self._snapshot = (self._data.as_yaml(), self._version)
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    text, self._version = self._snapshot
+                    self._data = strictyaml.load(text, Settings.schema)
+                    self._flat = None
+                    self._snapshot = None
+                    self._changes.notify_all()
+                raise
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                if self._version > self._snapshot[1]:
+                    self._schedule()
+                self._snapshot = None
+
+    def _index(self):
+        # dotted keys of all nodes, mapped to the plain values of one conversion of
+        # the document, so that parents share their children's values
+        flat = self._flat
+        if flat is None:
+            with self._lock:
+                if self._flat is None:
+                    self._tree = self._data.data
+                    flat = {}
+                    self._flatten(flat, '', self._tree)
+                    self._keys = None
+                    self._flat = flat
+                flat = self._flat
+        return flat
+
+    @staticmethod
+    def _flatten(flat, prefix, value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                key = f'{prefix}{k}'
+                flat[key] = v
+                Settings._flatten(flat, f'{key}.', v)
+
+    def _reindex(self, key):
+        # update the cache incrementally; parents are copied on write, so that
+        # values returned to readers are never modified
+        flat = self._flat
+        if flat is None:
+            return
+        node = self._data
+        for k in key.split('.'):
+            node = node[k]
+        value = node.data
+        stale = {}
+        self._flatten(stale, f'{key}.', flat.get(key))
+        added = {key: value}
+        self._flatten(added, f'{key}.', value)
+        tree = parent = dict(self._tree)
+        prefix = ''
+        *path, last = key.split('.')
+        for k in path:
+            child = dict(parent[k]) if isinstance(parent.get(k), dict) else {}
+            parent[k] = child
+            added[f'{prefix}{k}'] = child
+            parent, prefix = child, f'{prefix}{k}.'
+        parent[last] = value
+        if stale.keys() - added.keys() or added.keys() - flat.keys():
+            self._keys = None
+        for k in stale.keys() - added.keys():
+            del flat[k]
+        flat.update(added)
+        self._tree = tree
+
+    @staticmethod
+    def _copy(value):
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
 
     def get(self, key):
-        keypath = key.split('.')
-        d = self._data
-        while keypath:
-            k = keypath.pop(0)
-            if k in d.keys():
-                if keypath:
-                    d = d[k]
-                else:
-                    return d[k].data
-        raise ValueError('Settings key not found.')
+        """The value of a (dotted) settings key.
+
+        Values are served from a flattened cache of the settings, which is updated
+        by :meth:`set`.
+        """
+        try:
+            return self._copy(self._index()[key])
+        except KeyError:
+            raise ValueError('Settings key not found.') from None
+
+    def get_many(self, keys, default=None):
+        """The values of many settings keys.
+
+        Args:
+            keys (iterable): Dotted settings keys.
+            default (optional): Value of the keys that are not set.
+
+        Returns:
+            dict: Maps the keys to their values.
+        """
+        flat = self._index()
+        return {key: self._copy(flat.get(key, default)) for key in keys}
+
+    def scan(self, prefix):
+        """All settings below a (dotted) key, e.g. a component's whole section.
+
+        Args:
+            prefix (str): Dotted key of the section.
+
+        Returns:
+            dict: Maps the dotted keys of all leaves below ``prefix`` to their values.
+        """
+        flat = self._index()
+        keys = self._keys
+        if keys is None:
+            with self._lock:
+                keys = self._keys = sorted(flat)
+        prefix = f'{prefix}.' if prefix else ''
+        result = {}
+        for key in keys[bisect_left(keys, prefix) :]:
+            if not key.startswith(prefix):
+                break
+            value = flat.get(key)
+            if key in flat and not isinstance(value, dict):
+                result[key] = self._copy(value)
+        return result
 
     def set(self, key, value):
+        """Set the value of a (dotted) settings key, creating it if needed."""
+        with self._lock:
+            self._set(key, value)
+            self._reindex(key)
+        self._changed()
+
+    def _set(self, key, value):
         keypath = key.split('.')
         for section, allowed_depth in Settings._schema_depth.items():
             if keypath[0] == section and len(keypath) > allowed_depth:
@@ -202,7 +511,6 @@ meta:
                 else:
                     self.logger.debug(f'Changing Settings item *{key}* from {d[k]} to {value}.')
                     d[k] = value  # set the value of the leaf
-                    self.save()
                     return
             else:  # the key doesn't exist yet
                 if keypath:  # there is still path left to cover
@@ -223,83 +531,282 @@ meta:
                 else:  # there is no path element left (this is a leaf)
                     self.logger.debug(f'Creating new Settings item *{key}* with value {value}.')
                     d[k] = value  # set the value of the leaf
-                self.save()
                 return
 
 
+class SnoutfileCache(object):
+    """On-disk cache of validated Snoutfile data.
+
+    The parsed data of every file is stored with msgpack in the user cache
+    directory, along with the file's mtime, size and content hash and a key
+    identifying the parser (see :attr:`Snoutfile.schema_key`). An entry is used
+    if the key and the file's content hash are unchanged; when mtime and size
+    are unchanged too (and the entry is not racily newer than the file), the
+    file isn't even read.
+
+    Args:
+        path (str, optional): Cache directory.
+
+    Attributes:
+        hits (int): Number of loads served from the cache.
+        misses (int): Number of loads that parsed the file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.sep.join([appdirs.user_cache_dir(Config.appname), 'snoutfiles'])
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def count(self, hits=0, misses=0):
+        """Add to the hit and miss counters."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _entry_path(self, filepath):
+        digest = hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()
+        return os.sep.join([self.path, f'{digest}.msgpack'])
+
+    @staticmethod
+    def _pack(entry):
+        return umsgpack.packb(
+            entry,
+            ext_handlers={
+                datetime: lambda d: umsgpack.Ext(EXT_DATETIME, d.isoformat().encode('utf-8'))
+            },
+        )
+
+    @staticmethod
+    def _unpack(data):
+        return umsgpack.unpackb(
+            data,
+            ext_handlers={EXT_DATETIME: lambda ext: datetime.fromisoformat(ext.data.decode())},
+        )
+
+    def _read(self, filepath, key):
+        filepath = os.path.abspath(filepath)
+        try:
+            with open(self._entry_path(filepath), 'rb') as f:
+                entry = self._unpack(f.read())
+            if entry.get('key') == key and entry.get('path') == filepath:
+                return entry
+        except (OSError, umsgpack.UnpackException, AttributeError):
+            pass
+        return None
+
+    def _write(self, filepath, entry):
+        path = self._entry_path(filepath)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            Path(self.path).mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(self._pack(entry))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the cache is only an optimization
+
+    def load(self, filepath, parse, key=''):
+        """The parsed data of a file, from the cache if the file is unchanged.
+
+        Args:
+            filepath (str): The file.
+            parse (callable): Parses the file's content into msgpack-serializable data.
+            key (str, optional): Identifies ``parse``; entries written with another key
+                are ignored.
+
+        Returns:
+            The parsed data.
+        """
+        info = os.stat(filepath)
+        entry = self._read(filepath, key)
+        if (
+            entry
+            and entry['mtime_ns'] == info.st_mtime_ns
+            and entry['size'] == info.st_size
+            and entry['written_ns'] - info.st_mtime_ns > 1_000_000_000
+        ):
+            self.count(hits=1)
+            return entry['data']
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if entry and entry['sha256'] == digest:
+            self.count(hits=1)
+            data = entry['data']
+        else:
+            self.count(misses=1)
+            data = parse(content.decode('utf-8'))
+        self._write(
+            filepath,
+            {
+                'key': key,
+                'path': os.path.abspath(filepath),
+                'mtime_ns': info.st_mtime_ns,
+                'size': info.st_size,
+                'sha256': digest,
+                'written_ns': time.time_ns(),
+                'data': data,
+            },
+        )
+        return data
+
+
 class Snoutfile(SnoutAgent):
+    """An experiment description file.
+
+    Attributes:
+        cache (SnoutfileCache): Cache of the validated data of Snoutfiles (None disables it).
+    """
 
-    schema = Map(
-        {
-            'meta': Map(
+    cache = SnoutfileCache()
+
+    _schema = None
+    _schema_key = None
+
+    @classproperty
+    def schema(cls):
+        """The strictyaml schema of Snoutfiles (built on first use)."""
+        if Snoutfile._schema is None:
+            from strictyaml import Datetime, Float, Int, Map, MapPattern, Optional, Seq, Str
+
+            Snoutfile._schema = Map(
                 {
-                    'name': Str(),
-                    'description': Str(),
-                    'author': Str(),
-                    'email': Str(),
-                    'date': Datetime(),
-                }
-            ),
-            'instrument': MapPattern(
-                Str(),
-                Map(
-                    {
-                        'class': Str(),
-                        Optional('protocol', default=None): Str(),
-                        Optional('path', default=None): Str(),
-                        Optional('args', default=None): Seq(Str()) | Str(),
-                        Optional('kwargs', default=None): Str() | MapPattern(Str(), Str()),
-                        Optional('output', default='transcript'): Str(),
-                    }
-                ),
-            ),
-            Optional('parameters', default=None): MapPattern(
-                Str(), Str() | Seq(Str() | Int() | Float()) | Int() | Float()
-            ),
-            'steps': Seq(
-                MapPattern(
-                    Str(),
-                    Map(
+                    'meta': Map(
                         {
-                            'instrument': Str(),
-                            'command': Str(),
-                            'condition': Map(
+                            'name': Str(),
+                            'description': Str(),
+                            'author': Str(),
+                            'email': Str(),
+                            'date': Datetime(),
+                        }
+                    ),
+                    'instrument': MapPattern(
+                        Str(),
+                        Map(
+                            {
+                                'class': Str(),
+                                Optional('protocol', default=None): Str(),
+                                Optional('path', default=None): Str(),
+                                Optional('args', default=None): Seq(Str()) | Str(),
+                                Optional('kwargs', default=None): Str() | MapPattern(Str(), Str()),
+                                Optional('output', default='transcript'): Str(),
+                            }
+                        ),
+                    ),
+                    Optional('parameters', default=None): MapPattern(
+                        Str(), Str() | Seq(Str() | Int() | Float()) | Int() | Float()
+                    ),
+                    'steps': Seq(
+                        MapPattern(
+                            Str(),
+                            Map(
                                 {
-                                    'type': Str(),
-                                    'criteria': Int()
-                                    | Float()
-                                    | Str()
-                                    | Seq(Int() | Float() | Str()),
+                                    'instrument': Str(),
+                                    'command': Str(),
+                                    'condition': Map(
+                                        {
+                                            'type': Str(),
+                                            'criteria': Int()
+                                            | Float()
+                                            | Str()
+                                            | Seq(Int() | Float() | Str()),
+                                        }
+                                    ),
                                 }
                             ),
-                        }
+                        )
                     ),
-                )
-            ),
-            Optional('runs', default=1): Int(),
-            Optional('pipeline', default=None): Seq(
-                MapPattern(Str(), MapPattern(Str(), Str() | Int() | Float()))
-            ),
-        }
-    )
+                    Optional('runs', default=1): Int(),
+                    Optional('pipeline', default=None): Seq(
+                        MapPattern(Str(), MapPattern(Str(), Str() | Int() | Float()))
+                    ),
+                }
+            )
+        return Snoutfile._schema
+
+    @classproperty
+    def schema_key(cls):
+        """A hash of :attr:`schema`, identifying cached data parsed with it."""
+        if Snoutfile._schema_key is None:
+            Snoutfile._schema_key = hashlib.sha256(
+                _describe_validator(Snoutfile.schema).encode('utf-8')
+            ).hexdigest()
+        return Snoutfile._schema_key
 
     @staticmethod
-    def factory(filepaths=None):
+    def factory(filepaths=None, parallel=False, workers=None):
+        """Load the Snoutfiles found in the Snoutfile search paths.
+
+        Args:
+            filepaths (str or list, optional): Additional search paths.
+            parallel (bool, optional): Parse the files in a process pool (see :meth:`load_all`);
+                malformed files are then logged and skipped instead of raising.
+            workers (int, optional): Size of the process pool.
+
+        Returns:
+            list: The Snoutfiles, in search path order.
+        """
         filepaths = Config.snoutfiles(custompath=filepaths)
         Logger.logger.info(str(filepaths))
+        if parallel:
+            snoutfiles = []
+            for result in Snoutfile.load_all(filepaths, workers=workers):
+                if isinstance(result, SnoutfileError):
+                    Logger.logger.error(str(result))
+                else:
+                    snoutfiles.append(result)
+            return snoutfiles
         snoutfiles = []
         for path in filepaths:
             Logger.logger.info(f'Trying {path}:')
             snoutfiles.append(Snoutfile(path))
         return snoutfiles
 
-    def __init__(self, path, name=None, app=None):
+    @staticmethod
+    def load_all(filepaths, workers=None):
+        """Parse many Snoutfiles in a pool of spawned processes.
+
+        Args:
+            filepaths (list): Paths of the Snoutfiles.
+            workers (int, optional): Size of the process pool (0 parses on this thread).
+
+        Returns:
+            list: A Snoutfile, or a SnoutfileError if the file could not be loaded, per path.
+        """
+        cache = Snoutfile.cache
+        jobs = [(path, cache.path if cache else None) for path in filepaths]
+        if workers == 0 or len(jobs) < 2:
+            loaded = [_load_snoutfile(*job) for job in jobs]
+        else:
+            # forking a process with running threads (event publisher, settings
+            # writer, log flusher) can deadlock the children on inherited locks
+            context = multiprocessing.get_context('spawn')
+            with futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                loaded = list(pool.map(_load_snoutfile, *zip(*jobs), chunksize=8))
+        results = []
+        for path, (data, error, hits, misses) in zip(filepaths, loaded):
+            if cache:
+                cache.count(hits, misses)
+            results.append(error if error else Snoutfile(path, data=data))
+        return results
+
+    def __init__(self, path, name=None, app=None, data=None):
         super().__init__(name=name, app=app)
         self._path = path
-        if self._path:
+        if data is not None:
+            self._data = data
+        elif self._path:
             self.logger.info(f'Initializing from file {self.path}...')
-            with open(self.path) as f:
-                self._data = load(f.read(), Snoutfile.schema).data
+            if self.cache is None:
+                with open(self.path) as f:
+                    self._data = self._parse(f.read())
+            else:
+                self._data = self.cache.load(self.path, self._parse, Snoutfile.schema_key)
+
+    @staticmethod
+    def _parse(text):
+        return strictyaml.load(text, Snoutfile.schema).data
 
     @property
     def path(self):
@@ -311,3 +818,29 @@ class Snoutfile(SnoutAgent):
             return self._data
         except AttributeError:
             return {}
+
+
+def _describe_validator(validator):
+    # a canonical description of a strictyaml schema; unlike repr(), it includes
+    # the defaults of optional keys
+    if isinstance(validator, dict):
+        items = (f'{_describe_validator(k)}:{_describe_validator(v)}' for k, v in validator.items())
+        return '{' + ','.join(sorted(items)) + '}'
+    if isinstance(validator, (list, tuple)):
+        return '[' + ','.join(_describe_validator(v) for v in validator) + ']'
+    if hasattr(validator, '__dict__'):
+        return type(validator).__name__ + _describe_validator(vars(validator))
+    return repr(validator)
+
+
+def _load_snoutfile(path, cache_path):
+    # runs in the worker processes of Snoutfile.load_all()
+    try:
+        if cache_path is None:
+            with open(path) as f:
+                return Snoutfile._parse(f.read()), None, 0, 0
+        cache = SnoutfileCache(cache_path)
+        data = cache.load(path, Snoutfile._parse, Snoutfile.schema_key)
+        return data, None, cache.hits, cache.misses
+    except Exception as e:
+        return None, SnoutfileError(path, f'{type(e).__name__}: {e}'), 0, 0
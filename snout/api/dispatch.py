@@ -0,0 +1,284 @@
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
+logger = logging.getLogger('Snout.events')
+
+
+class HandlerStats(object):
+    """Latency statistics of an event handler.
+
+    Latencies are measured from the submission of an event to the completion
+    of its handler, and thus include the time spent in the work queue.
+    """
+
+    __slots__ = ('count', 'errors', 'dropped', 'coalesced', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, latency, error=False):
+        self.count += 1
+        self.errors += int(error)
+        self.total += latency
+        self.min = latency if self.min is None else min(self.min, latency)
+        self.max = latency if self.max is None else max(self.max, latency)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+        }
+
+
+class DispatchPolicy(object):
+    """Base class of the handler dispatch policies of :class:`EventMgmtCapability`.
+
+    Attributes:
+        stats (dict): Maps handlers to their :class:`HandlerStats`.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.RLock()
+
+    def _stats(self, handler):
+        try:
+            return self.stats[handler]
+        except KeyError:
+            return self.stats.setdefault(handler, HandlerStats())
+
+    def submit(self, handler, args, kwargs):
+        raise NotImplementedError(
+            f'Please subclass DispatchPolicy.submit() in {self.__class__.__name__}.'
+        )
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class InlineDispatch(DispatchPolicy):
+    """Run handlers on the emitting thread, like unmanaged handlers, but with stats."""
+
+    def submit(self, handler, args, kwargs):
+        t0 = perf_counter()
+        error = True
+        try:
+            handler(*args, **kwargs)
+            error = False
+        finally:
+            with self._lock:
+                self._stats(handler).record(perf_counter() - t0, error)
+        return True
+
+
+class PoolDispatch(DispatchPolicy):
+    """Run handlers on an executor, fed from a bounded work queue.
+
+    At most ``workers`` handlers are handed to the executor at once; further
+    events wait in a work queue of at most ``maxsize`` entries. When the queue
+    is full, the ``overflow`` policy decides what happens:
+
+    - ``'block'``: the emitting thread waits for free space (a handler emitting
+      into its own full thread pool would wait for itself, so such events are
+      run inline on the handler's thread instead),
+    - ``'drop_oldest'``: the oldest queued event is discarded,
+    - ``'coalesce'``: the newest queued event for the same handler is replaced
+      by the new one (or, if there is none, the oldest queued event is discarded).
+
+    Args:
+        executor (concurrent.futures.Executor): The executor running the handlers.
+        workers (int): Maximum number of handlers submitted to the executor at once.
+        maxsize (int, optional): Capacity of the work queue.
+        overflow (str, optional): Policy applied when the work queue is full.
+    """
+
+    overflow_policies = ('block', 'drop_oldest', 'coalesce')
+
+    def __init__(self, executor, workers, maxsize=1024, overflow='block'):
+        super().__init__()
+        if overflow not in PoolDispatch.overflow_policies:
+            raise ValueError(
+                f'Unknown overflow policy {overflow!r} (use one of {PoolDispatch.overflow_policies}).'
+            )
+        self.executor = executor
+        self.workers = max(1, int(workers))
+        self.maxsize = max(1, int(maxsize))
+        self.overflow = overflow
+        self._queue = deque()
+        self._inflight = 0
+        self._cond = threading.Condition(self._lock)
+
+    @property
+    def backlog(self):
+        return len(self._queue)
+
+    def submit(self, handler, args, kwargs):
+        """Queue a handler call.
+
+        Returns:
+            bool: False if the event was merged into an already queued one.
+        """
+        item = [handler, args, kwargs, perf_counter()]
+        with self._cond:
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == 'block' and self._on_worker():
+                    self._cond.release()
+                    try:
+                        self._run_inline(*item)
+                    finally:
+                        self._cond.acquire()
+                    return True
+                if self.overflow == 'block':
+                    self._cond.wait_for(lambda: len(self._queue) < self.maxsize)
+                elif self.overflow == 'coalesce' and self._coalesce(item):
+                    return False
+                else:
+                    dropped = self._queue.popleft()
+                    self._stats(dropped[0]).dropped += 1
+            self._queue.append(item)
+            self._pump()
+        return True
+
+    def _coalesce(self, item):
+        for queued in reversed(self._queue):
+            if queued[0] is item[0]:
+                queued[1], queued[2] = item[1], item[2]
+                self._stats(item[0]).coalesced += 1
+                return True
+        return False
+
+    def _on_worker(self):
+        """Whether the calling thread is running one of this policy's handlers."""
+        return False
+
+    def _run_inline(self, handler, args, kwargs, t0):
+        error = True
+        try:
+            handler(*args, **kwargs)
+            error = False
+        finally:
+            with self._lock:
+                self._stats(handler).record(perf_counter() - t0, error)
+
+    def _submit(self, handler, args, kwargs):
+        return self.executor.submit(handler, *args, **kwargs)
+
+    def _pump(self):
+        while self._inflight < self.workers and self._queue:
+            handler, args, kwargs, t0 = self._queue.popleft()
+            self._inflight += 1
+            self._cond.notify_all()
+            future = self._submit(handler, args, kwargs)
+            future.add_done_callback(lambda f, h=handler, t0=t0: self._done(f, h, t0))
+
+    def _done(self, future, handler, t0):
+        exception = None if future.cancelled() else future.exception()
+        if exception is not None:
+            logger.error(f'Event handler {handler!r} failed.', exc_info=exception)
+        with self._cond:
+            self._inflight -= 1
+            error = future.cancelled() or exception is not None
+            self._stats(handler).record(perf_counter() - t0, error)
+            self._pump()
+            self._cond.notify_all()
+
+    def join(self, timeout=None):
+        """Wait until all queued handlers have finished.
+
+        Returns:
+            bool: False if the timeout expired first.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._inflight, timeout)
+
+    def shutdown(self, wait=True):
+        if wait:
+            self.join()
+        self.executor.shutdown(wait=wait)
+
+
+class ThreadPoolDispatch(PoolDispatch):
+    """Run handlers on a thread pool, for I/O-bound handlers (disk writes, UI updates).
+
+    Args:
+        workers (int, optional): Number of worker threads.
+        maxsize (int, optional): Capacity of the work queue.
+        overflow (str, optional): Policy applied when the work queue is full.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers=4, maxsize=1024, overflow='block'):
+        super().__init__(
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snout-dispatch'),
+            workers,
+            maxsize=maxsize,
+            overflow=overflow,
+        )
+        self._local = threading.local()
+
+    def _on_worker(self):
+        return getattr(self._local, 'active', False)
+
+    def _submit(self, handler, args, kwargs):
+        return self.executor.submit(self._run, handler, args, kwargs)
+
+    def _run(self, handler, args, kwargs):
+        self._local.active = True
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            self._local.active = False
+
+    @classmethod
+    def shared(cls):
+        """The process-wide default thread pool policy."""
+        if not ThreadPoolDispatch._shared:
+            with ThreadPoolDispatch._shared_lock:
+                if not ThreadPoolDispatch._shared:
+                    ThreadPoolDispatch._shared = ThreadPoolDispatch()
+        return ThreadPoolDispatch._shared
+
+
+class ProcessPoolDispatch(PoolDispatch):
+    """Run handlers on a process pool, for CPU-heavy handlers.
+
+    Handlers and their arguments must be picklable. The worker processes are
+    spawned rather than forked, as forking a process with running threads can
+    deadlock the children on inherited locks.
+
+    Args:
+        workers (int, optional): Number of worker processes.
+        maxsize (int, optional): Capacity of the work queue.
+        overflow (str, optional): Policy applied when the work queue is full.
+    """
+
+    def __init__(self, workers=2, maxsize=1024, overflow='block'):
+        super().__init__(
+            ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+            ),
+            workers,
+            maxsize=maxsize,
+            overflow=overflow,
+        )
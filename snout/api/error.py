@@ -9,11 +9,25 @@ class AmbiguousSnoutfileError(Exception):
         super().__init__(*args, **kwargs)
 
 
+class SnoutfileError(Exception):
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        self.path = path
+
+    def __str__(self):
+        return f'Snoutfile {self.path} could not be loaded: ' + ' '.join(map(str, self.args[1:]))
+
+
 class AgentNotFoundError(Exception):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
 
+class AgentDependencyError(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+
 # Experiment errors
 class ExperimentException(Exception):
     def __init__(self, *args, **kwargs):
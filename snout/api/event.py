@@ -1,60 +1,866 @@
+import itertools
+import logging
 import threading
+import time
 from logging import StreamHandler
-import umsgpack
-import zmq
+from queue import Empty, Full, Queue
+
+from snout.api import lazymodule
+from snout.api.metrics import REGISTRY
+
+asyncio = lazymodule('asyncio')
+umsgpack = lazymodule('umsgpack')
+zmq = lazymodule('zmq')
+zmq_asyncio = lazymodule('zmq.asyncio')
+
+logger = logging.getLogger('Snout.events')
+
+EVENTS_EMITTED = REGISTRY.counter(
+    'snout_events_emitted_total', 'Notifications emitted, by event name.', labels=('event',)
+)
+HANDLER_SECONDS = REGISTRY.histogram(
+    'snout_event_handler_seconds',
+    'Latency of the event handlers called inline by emitEvent().',
+    labels=('event', 'handler'),
+)
+MESSAGES_SENT = REGISTRY.counter(
+    'snout_eventsystem_messages_total',
+    'Messages published on the event system, by channel.',
+    labels=('channel',),
+)
+MESSAGES_DROPPED = REGISTRY.counter(
+    'snout_eventsystem_dropped_total',
+    'Messages dropped by the asynchronous event publisher, by channel.',
+    labels=('channel',),
+)
+
+
+class Frames(list):
+    """A binary event message made of buffer-protocol payloads.
+
+    Each payload (bytes, memoryview, array, NumPy array, ...) travels as a
+    separate ZMQ frame sent with ``copy=False``, preceded by a small msgpack
+    header describing the format, shape and dtype of every payload. Receivers
+    get a :class:`Frames` of memoryviews on the received frames, so no payload
+    is copied or re-allocated on the receiving side.
+
+    :meth:`EventSystem.emit` copies the payloads once, so that the caller may
+    reuse them as soon as it returns. With ``track=True``, they are sent without
+    copying, and must not be modified until the returned
+    :class:`zmq.MessageTracker` is done.
+
+    Args:
+        buffers (list): The payloads.
+        meta (optional): Additional msgpack-serializable metadata sent in the header.
+        dtypes (list, optional): NumPy dtype strings of the payloads, if known.
+        shapes (list, optional): Shapes of the payloads, if different from their buffer shape.
+        formats (list, optional): Struct formats of the payloads, if different from their
+            buffer format.
+    """
+
+    def __init__(self, buffers=(), meta=None, dtypes=None, shapes=None, formats=None):
+        super().__init__(buffers)
+        self.meta = meta
+        self.dtypes = list(dtypes) if dtypes else [None] * len(self)
+        self.shapes = list(shapes) if shapes else [memoryview(b).shape for b in self]
+        self.formats = list(formats) if formats else [memoryview(b).format for b in self]
+
+    @classmethod
+    def coerce(cls, message):
+        """Wrap a buffer or a list of buffers into a :class:`Frames` message."""
+        if isinstance(message, cls):
+            return message
+        return cls(message if isinstance(message, (list, tuple)) else [message])
+
+    def detached(self):
+        """A message holding copies of the payloads, so that the originals may be reused."""
+        dtypes = [
+            dtype or getattr(getattr(buf, 'dtype', None), 'str', None)
+            for buf, dtype in zip(self, self.dtypes)
+        ]
+        return Frames(
+            [memoryview(buf).tobytes() for buf in self],
+            meta=self.meta,
+            dtypes=dtypes,
+            shapes=self.shapes,
+            formats=self.formats,
+        )
+
+    def pack(self):
+        """Serialize the message into a header and a list of payload buffers."""
+        if not self:
+            raise ValueError('A binary event message needs at least one payload.')
+        descriptors = []
+        views = []
+        for buf, dtype, shape, fmt in zip(self, self.dtypes, self.shapes, self.formats):
+            view = memoryview(buf)
+            dtype = dtype or getattr(getattr(buf, 'dtype', None), 'str', None)
+            descriptors.append({'format': fmt, 'shape': list(shape), 'dtype': dtype})
+            # only non-contiguous payloads are copied
+            views.append(view if view.c_contiguous else memoryview(view.tobytes()))
+        return umsgpack.packb({'frames': descriptors, 'meta': self.meta}), views
+
+    @classmethod
+    def unpack(cls, header, frames):
+        """Rebuild a message from its header and received frames without copying."""
+        header = umsgpack.unpackb(header)
+        descriptors = header['frames']
+        views = []
+        for frame, desc in zip(frames, descriptors):
+            view = frame.buffer if isinstance(frame, zmq.Frame) else memoryview(frame)
+            try:
+                view = view.cast(desc['format'], desc['shape'])
+            except (TypeError, ValueError):
+                pass  # formats memoryview cannot represent stay raw bytes, see dtypes
+            views.append(view)
+        return cls(
+            views,
+            meta=header['meta'],
+            dtypes=[d['dtype'] for d in descriptors],
+            shapes=[tuple(d['shape']) for d in descriptors],
+            formats=[d['format'] for d in descriptors],
+        )
+
+    def arrays(self):
+        """The payloads as NumPy arrays sharing the received memory (requires NumPy)."""
+        import numpy
+
+        arrays = []
+        for view, dtype, shape in zip(self, self.dtypes, self.shapes):
+            if dtype:
+                arrays.append(numpy.frombuffer(view.cast('B'), dtype=dtype).reshape(shape))
+            else:
+                arrays.append(numpy.asarray(view))
+        return arrays
+
+
+class EventPublisher(object):
+    """Asynchronous, batched publish path for the :class:`EventSystem`.
+
+    Messages are put on a bounded in-memory queue by the emitting thread and
+    serialized and sent by a dedicated I/O thread, which drains the queue in
+    batches of up to ``batch_size`` messages per wakeup.
+
+    Args:
+        maxsize (int, optional): Capacity of the in-memory queue.
+        batch_size (int, optional): Maximum number of messages sent per wakeup.
+        policy (str, optional): What to do when the queue is full, either ``'drop'``
+            (discard the new message) or ``'block'`` (wait for free space).
+        sndhwm (int, optional): ZMQ send high-water mark of the publishing socket.
+        timeout (float, optional): Maximum time to wait for free space with the
+            ``'block'`` policy before dropping the message (``None`` waits forever).
+    """
+
+    policies = ('drop', 'block')
+
+    def __init__(self, maxsize=10000, batch_size=256, policy='drop', sndhwm=None, timeout=None):
+        if policy not in EventPublisher.policies:
+            raise ValueError(f'Unknown publish policy {policy!r} (use one of {EventPublisher.policies}).')
+        self.batch_size = max(1, int(batch_size))
+        self.policy = policy
+        self.sndhwm = sndhwm
+        self.timeout = timeout
+        self._queue = Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._putting = 0
+        self._queued = 0
+        self._sent = 0
+        self._dropped = 0
+
+    @property
+    def stats(self):
+        """Message counters of the publisher.
+
+        Returns:
+            dict: Number of ``queued``, ``sent`` and ``dropped`` messages, and the
+            current queue ``backlog``.
+        """
+        with self._lock:
+            return {
+                'queued': self._queued,
+                'sent': self._sent,
+                'dropped': self._dropped,
+                'backlog': self._queue.qsize(),
+            }
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._closed = False
+            self._thread = threading.Thread(target=self._io_loop, daemon=True)
+            self._thread.start()
+
+    def put(self, channel, message):
+        """Enqueue a message for publishing.
+
+        Returns:
+            bool: True if the message was queued, False if it was dropped, and None
+            if the publisher is stopping and no longer accepts messages.
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            self._putting += 1
+        queued = True
+        try:
+            if self.policy == 'block':
+                self._queue.put((channel, message), timeout=self.timeout)
+            else:
+                self._queue.put_nowait((channel, message))
+        except Full:
+            queued = False
+        finally:
+            with self._lock:
+                self._putting -= 1
+                if queued:
+                    self._queued += 1
+                else:
+                    self._dropped += 1
+                self._idle.notify_all()
+        return queued
+
+    def stop(self, timeout=None):
+        """Stop the I/O thread after the queued messages have been sent.
+
+        New messages are refused first, so that every message accepted by
+        :meth:`put` is sent before the thread finishes.
+
+        Args:
+            timeout (float, optional): Maximum time to wait for the queue to drain.
+
+        Returns:
+            bool: True if the I/O thread has finished.
+        """
+        with self._lock:
+            self._closed = True
+            self._idle.wait_for(lambda: not self._putting, timeout)
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+        self._thread = None
+        return True
+
+    def _io_loop(self):
+        sock = EventSystem._socket()
+        if self.sndhwm is not None:
+            with EventSystem._lock:
+                sock.setsockopt(zmq.SNDHWM, self.sndhwm)
+        flags = zmq.NOBLOCK if self.policy == 'drop' else 0
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.05)]
+            except Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            sent = 0
+            for channel, message in batch:
+                frames = EventSystem._pack(channel, message)
+                try:
+                    with EventSystem._lock:
+                        sock.send_multipart(frames, flags=flags, copy=False)
+                    sent += 1
+                    MESSAGES_SENT.inc(labels=(channel,))
+                except zmq.Again:
+                    MESSAGES_DROPPED.inc(labels=(channel,))
+            with self._lock:
+                self._sent += sent
+                self._dropped += len(batch) - sent
 
 
 class EventSystem(object):
+    """Process-wide publisher of the event bus.
+
+    The PUB socket is shared by the emitting threads and the I/O thread of the
+    :class:`EventPublisher`; ZMQ sockets are not thread-safe, so every use of it
+    holds :attr:`_lock`.
+    """
+
     addr = 'ipc:///tmp/snout.eventsystem.z'
     _ctx = None
     _sock = None
+    _publisher = None
+    _lock = threading.RLock()
 
     @classmethod
     def _ensurecontext(cls):
-        if not cls._ctx and not cls._sock:
-            cls._ctx = zmq.Context()
-            cls._sock = cls._ctx.socket(zmq.PUB)
-            cls._sock.bind(cls.addr)
+        with cls._lock:
+            if not cls._ctx and not cls._sock:
+                cls._ctx = zmq.Context.instance()
+                cls._sock = cls._ctx.socket(zmq.PUB)
+                cls._sock.bind(cls.addr)
 
     @classmethod
-    def emit(cls, channel, message):
+    def _socket(cls):
         cls._ensurecontext()
-        cls._sock.send_multipart([channel.encode('utf-8'), umsgpack.packb(message)])
+        return cls._sock
 
+    @staticmethod
+    def _pack(channel, message):
+        if isinstance(message, Frames):
+            header, views = message.pack()
+            return [channel.encode('utf-8'), header, *views]
+        return [channel.encode('utf-8'), umsgpack.packb(message)]
 
-class EventListener(object):
-    def __init__(self, handlers=None, start=False):
-        self._context = zmq.Context()
-        self._sock = self._context.socket(zmq.SUB)
-        self._sock.connect(EventSystem.addr)
-        self._stop = threading.Event()
-        self._listener = None
-        self.handlers = {}
+    @staticmethod
+    def _topic(frames):
+        topic = frames[0]
+        return (topic.bytes if isinstance(topic, zmq.Frame) else topic).decode('utf-8')
+
+    @staticmethod
+    def _unpack(frames):
+        if len(frames) > 2:
+            header = frames[1]
+            header = header.bytes if isinstance(header, zmq.Frame) else header
+            return Frames.unpack(header, frames[2:])
+        msg = frames[1]
+        return umsgpack.unpackb(msg.bytes if isinstance(msg, zmq.Frame) else msg)
+
+    @classmethod
+    def start_async(cls, **kwargs):
+        """Switch :meth:`emit` to the asynchronous, batched publish path.
+
+        Keyword arguments are passed on to :class:`EventPublisher`.
+
+        Returns:
+            EventPublisher: The running publisher.
+        """
+        with cls._lock:
+            if not cls._publisher:
+                cls._publisher = EventPublisher(**kwargs)
+                cls._publisher.start()
+            return cls._publisher
+
+    @classmethod
+    def stop_async(cls, timeout=None):
+        """Drain the asynchronous publisher and return to synchronous publishing.
+
+        The publisher stays installed until its I/O thread has finished; if that
+        takes longer than ``timeout``, it is left running and can be stopped again.
+        """
+        publisher = cls._publisher
+        if publisher and publisher.stop(timeout):
+            with cls._lock:
+                if cls._publisher is publisher:
+                    cls._publisher = None
+        return publisher
+
+    @classmethod
+    def emit(cls, channel, message, binary=False, track=False):
+        """Publish a message on a channel.
+
+        The payloads of a :class:`Frames` message are copied, so the caller may
+        reuse them once this returns, unless ``track`` is set.
+
+        Args:
+            channel (str): The channel (topic) of the message.
+            message: A msgpack-serializable message, or a :class:`Frames` binary message.
+            binary (bool, optional): Send ``message`` (a buffer or a list of buffers)
+                as a :class:`Frames` binary message.
+            track (bool, optional): Send the payloads without copying them, bypassing the
+                asynchronous publisher; they must not be modified until the returned
+                tracker is done.
+
+        Returns:
+            bool or zmq.MessageTracker: False if the asynchronous publisher dropped the
+            message, or the tracker of the message if ``track`` is set.
+        """
+        if binary:
+            message = Frames.coerce(message)
+        if track:
+            frames = cls._pack(channel, message)
+            with cls._lock:
+                tracker = cls._socket().send_multipart(frames, copy=False, track=True)
+            MESSAGES_SENT.inc(labels=(channel,))
+            return tracker
+        if isinstance(message, Frames):
+            message = message.detached()
+        publisher = cls._publisher
+        if publisher:
+            queued = publisher.put(channel, message)
+            if queued is False:
+                MESSAGES_DROPPED.inc(labels=(channel,))
+            if queued is not None:
+                return queued
+        frames = cls._pack(channel, message)
+        with cls._lock:
+            cls._socket().send_multipart(frames, copy=False)
+        MESSAGES_SENT.inc(labels=(channel,))
+        return True
+
+
+class BaseEventListener(object):
+    """Topic-to-handler mapping shared by the event listeners.
+
+    ZMQ subscriptions match by prefix, so messages whose topic has no handler of
+    its own are dispatched to the handler of the longest matching topic.
+
+    Subscriptions may change from any thread while the listener dispatches: the
+    handler mapping and its cache of resolved topics are replaced together on
+    every change, never modified in place.
+
+    Args:
+        handlers (dict, optional): Mapping of topics to callables receiving the message.
+    """
+
+    def __init__(self, handlers=None):
+        self._table = ({}, {})  # (handlers, resolved topics)
+        self._table_lock = threading.Lock()
         if isinstance(handlers, dict):
             for k, v in handlers.items():
-                if callable(v):
-                    self.handlers[k] = v
-                    self._sock.setsockopt_string(zmq.SUBSCRIBE, k)
-                else:
-                    raise TypeError(f'Provided event handler {v} is not callable.')
+                self.subscribe(k, v)
+
+    @property
+    def handlers(self):
+        """Read-only snapshot of the mapping of topics to handlers."""
+        return self._table[0]
+
+    def subscribe(self, topic, handler):
+        """Register ``handler`` for messages on ``topic``."""
+        if not callable(handler):
+            raise TypeError(f'Provided event handler {handler} is not callable.')
+        with self._table_lock:
+            handlers = dict(self._table[0])
+            new = topic not in handlers
+            handlers[topic] = handler
+            self._table = (handlers, {})
+            if new:
+                self._setsubscription(zmq.SUBSCRIBE, topic)
+
+    def unsubscribe(self, topic):
+        with self._table_lock:
+            handlers = dict(self._table[0])
+            if handlers.pop(topic, None) is not None:
+                self._table = (handlers, {})
+                self._setsubscription(zmq.UNSUBSCRIBE, topic)
+
+    def _setsubscription(self, option, topic):
+        raise NotImplementedError(
+            f'Please subclass BaseEventListener._setsubscription() in {self.__class__.__name__}.'
+        )
+
+    def _handler(self, topic):
+        handlers, resolved = self._table
+        try:
+            return resolved[topic]
+        except KeyError:
+            pass
+        handler = handlers.get(topic)
+        if handler is None:
+            matches = [k for k in handlers if topic.startswith(k)]
+            handler = handlers[max(matches, key=len)] if matches else None
+        # a stale resolution only ends up in the cache of the replaced mapping
+        resolved[topic] = handler
+        return handler
+
+    def _dispatch(self, handler, msg):
+        try:
+            handler(msg)
+        except Exception:
+            logger.exception(f'Event handler {handler!r} failed.')
+
+
+class EventListener(BaseEventListener):
+    """Poller-based event listener.
+
+    A single listener thread multiplexes any number of SUB sockets and
+    subscriptions through a :class:`zmq.Poller`. Ready sockets are drained in
+    bursts of up to ``burst`` messages with ``NOBLOCK``, and the loop wakes up at
+    least every ``poll_interval`` seconds so that :meth:`stop` takes effect
+    without waiting for another message. All sockets share the process-wide
+    :func:`zmq.Context.instance`.
+
+    Args:
+        handlers (dict, optional): Mapping of topics to callables receiving the message.
+        start (bool, optional): Start the listener thread right away.
+        addrs (list, optional): Endpoints to connect to (defaults to :attr:`EventSystem.addr`).
+        burst (int, optional): Maximum number of messages drained per socket and wakeup.
+        poll_interval (float, optional): Maximum time in seconds between stop checks.
+    """
+
+    def __init__(self, handlers=None, start=False, addrs=None, burst=64, poll_interval=0.1):
+        self._context = zmq.Context.instance()
+        self._poller = zmq.Poller()
+        self._socks = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener = None
+        self.burst = max(1, int(burst))
+        self.poll_interval = poll_interval
+        super().__init__(handlers)
+        for addr in addrs or [EventSystem.addr]:
+            self.add_socket(addr)
+        if start:
+            self.start()
+
+    @property
+    def running(self):
+        return self._listener is not None and self._listener.is_alive()
+
+    def _call(self, func, *args):
+        # ZMQ sockets are not thread-safe: while the listener thread runs, socket
+        # operations requested from other threads are deferred to its next wakeup.
+        if self.running and threading.current_thread() is not self._listener:
+            with self._lock:
+                self._pending.append((func, args))
+        else:
+            func(*args)
+
+    def _apply_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for func, args in pending:
+            func(*args)
+
+    def add_socket(self, addr):
+        """Connect an additional SUB socket to ``addr`` with all current subscriptions."""
+        self._call(self._add_socket, addr)
+
+    def _add_socket(self, addr):
+        sock = self._context.socket(zmq.SUB)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(addr)
+        for topic in self.handlers:
+            sock.setsockopt_string(zmq.SUBSCRIBE, topic)
+        self._socks.append(sock)
+        self._poller.register(sock, zmq.POLLIN)
+
+    def _setsubscription(self, option, topic):
+        self._call(self._setsockopt, option, topic)
+
+    def _setsockopt(self, option, topic):
+        for sock in self._socks:
+            sock.setsockopt_string(option, topic)
 
     def start(self):
-        self._listener = threading.Thread(target=self._listener_loop, daemon=True)
-        self._listener.start()
+        if not self.running:
+            self._stop.clear()
+            self._listener = threading.Thread(target=self._listener_loop, daemon=True)
+            self._listener.start()
 
     def _listener_loop(self):
         while not self._stop.is_set():
-            self.listen()
+            self._apply_pending()
+            self.listen(timeout=self.poll_interval)
+
+    def listen(self, timeout=None):
+        """Wait for messages and dispatch them to their handlers.
 
-    def listen(self):
-        rec = self._sock.recv_multipart()
-        if not self._stop.is_set():
-            handler = rec[0].decode('utf-8')
-            msg = umsgpack.unpackb(rec[1])
-            self.handlers[handler](msg)
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds (``None`` waits forever).
 
-    def stop(self):
+        Returns:
+            int: The number of dispatched messages.
+        """
+        events = self._poller.poll(None if timeout is None else int(timeout * 1000))
+        count = 0
+        for sock, _ in events:
+            for _ in range(self.burst):
+                try:
+                    rec = sock.recv_multipart(zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                if self._stop.is_set():
+                    return count
+                handler = self._handler(EventSystem._topic(rec))
+                if handler is not None:
+                    self._dispatch(handler, EventSystem._unpack(rec))
+                    count += 1
+        return count
+
+    def stop(self, timeout=1.0):
+        """Stop the listener thread.
+
+        Args:
+            timeout (float, optional): Maximum time in seconds to wait for the thread to finish.
+
+        Returns:
+            bool: True if the listener thread has finished.
+        """
         self._stop.set()
+        if self._listener and threading.current_thread() is not self._listener:
+            self._listener.join(timeout)
+        return not self.running
+
+    def close(self, timeout=1.0):
+        """Stop the listener and close its sockets."""
+        stopped = self.stop(timeout)
+        if stopped:
+            for sock in self._socks:
+                self._poller.unregister(sock)
+                sock.close()
+            self._socks = []
+        return stopped
+
+
+class AsyncEventSystem(object):
+    """asyncio-native counterpart of :class:`EventSystem`.
+
+    The publishing socket is created from a :mod:`zmq.asyncio` shadow of the
+    process-wide context. Only one of :class:`EventSystem` and
+    :class:`AsyncEventSystem` should bind a given ``addr`` per process.
+    """
+
+    addr = EventSystem.addr
+    _sock = None
+
+    @classmethod
+    def _socket(cls):
+        if not cls._sock:
+            cls._sock = zmq_asyncio.Context.shadow(zmq.Context.instance()).socket(zmq.PUB)
+            cls._sock.bind(cls.addr)
+        return cls._sock
+
+    @classmethod
+    async def emit(cls, channel, message, binary=False):
+        if binary:
+            message = Frames.coerce(message)
+        if isinstance(message, Frames):
+            message = message.detached()
+        await cls._socket().send_multipart(EventSystem._pack(channel, message), copy=False)
+        return True
+
+
+class AsyncEventListener(BaseEventListener):
+    """asyncio-native event listener.
+
+    The listener runs as a task on the current event loop, so any number of
+    listeners can share one loop. Handlers may be plain callables, which are
+    called inline, or coroutine functions, which run as tasks of which at most
+    ``max_concurrency`` run at once. When that limit is reached, the listener
+    stops receiving until a handler finishes.
+
+    Args:
+        handlers (dict, optional): Mapping of topics to callables or coroutine functions.
+        addrs (list, optional): Endpoints to connect to (defaults to :attr:`EventSystem.addr`).
+        burst (int, optional): Maximum number of messages drained per wakeup.
+        max_concurrency (int, optional): Maximum number of concurrently running coroutine handlers.
+    """
+
+    def __init__(self, handlers=None, addrs=None, burst=64, max_concurrency=64):
+        self._context = zmq_asyncio.Context.shadow(zmq.Context.instance())
+        self._sock = self._context.socket(zmq.SUB)
+        self._sock.setsockopt(zmq.LINGER, 0)
+        self._listener = None
+        self._tasks = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.burst = max(1, int(burst))
+        super().__init__(handlers)
+        for addr in addrs or [EventSystem.addr]:
+            self._sock.connect(addr)
+
+    def _setsubscription(self, option, topic):
+        self._sock.setsockopt_string(option, topic)
+
+    @property
+    def running(self):
+        return self._listener is not None and not self._listener.done()
+
+    def start(self):
+        """Start listening on the running event loop.
+
+        Returns:
+            asyncio.Task: The listener task.
+        """
+        if not self.running:
+            self._listener = asyncio.get_running_loop().create_task(self._listener_loop())
+        return self._listener
+
+    async def _listener_loop(self):
+        while True:
+            await self.listen()
+
+    async def _run(self, handler, msg):
+        try:
+            await handler(msg)
+        finally:
+            self._semaphore.release()
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('Event handler failed.', exc_info=task.exception())
+
+    async def listen(self, timeout=None):
+        """Wait for messages and dispatch them to their handlers.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds (``None`` waits forever).
+
+        Returns:
+            int: The number of dispatched messages.
+        """
+        if not await self._sock.poll(None if timeout is None else int(timeout * 1000)):
+            return 0
+        count = 0
+        for _ in range(self.burst):
+            try:
+                rec = await self._sock.recv_multipart(zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                break
+            handler = self._handler(EventSystem._topic(rec))
+            if handler is None:
+                continue
+            msg = EventSystem._unpack(rec)
+            if asyncio.iscoroutinefunction(handler):
+                await self._semaphore.acquire()
+                task = asyncio.get_running_loop().create_task(self._run(handler, msg))
+                self._tasks.add(task)
+                task.add_done_callback(self._done)
+            else:
+                self._dispatch(handler, msg)
+            count += 1
+        return count
+
+    async def stop(self, timeout=1.0):
+        """Stop listening and wait for running handlers to finish.
+
+        Args:
+            timeout (float, optional): Maximum time in seconds to wait for running handlers,
+                which are cancelled afterwards.
+        """
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._tasks:
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    async def close(self, timeout=1.0):
+        """Stop the listener and close its socket."""
+        await self.stop(timeout)
+        self._sock.close()
+
+
+class TopicNode(object):
+    __slots__ = ('children', 'handlers', 'subtree')
+
+    def __init__(self):
+        self.children = {}
+        self.handlers = {}  # handlers of patterns ending at this node
+        self.subtree = {}  # handlers of patterns ending with a trailing '*' below this node
+
+
+class TopicTable(object):
+    """Compiled topic dispatch table used by :class:`EventMgmtCapability`.
+
+    Handlers are registered on dotted topic patterns, kept in a trie:
+
+    - ``proto.event.sub`` matches exactly that topic,
+    - a top-level name like ``proto`` also catches every event of that type,
+    - ``*`` matches any single segment (``proto.*.sub``), and a trailing ``*``
+      any number of segments below its parent (``proto.*``).
+
+    Each handler is registered with an optional dispatch policy (see
+    :mod:`snout.api.dispatch`). The ``(handler, policy)`` pairs resolved for a
+    concrete topic are sorted by registration and cached as a tuple, so that
+    repeated dispatch of the same topic is a single dict lookup. The cache is
+    invalidated whenever a handler is registered or deregistered.
+
+    Args:
+        cache_size (int, optional): Maximum number of cached topics.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._root = TopicNode()
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._sequence = itertools.count()
+
+    def _node(self, pattern, create=False):
+        node = self._root
+        segments = pattern.split('.')
+        trailing = segments[-1] == '*'
+        if trailing:
+            segments.pop()
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                if not create:
+                    return None, trailing
+                child = node.children[segment] = TopicNode()
+            node = child
+        return node, trailing
+
+    def register(self, pattern, handler, policy=None):
+        with self._lock:
+            node, trailing = self._node(pattern, create=True)
+            (node.subtree if trailing else node.handlers)[handler] = (
+                next(self._sequence),
+                policy,
+            )
+            self._cache = {}
+
+    def deregister(self, pattern, handler):
+        with self._lock:
+            node, trailing = self._node(pattern)
+            if node is not None:
+                (node.subtree if trailing else node.handlers).pop(handler, None)
+                self._cache = {}
+
+    def resolve(self, topic):
+        """Handlers matching a concrete topic.
+
+        Returns:
+            tuple: The matching ``(handler, policy)`` pairs, in registration order.
+        """
+        try:
+            return self._cache[topic]
+        except KeyError:
+            pass
+        with self._lock:
+            entries = sorted(
+                (seq, handler, policy) for handler, (seq, policy) in self._match(topic).items()
+            )
+            resolved = tuple((handler, policy) for _, handler, policy in entries)
+            if len(self._cache) >= self.cache_size:
+                self._cache = {}
+            self._cache[topic] = resolved
+        return resolved
+
+    def _match(self, topic):
+        found = {}
+
+        def collect(handlers):
+            # a handler matching several patterns is used with its first registration
+            for handler, registration in handlers.items():
+                if handler not in found or registration[0] < found[handler][0]:
+                    found[handler] = registration
+
+        nodes = [self._root]
+        for depth, segment in enumerate(topic.split('.')):
+            matches = []
+            for node in nodes:
+                collect(node.subtree)
+                for child in (node.children.get(segment), node.children.get('*')):
+                    if child is not None:
+                        matches.append(child)
+                        if depth == 0:
+                            # top-level names catch all events of their type
+                            collect(child.handlers)
+            nodes = matches
+        for node in nodes:
+            collect(node.handlers)
+        return found
 
 
 class EventMgmtCapability(object):
@@ -62,29 +868,64 @@ class EventMgmtCapability(object):
 
     Objects inheriting from this class will be able to emit events, and to
     subscribe to events by registering event handlers.
+
+    Handlers are registered in one process-wide :class:`TopicTable`: a handler
+    receives the matching events emitted by any object, whichever object it was
+    registered through.
+
+    Attributes:
+        metrics_sample (int): Record the ``snout_events_emitted_total`` and
+            ``snout_event_handler_seconds`` metrics for one in this many emitted
+            events (0 disables them). Counts are scaled accordingly.
     """
 
-    _handlers = {}
+    metrics_sample = 0
+
+    _handlers = TopicTable()
+    _emitted = itertools.count()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    def registerEventHandler(self, name, handler):
-        self.__class__._handlers.setdefault(name, set()).add(handler)
+    def registerEventHandler(self, name, handler, policy=None):
+        """Register an event handler.
+
+        Args:
+            name (str): Event name or pattern (see :class:`TopicTable`).
+            handler (callable): The handler, called with the notification's arguments.
+            policy (DispatchPolicy, optional): How to run the handler, e.g. on a
+                :class:`~snout.api.dispatch.ThreadPoolDispatch`. By default, handlers
+                run inline on the emitting thread.
+        """
+        self.__class__._handlers.register(name, handler, policy)
 
     def deregisterEventHandler(self, name, handler):
-        if name in self.__class__._handlers and handler in self.__class__._handlers[name]:
-            self.__class__._handlers[name].remove(handler)
+        self.__class__._handlers.deregister(name, handler)
 
     def emitEvent(self, notification):
-        handlers = set()
-        # Consider handlers for this notification
-        handlers.update(self.__class__._handlers.get(notification.name, set()))
-        # Consider catch-all handlers for this event type
-        topevent = notification.name.split('.')[0]
-        handlers.update(self.__class__._handlers.get(topevent, set()))
-        for handler in handlers:
-            handler(*notification.args, **notification.kwargs)
+        sample = self.metrics_sample
+        if sample and next(EventMgmtCapability._emitted) % sample == 0:
+            return self._emitMeasured(notification, sample)
+        for handler, policy in self.__class__._handlers.resolve(notification.name):
+            if policy is None:
+                handler(*notification.args, **notification.kwargs)
+            else:
+                policy.submit(handler, notification.args, notification.kwargs)
+        return True
+
+    def _emitMeasured(self, notification, sample):
+        name = notification.name
+        EVENTS_EMITTED.inc(sample, (name,))
+        for handler, policy in self.__class__._handlers.resolve(name):
+            if policy is None:
+                start = time.perf_counter()
+                handler(*notification.args, **notification.kwargs)
+                HANDLER_SECONDS.observe(
+                    time.perf_counter() - start,
+                    (name, getattr(handler, '__qualname__', type(handler).__name__)),
+                )
+            else:
+                policy.submit(handler, notification.args, notification.kwargs)
         return True
 
     def eventName(self, proto, event):
@@ -106,5 +947,9 @@ class SnoutEventHandler(StreamHandler, EventMgmtCapability):
         self.eventname = eventname
 
     def emit(self, record):
-        msg = self.format(record)
-        self.emitEvent(Notification(self.eventname, msg))
+        # runs on the log pipeline's listener thread, which must survive failing handlers
+        try:
+            msg = self.format(record)
+            self.emitEvent(Notification(self.eventname, msg))
+        except Exception:
+            self.handleError(record)
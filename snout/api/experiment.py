@@ -3,6 +3,8 @@ from time import monotonic as timer
 from snout.api.agent import SnoutAgent, Status
 from snout.api.event import EventMgmtCapability
 from snout.api.factory import Factory
+from snout.api.scheduler import ExperimentScheduler, WorkItem
+from snout.api.sweep import ParameterSweep
 
 
 class ExperimentAPI(SnoutAgent):
@@ -24,6 +26,48 @@ class ExperimentAPI(SnoutAgent):
     def runs(self, value):
         self._runs = int(value)
 
+    @property
+    def sweep(self):
+        """The variations of the experiment's ``parameters``.
+
+        Returns:
+            ParameterSweep: The lazily enumerated parameter variations.
+        """
+        parameters = getattr(self, 'parameters', None) or {}
+        if getattr(self, '_sweep_parameters', None) is not parameters:
+            self._sweep = ParameterSweep(parameters)
+            self._sweep_parameters = parameters
+        return self._sweep
+
+    @property
+    def parameter_variations(self):
+        """The number of parameter variations."""
+        if getattr(self, '_parameter_variations', None) is not None:
+            return self._parameter_variations
+        return self.sweep.size
+
+    @parameter_variations.setter
+    def parameter_variations(self, value):
+        self._parameter_variations = value
+
+    def variations(self, runs=None, sweep=None):
+        """Generate the work of the experiment without materializing the sweep.
+
+        Args:
+            runs (int, optional): Number of runs of every variation (defaults to :attr:`runs`).
+            sweep (Sequence, optional): The variations, e.g. a shard of :attr:`sweep`.
+
+        Yields:
+            tuple: ``(runid, params)`` for every run of every variation.
+        """
+        runs = self.runs if runs is None else runs
+        sweep = self.sweep if sweep is None else sweep
+        runid = 0
+        for _ in range(runs):
+            for params in sweep:
+                yield runid, params
+                runid += 1
+
     @property
     def runstatus(self):
         if Status.Running in self.status:
@@ -42,9 +86,41 @@ class ExperimentAPI(SnoutAgent):
     def run(self):
         raise NotImplementedError('ExperimentAPI does not directly implement a run routine.')
 
-    def runall(self):
-        for _ in self.run():
-            self.wait_ready()
+    def instruments_for(self, runid, params):
+        """The instruments a run needs exclusively.
+
+        By default, every run needs all instruments of the experiment, so runs never
+        overlap. Override this to let runs on disjoint instruments run concurrently.
+
+        Returns:
+            iterable: The instruments (InstrumentAPI instances).
+        """
+        return [a for a in self.iter_depth_first() if isinstance(a, InstrumentAPI)]
+
+    def runall(self, workers=None):
+        """Run the experiment.
+
+        Args:
+            workers (int, optional): If given, :meth:`coordinate` the :meth:`variations` on
+                this many threads with an :class:`ExperimentScheduler` instead of
+                running :meth:`run` sequentially.
+
+        Returns:
+            ExperimentScheduler: The scheduler, with its results and throughput (None if
+            run sequentially).
+        """
+        if workers is None:
+            for _ in self.run():
+                self.wait_ready()
+            return None
+        scheduler = ExperimentScheduler(
+            lambda item: self.coordinate(item.params, item.runid), workers=workers
+        )
+        scheduler.run(
+            WorkItem(runid, params, self.instruments_for(runid, params))
+            for runid, params in self.variations()
+        )
+        return scheduler
 
 
 class ExperimentClock:
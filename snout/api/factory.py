@@ -1,10 +1,93 @@
-import pkg_resources
-from tabulate import tabulate
+import importlib
+import os
+import sys
+
+import appdirs
+
+from snout.api import lazymodule
+from snout.api.log import StaticLogger
+
+hashlib = lazymodule('hashlib')
+metadata = lazymodule('importlib.metadata')
+tabulate = lazymodule('tabulate')
+umsgpack = lazymodule('umsgpack')
+
+PLUGIN_GROUP = 'snout_plugins'
+
+
+class EntryPointRef(object):
+    """A lazily loaded plugin entry point.
+
+    Args:
+        name (str): Entry point name (``<base>_<variant>``).
+        value (str): Object reference (``module:attr``).
+    """
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+        self._loaded = None
+
+    @property
+    def module(self):
+        return self.value.partition(':')[0].strip()
+
+    @property
+    def attr(self):
+        return self.value.partition(':')[2].split('[')[0].strip()
+
+    def load(self):
+        """Import and return the referenced object."""
+        if self._loaded is None:
+            obj = importlib.import_module(self.module)
+            for part in filter(None, self.attr.split('.')):
+                obj = getattr(obj, part)
+            self._loaded = obj
+        return self._loaded
+
+    def __repr__(self):
+        return f'EntryPointRef({self.name!r}, {self.value!r})'
+
+
+class PluginDict(dict):
+    """Plugins by entry point name, each imported when its value is first accessed.
+
+    Holds :class:`EntryPointRef` objects, but item access, :meth:`get`,
+    :meth:`values` and :meth:`items` return the loaded plugins; :meth:`ref`
+    returns an entry point without importing it.
+    """
+
+    def __getitem__(self, name):
+        return dict.__getitem__(self, name).load()
+
+    def get(self, name, default=None):
+        ref = dict.get(self, name)
+        return default if ref is None else ref.load()
+
+    def values(self):
+        return [ref.load() for ref in dict.values(self)]
+
+    def items(self):
+        return [(name, ref.load()) for name, ref in dict.items(self)]
+
+    def ref(self, name):
+        return dict.__getitem__(self, name)
 
 
 class Factory(object):
+    """Find and instantiate plugins registered in the ``snout_plugins`` entry point group.
+
+    Plugins are listed without importing them; a plugin is only imported when
+    :meth:`instance` resolves it or its value in :meth:`plugins` is accessed.
+    The entry points of all installed distributions are indexed in a cache
+    file, which is reused as long as the distribution metadata on ``sys.path``
+    is unchanged.
+    """
 
     _plugins = {}
+    _index = {}
+    _indexed = None
+    _index_path = None
 
     @staticmethod
     def _print_plugin_table(plugins):
@@ -12,29 +95,143 @@ class Factory(object):
             return k[-1] == '_'
 
         def k_basename(k):
-            return k.split('_')[0]
+            return k.partition('_')[0]
 
         def k_keyword(k):
-            return k.split('_')[1]
+            return k.partition('_')[2]
 
-        return tabulate(
+        return tabulate.tabulate(
             [
-                [k_basename(k), k_keyword(k), v.__module__, v.__name__, k_default(k)]
+                [k_basename(k), k_keyword(k), v.module, v.attr, k_default(k)]
                 for k, v in plugins.items()
             ],
             headers=['Basename', 'Keyword', 'Module', 'Class', 'Default'],
         )
 
+    @classmethod
+    def index_path(cls):
+        return cls._index_path or os.sep.join([appdirs.user_cache_dir('Snout'), 'plugins.msgpack'])
+
+    @staticmethod
+    def _index_key():
+        # adding, removing or upgrading a distribution touches its metadata
+        # directory (and the directory containing it)
+        digest = hashlib.sha1()
+        for entry in sys.path:
+            try:
+                digest.update(f'{entry}:{os.stat(entry or ".").st_mtime_ns}'.encode('utf-8'))
+                with os.scandir(entry or '.') as it:
+                    for item in it:
+                        if item.name.endswith(('.dist-info', '.egg-info')):
+                            digest.update(f'{item.name}:{item.stat().st_mtime_ns}'.encode('utf-8'))
+                            try:
+                                mtime = os.stat(os.sep.join([item.path, 'entry_points.txt']))
+                                digest.update(str(mtime.st_mtime_ns).encode('utf-8'))
+                            except OSError:
+                                pass
+            except OSError:
+                continue
+        return digest.hexdigest()
+
+    @staticmethod
+    def _scan():
+        try:
+            entry_points = metadata.entry_points(group=PLUGIN_GROUP)
+        except TypeError:  # Python < 3.10
+            entry_points = metadata.entry_points().get(PLUGIN_GROUP, [])
+        return {ep.name: ep.value for ep in entry_points}
+
+    @classmethod
+    def _read_index(cls, key):
+        try:
+            with open(cls.index_path(), 'rb') as f:
+                index = umsgpack.unpack(f)
+            if index.get('key') == key:
+                return index['plugins']
+        except (OSError, umsgpack.UnpackException, AttributeError, KeyError):
+            pass
+        return None
+
+    @classmethod
+    def _write_index(cls, key, plugins):
+        path = cls.index_path()
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                umsgpack.pack({'key': key, 'plugins': plugins}, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the index is only an optimization
+
     @classmethod
     def plugins(cls):
+        """The registered plugins, by entry point name.
+
+        Returns:
+            PluginDict: Maps entry point names to the plugins, imported on access.
+        """
+        return PluginDict(cls.entry_points())
+
+    @classmethod
+    def entry_points(cls):
+        """The registered plugins, by entry point name, without importing them.
+
+        Returns:
+            dict: Maps entry point names to :class:`EntryPointRef` objects.
+        """
         if not cls._plugins:
-            for plugin in pkg_resources.iter_entry_points('snout_plugins'):
-                cls._plugins[plugin.name] = plugin.load()
+            key = cls._index_key()
+            plugins = cls._read_index(key)
+            if plugins is None:
+                plugins = cls._scan()
+                cls._write_index(key, plugins)
+            cls._plugins = {name: EntryPointRef(name, value) for name, value in plugins.items()}
         return cls._plugins
 
+    @classmethod
+    def index(cls):
+        """The registered plugins, by ``(base, variant)``.
+
+        Entry point names are split at their first underscore, so variants may
+        contain underscores. Names without an underscore are skipped.
+
+        Returns:
+            dict: Maps ``(base, variant)`` tuples to :class:`EntryPointRef` objects.
+        """
+        plugins = cls.entry_points()
+        if cls._indexed is not plugins:
+            index = {}
+            for name, ref in plugins.items():
+                base, sep, variant = name.partition('_')
+                if not sep:
+                    StaticLogger.logger.warning(
+                        f'Ignoring plugin {name} ({ref.value}): not named <base>_<variant>.'
+                    )
+                    continue
+                index[(base, variant)] = ref
+            cls._index, cls._indexed = index, plugins
+        return cls._index
+
+    @classmethod
+    def resolve_many(cls, requests):
+        """Resolve many plugins at once.
+
+        Args:
+            requests (iterable): ``(base, variant)`` tuples.
+
+        Returns:
+            list: The plugin of every request, or None if it is not registered.
+        """
+        index = cls.index()
+        return [
+            ref.load() if ref else None
+            for ref in (index.get((main, str(variant or ''))) for main, variant in requests)
+        ]
+
     @classmethod
     def listall(cls):
-        cls._print_plugin_table(cls.plugins())
+        cls._print_plugin_table(cls.entry_points())
 
     def __init__(self, main, variant=None):
         self.main = main
@@ -42,11 +239,14 @@ class Factory(object):
 
     def ls(self, listall=False, ret=False):
         if listall:
-            result = self.__class__._print_plugin_table(self.plugins())
+            result = self.__class__._print_plugin_table(self.entry_points())
         else:
             result = self.__class__._print_plugin_table(
                 dict(
-                    filter(lambda elem: elem[0].startswith(f'{self.main}_'), self.plugins().items())
+                    filter(
+                        lambda elem: elem[0].startswith(f'{self.main}_'),
+                        self.entry_points().items(),
+                    )
                 )
             )
         if ret:
@@ -54,11 +254,6 @@ class Factory(object):
         print(result)
 
     def instance(self, variant=None):
-        variant = variant or self.variant
-        if not variant:
-            variant = ''
-        for k, v in self.plugins().items():
-            main, var = k.split('_')
-            if main == self.main and var == str(variant):
-                return v
-        return None
+        variant = variant or self.variant or ''
+        ref = self.index().get((self.main, str(variant)))
+        return ref.load() if ref else None
@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class AppHierarchy(object):
     def __init__(self, *args, **kwargs):
         super().__init__()
@@ -10,15 +13,32 @@ class AppHierarchy(object):
 
     @parent.setter
     def parent(self, value):
+        old = getattr(self, '_parent', None)
+        if value is not None and value is old:
+            return
         if not value:
             self._parent = None
         elif isinstance(value, AppHierarchy):
+            ancestor = value
+            while ancestor is not None:
+                if ancestor is self:
+                    raise ValueError(
+                        f'{self.__class__.__name__} cannot be reparented into its own subtree.'
+                    )
+                ancestor = ancestor.parent
             self._parent = value
             self._parent.children.append(self)
         else:
             raise TypeError(
                 f'The parent of {self.__class__.__name__} must be an instance of SnoutAgent or None.'
             )
+        if old is not None and self in old.children:
+            old.children.remove(self)
+        self._reparented()
+
+    def _reparented(self):
+        """Hook called after the parent of the AppHierarchy object was set."""
+        pass
 
     @property
     def children(self):
@@ -28,3 +48,27 @@ class AppHierarchy(object):
             AppHierarchy object: Children of this AppHierarchy object.
         """
         return self._children
+
+    def iter_depth_first(self):
+        """Iterate over the subtree of the AppHierarchy object in depth-first pre-order.
+
+        Yields:
+            AppHierarchy object: This object, then its descendants.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def iter_breadth_first(self):
+        """Iterate over the subtree of the AppHierarchy object level by level.
+
+        Yields:
+            AppHierarchy object: This object, then its descendants.
+        """
+        queue = deque([self])
+        while queue:
+            node = queue.popleft()
+            yield node
+            queue.extend(node.children)
@@ -1,18 +1,29 @@
+import atexit
+import copy
 import functools
+import itertools
 import logging
 import os
+import sys
+import threading
 from pathlib import Path
+from queue import Queue
 
 import appdirs
-import arrow
-from zmq.log.handlers import PUBHandler
 
-from snout.api import classproperty
+from snout.api import classproperty, lazymodule
 from snout.api.event import SnoutEventHandler
+from snout.api.logstore import LogStoreHandler, default_store_path
+from snout.api.logtransport import LogPublisher
+
+arrow = lazymodule('arrow')
+handlers = lazymodule('logging.handlers')
 
 LOG_LEVEL_FILE = logging.DEBUG
 LOG_LEVEL_STREAM = logging.ERROR  # logging.DEBUG
 LOG_LEVEL_EVENT = logging.DEBUG
+LOG_LEVEL_STORE = logging.DEBUG
+LOG_FORMAT = '%(asctime)s - %(agent)s - %(levelname)s - %(message)s'
 
 
 class StaticLogger:
@@ -24,56 +35,171 @@ class StaticLogger:
         if not cls._logger:
             cls._logger = logging.getLogger('Snout')
             cls._logger.setLevel(LOG_LEVEL_STREAM)
-            ch = logging.StreamHandler()
-            ch.setLevel(LOG_LEVEL_STREAM)
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            ch.setFormatter(formatter)
-            cls._logger.addHandler(ch)
+            LogPipeline.attach(cls._logger)
         return cls._logger
 
 
-class Logger(object):
-    """Logger provides universal logging functionality to all application classes.
+class StderrHandler(logging.StreamHandler):
+    """Console handler writing to whatever ``sys.stderr`` is at the time of logging."""
 
-    Attributes:
-        logger (logging.Logger): A global logger for Snout that can be used outside of class instances
-    """
+    def __init__(self, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
 
-    _zh = None
+    @property
+    def stream(self):
+        return sys.stderr
 
-    def __init__(self, *args, **kwargs):
-        if not Logger._zh:
-            Logger._zh = PUBHandler('tcp://127.0.0.1:12345')
 
-        # TODO: Fine tune logging setup https://docs.python.org/3/howto/logging-cookbook.html
+class AgentFilter(logging.Filter):
+    """Tag records that were not logged through a :class:`Logger` with their logger name."""
 
-        self.agent = kwargs.get('agent', None)
+    def filter(self, record):
+        if not hasattr(record, 'agent'):
+            record.agent = record.name
+        return True
+
+
+class DeferredQueueHandler(logging.Handler):
+    """Queue handler that leaves message formatting to the listener thread.
+
+    Unlike :class:`logging.handlers.QueueHandler`, whose ``prepare()`` merges the
+    message and its arguments on the logging thread, the record is enqueued with
+    ``msg`` and ``args`` untouched, so ``%r`` and :class:`lazy` arguments are
+    only rendered by the sinks. Arguments are therefore rendered in the state
+    they have when the listener gets to them. Exception information is
+    rendered to ``exc_text`` right away, as tracebacks keep frames alive and
+    cannot be pickled.
+    """
+
+    _exc_formatter = logging.Formatter()
 
-        log_level_file = kwargs.get('log_level_file', LOG_LEVEL_FILE)
-        log_level_stream = kwargs.get('log_level_file', LOG_LEVEL_STREAM)
-        log_level_event = kwargs.get('log_level_ui', LOG_LEVEL_EVENT)
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    def emit(self, record):
         try:
-            self._logger = logging.getLogger(self.fullname)
-        except AttributeError:
-            self._logger = logging.getLogger(self.__class__.__name__)
-        self._logger.setLevel(logging.DEBUG)
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
 
-        # create formatter and add it to the handlers
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        # Create File Handler
-        self._fh_setup(formatter, log_level=log_level_file)
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-        # Create CLI Handler
-        self._ch_setup(formatter, log_level=log_level_stream)
 
-        # Create Event-based Handler
-        self._eh_setup(formatter, log_level=log_level_event)
+class LogPipeline(object):
+    """Process-wide, queue-based logging pipeline.
 
-        # ZMQ Handler
-        self._zh_setup(formatter, log_level=log_level_event)
+    All loggers share a single :class:`logging.handlers.QueueHandler`, so that
+    logging only enqueues a record on the caller's thread. A
+    :class:`logging.handlers.QueueListener` thread hands the records to one
+    shared set of sinks (log file, console, events, ZMQ and the structured log
+    store), which are created
+    once per process.
 
-    def _fh_setup(self, formatter, log_level=LOG_LEVEL_FILE):
-        log_dir = appdirs.user_log_dir('Snout')
+    Attributes:
+        log_dir (str): Directory of the log file and the log store (defaults to the
+            user log directory); takes effect when the pipeline is (re)started.
+    """
+
+    log_dir = None
+
+    _queue = None
+    _handler = None
+    _listener = None
+    _logger = None
+    _attached = []
+    _lock = threading.RLock()
+
+    @classmethod
+    def _ensurepipeline(cls):
+        with cls._lock:
+            if not cls._listener:
+                formatter = logging.Formatter(LOG_FORMAT)
+                sinks = [
+                    cls._fh_setup(formatter, log_level=LOG_LEVEL_FILE),
+                    cls._ch_setup(formatter, log_level=LOG_LEVEL_STREAM),
+                    cls._eh_setup(formatter, log_level=LOG_LEVEL_EVENT),
+                    cls._zh_setup(formatter, log_level=LOG_LEVEL_EVENT),
+                    cls._sh_setup(log_level=LOG_LEVEL_STORE),
+                ]
+                cls._queue = Queue()
+                cls._handler = DeferredQueueHandler(cls._queue)
+                cls._handler.addFilter(AgentFilter())
+                cls._handler.setLevel(min(sink.level for sink in sinks))
+                cls._listener = handlers.QueueListener(
+                    cls._queue, *sinks, respect_handler_level=True
+                )
+                cls._listener.start()
+                for logger in cls._attached:
+                    logger.addHandler(cls._handler)
+                atexit.register(cls.stop)
+
+    @classmethod
+    def handler(cls):
+        """The shared handler enqueueing records into the pipeline."""
+        if not cls._listener:
+            cls._ensurepipeline()
+        return cls._handler
+
+    @classmethod
+    def attach(cls, logger):
+        """Route the records of a :class:`logging.Logger` through the pipeline."""
+        with cls._lock:
+            if logger not in cls._attached:
+                cls._attached.append(logger)
+                logger.addHandler(cls.handler())
+        return logger
+
+    @classmethod
+    def logger(cls):
+        """The shared :class:`logging.Logger` behind all :class:`Logger` instances."""
+        if not cls._listener:
+            cls._ensurepipeline()
+        if not cls._logger:
+            logger = logging.getLogger('Snout.agents')
+            # records below the level of every sink are discarded before they are built
+            logger.setLevel(cls._handler.level)
+            logger.propagate = False
+            cls._logger = cls.attach(logger)
+        return cls._logger
+
+    @classmethod
+    def flush(cls):
+        """Wait until all enqueued records have been handled and flushed by the sinks."""
+        with cls._lock:
+            listener = cls._listener
+        if listener:
+            listener.queue.join()
+            for sink in listener.handlers:
+                sink.flush()
+
+    @classmethod
+    def stop(cls):
+        """Handle the remaining records, then stop the listener thread and close the sinks.
+
+        The pipeline is set up again on the next use.
+        """
+        with cls._lock:
+            if cls._listener:
+                for logger in cls._attached:
+                    logger.removeHandler(cls._handler)
+                cls._listener.stop()
+                for sink in cls._listener.handlers:
+                    sink.close()
+                atexit.unregister(cls.stop)
+                cls._listener = None
+                cls._handler = None
+                cls._queue = None
+
+    @staticmethod
+    def _fh_setup(formatter, log_level=LOG_LEVEL_FILE):
+        log_dir = LogPipeline.log_dir or appdirs.user_log_dir('Snout')
         Path(log_dir).mkdir(exist_ok=True, parents=True)
         log_filename = '{}.log'.format(
             arrow.now('America/New_York').format('YYYY-MM-DD'),
@@ -82,30 +208,55 @@ class Logger(object):
         fh = logging.FileHandler(log_fullpath)
         fh.setLevel(log_level)
         fh.setFormatter(formatter)
-        self._logger.addHandler(fh)
+        return fh
 
-    def _ch_setup(self, formatter, log_level=LOG_LEVEL_STREAM):
+    @staticmethod
+    def _ch_setup(formatter, log_level=LOG_LEVEL_STREAM):
         # create console handler with a higher log level
-        ch = logging.StreamHandler()
+        ch = StderrHandler()
         ch.setLevel(log_level)
         ch.setFormatter(formatter)
-        self._logger.addHandler(ch)
+        return ch
 
-    def _eh_setup(self, formatter, log_level=LOG_LEVEL_EVENT):
+    @staticmethod
+    def _eh_setup(formatter, log_level=LOG_LEVEL_EVENT):
         eh = SnoutEventHandler()
         eh.setLevel(log_level)
         eh.setFormatter(formatter)
-        self._logger.addHandler(eh)
+        return eh
 
-    def _zh_setup(self, formatter, log_level=LOG_LEVEL_EVENT):
-        zh = Logger._zh
+    @staticmethod
+    def _zh_setup(formatter, log_level=LOG_LEVEL_EVENT):
+        zh = LogPublisher()
         zh.setLevel(log_level)
         zh.setFormatter(formatter)
-        # zh.setFormatter(
-        #     logging.Formatter(formatter._fmt + ' (%(pathname)s, line #%(lineno)d)'), logging.DEBUG
-        # )
-        zh.setRootTopic(self.fullname)
-        self._logger.addHandler(zh)
+        return zh
+
+    @staticmethod
+    def _sh_setup(log_level=LOG_LEVEL_STORE):
+        sh = LogStoreHandler(default_store_path(LogPipeline.log_dir))
+        sh.setLevel(log_level)
+        return sh
+
+
+class Logger(object):
+    """Logger provides universal logging functionality to all application classes.
+
+    Logger instances are cheap adapters: they carry the name of their agent and
+    enqueue records into the process-wide :class:`LogPipeline`, where the name
+    is available to the sinks as the ``agent`` record attribute.
+
+    Attributes:
+        logger (logging.Logger): A global logger for Snout that can be used outside of class instances
+    """
+
+    @classproperty
+    def logger(cls):
+        return StaticLogger.logger
+
+    def __init__(self, *args, **kwargs):
+        self.agent = kwargs.get('agent', None)
+        self._logger = LogPipeline.logger()
 
     @property
     def name(self):
@@ -116,11 +267,6 @@ class Logger(object):
         """
         try:
             return self.agent.fullname
-            # me = f'{self.__module__}.{self.__class__.__name__}'
-            # if self._nickname:
-            #     me += f'_{self._nickname}'
-            # try:
-            #     return '.'.join([self.parent.name, me])
         except AttributeError:
             return f'{self.__module__}.{self.__class__.__name__}'
 
@@ -133,40 +279,93 @@ class Logger(object):
         """
         return f'{self.name}@{hex(id(self))}'
 
-    def debug(self, *args, **kwargs):
-        return self._logger.debug(*args, *kwargs)
+    def isEnabledFor(self, level):
+        """Whether records of ``level`` are handled at all (cached by :mod:`logging`)."""
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level, msg, args, **kwargs):
+        if self._logger.isEnabledFor(level):
+            extra = kwargs.pop('extra', None)
+            extra = dict(extra, agent=self.name) if extra else {'agent': self.name}
+            kwargs.setdefault('stacklevel', 3)
+            self._logger.log(level, msg, *args, extra=extra, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        return self._log(logging.DEBUG, msg, args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        return self._log(logging.INFO, msg, args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        return self._log(logging.WARNING, msg, args, **kwargs)
 
-    def info(self, *args, **kwargs):
-        return self._logger.info(*args, *kwargs)
+    def error(self, msg, *args, **kwargs):
+        return self._log(logging.ERROR, msg, args, **kwargs)
 
-    def warning(self, *args, **kwargs):
-        return self._logger.warning(*args, *kwargs)
+    def exception(self, msg, *args, exc_info=True, **kwargs):
+        return self._log(logging.ERROR, msg, args, exc_info=exc_info, **kwargs)
 
-    def error(self, *args, **kwargs):
-        return self._logger.error(*args, *kwargs)
+    def critical(self, msg, *args, **kwargs):
+        return self._log(logging.CRITICAL, msg, args, **kwargs)
 
-    def exception(self, *args, **kwargs):
-        return self._logger.exception(*args, *kwargs)
+    def log(self, level, msg, *args, **kwargs):
+        return self._log(level, msg, args, **kwargs)
 
-    def critical(self, *args, **kwargs):
-        return self._logger.critical(*args, *kwargs)
 
-    def log(self, *args, **kwargs):
-        return self._logger.log(*args, *kwargs)
+class lazy(object):
+    """Defer building a log message argument until a sink formats the record.
+
+    Example:
+        ``logger.debug('State: %s', lazy(agent.dump_state))`` only calls
+        ``agent.dump_state()`` if DEBUG records are handled at all.
+    """
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+    def __repr__(self):
+        return repr(self.func(*self.args))
 
 
 # Debug Wrapper
-def debug(func):
-    """Print the function signature and return value"""
+def trace(func=None, level=logging.DEBUG, sample=1, logger=None):
+    """Log the signature and return value of calls to the decorated function.
+
+    The level check is the only cost while ``level`` is disabled. When it is
+    enabled, only every ``sample``-th call is traced.
+
+    Args:
+        level (int, optional): Log level of the trace records.
+        sample (int, optional): Trace one in ``sample`` calls.
+        logger (optional): Logger to trace to (defaults to :attr:`Logger.logger`).
+    """
+    if sample < 1:
+        raise ValueError(f'trace() needs sample >= 1 ({sample} provided).')
+    if func is None:
+        return functools.partial(trace, level=level, sample=sample, logger=logger)
+    calls = itertools.count()
 
     @functools.wraps(func)
-    def wrapper_debug(*args, **kwargs):
-        args_repr = [repr(a) for a in args]  # 1
-        kwargs_repr = [f'{k}={v!r}' for k, v in kwargs.items()]  # 2
-        signature = ', '.join(args_repr + kwargs_repr)  # 3
-        Logger.logger.debug(f'Calling {func.__name__}({signature})')
+    def wrapper_trace(*args, **kwargs):
+        log = logger or StaticLogger.logger
+        if not log.isEnabledFor(level) or next(calls) % sample:
+            return func(*args, **kwargs)
+        args_repr = [repr(a) for a in args]
+        kwargs_repr = [f'{k}={v!r}' for k, v in kwargs.items()]
+        log.log(level, 'Calling %s(%s)', func.__name__, ', '.join(args_repr + kwargs_repr))
         value = func(*args, **kwargs)
-        Logger.logger.debug(f'{func.__name__!r} returned {value!r}')  # 4
+        log.log(level, '%r returned %r', func.__name__, value)
         return value
 
-    return wrapper_debug
+    return wrapper_trace
+
+
+def debug(func):
+    """Print the function signature and return value"""
+    return trace(func)
@@ -0,0 +1,47 @@
+import logging
+
+import arrow
+import click
+
+from snout.api.logstore import LogStore
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+def _timestamp(value):
+    return arrow.get(value).timestamp() if value else None
+
+
+@click.command()
+@click.option('--agent', '-a', default=None, help='Agent fullname (or prefix with --prefix).')
+@click.option('--prefix', is_flag=True, help='Match agent names by prefix.')
+@click.option('--since', '-s', default=None, help='Earliest time (ISO 8601).')
+@click.option('--until', '-u', default=None, help='Latest time (ISO 8601).')
+@click.option(
+    '--level',
+    '-l',
+    default=None,
+    type=click.Choice(LEVELS, case_sensitive=False),
+    help='Minimum log level.',
+)
+@click.option('--path', '-p', default=None, help='Log store directory.')
+def cli(agent, prefix, since, until, level, path):
+    """Query the Snout structured log store."""
+    levelno = logging.getLevelName(level.upper()) if level else None
+    for record in LogStore(path).query(
+        agent=agent, prefix=prefix, start=_timestamp(since), end=_timestamp(until), level=levelno
+    ):
+        click.echo(
+            ' - '.join(
+                [
+                    arrow.get(record['t']).isoformat(),
+                    record['agent'],
+                    logging.getLevelName(record['level']),
+                    record['msg'],
+                ]
+            )
+        )
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,275 @@
+import itertools
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from glob import glob
+from pathlib import Path
+
+import appdirs
+
+from snout.api import lazymodule
+
+umsgpack = lazymodule('umsgpack')
+
+BLOCK_HEADER = struct.Struct('>I')
+
+
+def default_store_path(log_dir=None):
+    return os.sep.join([log_dir or appdirs.user_log_dir('Snout'), 'store'])
+
+
+def record_as_dict(record):
+    """Convert a :class:`logging.LogRecord` into a structured log store record."""
+    return {
+        't': record.created,
+        'agent': getattr(record, 'agent', record.name),
+        'level': record.levelno,
+        'logger': record.name,
+        'msg': record.getMessage(),
+        'exc': record.exc_text,
+    }
+
+
+class LogStoreWriter(object):
+    """Append structured log records to a log store.
+
+    Records are msgpack-serialized and written in zlib-compressed blocks of up to
+    ``block_records`` records to segment files (``*.seg``), which are rotated once
+    they exceed ``max_segment_bytes``. For every block, a sidecar index file
+    (``*.idx``) receives an entry with the block's offset, its time range and the
+    time range of every agent in it, so that readers only decompress the blocks
+    they need.
+
+    Args:
+        path (str, optional): Directory of the log store.
+        max_segment_bytes (int, optional): Size after which a segment is rotated.
+        block_records (int, optional): Maximum number of records per block.
+        backup_count (int, optional): Number of segments to keep (``None`` keeps all).
+    """
+
+    # distinguishes segments created in the same millisecond by one process
+    _sequence = itertools.count()
+
+    def __init__(self, path=None, max_segment_bytes=16 << 20, block_records=512, backup_count=None):
+        self.path = path or default_store_path()
+        self.max_segment_bytes = max_segment_bytes
+        self.block_records = block_records
+        self.backup_count = backup_count
+        self._buffer = []
+        self._segment = None
+        self._index = None
+        self._lock = threading.Lock()
+        Path(self.path).mkdir(parents=True, exist_ok=True)
+
+    def _rotate(self):
+        self._close_segment()
+        name = f'{int(time.time() * 1000):013d}-{os.getpid()}-{next(self._sequence):06d}'
+        self._segment = open(os.sep.join([self.path, f'{name}.seg']), 'ab')
+        self._index = open(os.sep.join([self.path, f'{name}.idx']), 'ab')
+        if self.backup_count:
+            for old in LogStore(self.path).segments()[: -self.backup_count]:
+                for ext in ('.seg', '.idx'):
+                    try:
+                        os.remove(old + ext)
+                    except FileNotFoundError:
+                        pass
+
+    def _close_segment(self):
+        for f in (self._segment, self._index):
+            if f:
+                f.close()
+        self._segment = self._index = None
+
+    def write(self, record):
+        """Buffer a record, writing a block once ``block_records`` are buffered."""
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.block_records:
+                self._write_block()
+
+    def write_many(self, records):
+        with self._lock:
+            self._buffer.extend(records)
+            while len(self._buffer) >= self.block_records:
+                self._write_block()
+
+    def flush(self):
+        """Write all buffered records."""
+        with self._lock:
+            while self._buffer:
+                self._write_block()
+
+    def _write_block(self):
+        block, self._buffer = (
+            self._buffer[: self.block_records],
+            self._buffer[self.block_records :],
+        )
+        if not self._segment or self._segment.tell() >= self.max_segment_bytes:
+            self._rotate()
+        agents = {}
+        for record in block:
+            t, agent = record['t'], record['agent']
+            if agent in agents:
+                tmin, tmax = agents[agent]
+                agents[agent] = [min(tmin, t), max(tmax, t)]
+            else:
+                agents[agent] = [t, t]
+        data = zlib.compress(umsgpack.packb(block))
+        offset = self._segment.tell()
+        self._segment.write(BLOCK_HEADER.pack(len(data)) + data)
+        self._segment.flush()
+        timestamps = [record['t'] for record in block]
+        entry = {
+            'offset': offset,
+            'length': BLOCK_HEADER.size + len(data),
+            'count': len(block),
+            'tmin': min(timestamps),
+            'tmax': max(timestamps),
+            'agents': agents,
+        }
+        self._index.write(umsgpack.packb(entry))
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._close_segment()
+
+
+class LogStore(object):
+    """Read and query a log store written by :class:`LogStoreWriter`.
+
+    Args:
+        path (str, optional): Directory of the log store.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+
+    def segments(self):
+        """Base paths (without extension) of all segments, oldest first."""
+        return [p[: -len('.seg')] for p in sorted(glob(os.sep.join([self.path, '*.seg'])))]
+
+    @staticmethod
+    def index(segment):
+        """The index entries of a segment."""
+        entries = []
+        try:
+            with open(segment + '.idx', 'rb') as f:
+                while True:
+                    entries.append(umsgpack.unpack(f))
+        except (FileNotFoundError, umsgpack.InsufficientDataException):
+            pass  # the end of the index, or an entry cut short by a crash
+        return entries
+
+    @staticmethod
+    def _matches(name, agent, prefix):
+        return name.startswith(agent) if prefix else name == agent
+
+    def query(self, agent=None, prefix=False, start=None, end=None, level=None):
+        """Iterate over the records matching all given criteria, in write order.
+
+        Only blocks whose index entry matches the agent and time window are read.
+
+        Args:
+            agent (str, optional): Agent fullname, or a prefix of it if ``prefix`` is set.
+            prefix (bool, optional): Match agent names by prefix.
+            start (float, optional): Earliest timestamp.
+            end (float, optional): Latest timestamp.
+            level (int, optional): Minimum log level.
+
+        Yields:
+            dict: The matching records.
+        """
+        for segment in self.segments():
+            entries = []
+            for entry in self.index(segment):
+                if agent is not None:
+                    ranges = [
+                        r for a, r in entry['agents'].items() if self._matches(a, agent, prefix)
+                    ]
+                else:
+                    ranges = [[entry['tmin'], entry['tmax']]]
+                if any(
+                    (start is None or tmax >= start) and (end is None or tmin <= end)
+                    for tmin, tmax in ranges
+                ):
+                    entries.append(entry)
+            if not entries:
+                continue
+            with open(segment + '.seg', 'rb') as f:
+                for entry in entries:
+                    f.seek(entry['offset'] + BLOCK_HEADER.size)
+                    block = umsgpack.unpackb(
+                        zlib.decompress(f.read(entry['length'] - BLOCK_HEADER.size))
+                    )
+                    for record in block:
+                        if agent is not None and not self._matches(record['agent'], agent, prefix):
+                            continue
+                        if start is not None and record['t'] < start:
+                            continue
+                        if end is not None and record['t'] > end:
+                            continue
+                        if level is not None and record['level'] < level:
+                            continue
+                        yield record
+
+
+class LogStoreHandler(logging.Handler):
+    """Logging sink writing structured records into a log store.
+
+    Blocks are written when they are full, when ``flush_interval`` seconds have
+    passed since the last write, and on :meth:`flush`. A background thread
+    flushes the buffered records of loggers that have gone quiet.
+
+    Args:
+        path (str, optional): Directory of the log store.
+        flush_interval (float, optional): Maximum age in seconds of buffered records
+            (``None`` only flushes full blocks and on :meth:`flush`).
+        **kwargs: Passed on to :class:`LogStoreWriter`.
+    """
+
+    def __init__(self, path=None, flush_interval=1.0, **kwargs):
+        super().__init__()
+        self.writer = LogStoreWriter(path, **kwargs)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._flusher_stop = threading.Event()
+        self._flusher = None
+        if flush_interval is not None:
+            self._flusher = threading.Thread(target=self._flusher_loop, daemon=True)
+            self._flusher.start()
+
+    def _flusher_loop(self):
+        while not self._flusher_stop.wait(self.flush_interval):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except Exception:
+                    pass  # retried on the next interval, errors of emit() are reported there
+
+    def emit(self, record):
+        try:
+            self.writer.write(record_as_dict(record))
+            if (
+                self.flush_interval is not None
+                and time.monotonic() - self._last_flush > self.flush_interval
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.writer.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        # may be called again, e.g. by logging.shutdown() at exit
+        self._flusher_stop.set()
+        if self._flusher and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.writer.close()
+        super().close()
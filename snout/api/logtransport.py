@@ -0,0 +1,187 @@
+import logging
+import threading
+
+from snout.api import lazymodule
+from snout.api.logstore import LogStoreWriter, record_as_dict
+
+umsgpack = lazymodule('umsgpack')
+zmq = lazymodule('zmq')
+
+LOG_ENDPOINT = 'tcp://127.0.0.1:12345'
+LOG_FLUSH_INTERVAL = 0.2
+LOG_ROOT_TOPIC = 'Snout'
+
+
+def setting(key, default):
+    """Read a log transport setting (``app.log.<key>``) from :class:`Settings`."""
+    from snout.api.cfg import Config
+
+    try:
+        return Config.settings.get(f'app.log.{key}')
+    except Exception:
+        return default
+
+
+class LogPublisher(logging.Handler):
+    """Logging sink publishing records over ZMQ in batches.
+
+    Records are buffered and published every ``flush_interval`` seconds (or as
+    soon as ``max_batch`` records are buffered) by a dedicated thread. Each
+    batch holds the records of one agent, published on the topic
+    ``<root_topic>.<agent fullname>`` as a msgpack-serialized list of
+    structured records (see :func:`snout.api.logstore.record_as_dict`).
+
+    The publishing socket connects to the endpoint, where a :class:`LogCollector`
+    binds, so any number of processes can publish to one collector. Unless given,
+    the endpoint and flush interval are read from the ``app.log.endpoint`` and
+    ``app.log.flush_interval`` settings, which accept ``ipc://`` and ``tcp://``
+    endpoints.
+
+    Args:
+        endpoint (str, optional): ZMQ endpoint to publish to.
+        flush_interval (float, optional): Target time in seconds between batches.
+        root_topic (str, optional): Topic prefix of all batches.
+        max_batch (int, optional): Number of buffered records triggering an early flush.
+    """
+
+    def __init__(self, endpoint=None, flush_interval=None, root_topic=LOG_ROOT_TOPIC, max_batch=1000):
+        super().__init__()
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self.root_topic = root_topic
+        self.max_batch = max_batch
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._requested = 0
+        self._published = 0
+        self._closing = False
+        self._thread = None
+
+    def emit(self, record):
+        try:
+            item = record_as_dict(record)
+            with self._cond:
+                if not self._thread:
+                    self._thread = threading.Thread(target=self._publisher_loop, daemon=True)
+                    self._thread.start()
+                self._buffer.append(item)
+                if len(self._buffer) >= self.max_batch:
+                    self._cond.notify_all()
+        except Exception:
+            self.handleError(record)
+
+    def _publisher_loop(self):
+        endpoint = self.endpoint or setting('endpoint', LOG_ENDPOINT)
+        interval = float(self.flush_interval or setting('flush_interval', LOG_FLUSH_INTERVAL))
+        sock = zmq.Context.instance().socket(zmq.PUB)
+        sock.setsockopt(zmq.LINGER, 1000)
+        sock.connect(endpoint)
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closing
+                    or self._requested > self._published
+                    or len(self._buffer) >= self.max_batch,
+                    timeout=interval,
+                )
+                batch, self._buffer = self._buffer, []
+                requested, closing = self._requested, self._closing
+            self._publish(sock, batch)
+            with self._cond:
+                self._published = requested
+                self._cond.notify_all()
+            if closing:
+                sock.close()
+                return
+
+    def _publish(self, sock, batch):
+        agents = {}
+        for item in batch:
+            agents.setdefault(item['agent'], []).append(item)
+        for agent, records in agents.items():
+            topic = f'{self.root_topic}.{agent}'.encode('utf-8')
+            try:
+                sock.send_multipart([topic, umsgpack.packb(records)], zmq.NOBLOCK)
+            except zmq.Again:
+                pass  # no collector keeps up, drop rather than block logging
+
+    def flush(self, timeout=1.0):
+        """Publish the buffered records now."""
+        with self._cond:
+            if not self._thread:
+                return
+            self._requested += 1
+            request = self._requested
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._published >= request, timeout)
+
+    def close(self):
+        with self._cond:
+            thread, self._closing = self._thread, True
+            self._cond.notify_all()
+        if thread:
+            thread.join(2.0)
+        super().close()
+
+
+class LogCollector(object):
+    """Collect the batches of :class:`LogPublisher` sinks and write them in bulk.
+
+    Args:
+        endpoint (str, optional): ZMQ endpoint to bind (defaults to the ``app.log.endpoint`` setting).
+        writer (LogStoreWriter, optional): Where to write the records (defaults to the default log store).
+        topic (str, optional): Topic prefix to subscribe to, e.g. to collect a subtree of agents.
+        poll_interval (float, optional): Maximum time in seconds between stop checks and flushes.
+    """
+
+    def __init__(self, endpoint=None, writer=None, topic=LOG_ROOT_TOPIC, poll_interval=0.5):
+        self.endpoint = endpoint or setting('endpoint', LOG_ENDPOINT)
+        self.writer = writer or LogStoreWriter()
+        self.poll_interval = poll_interval
+        self.collected = 0
+        self._sock = zmq.Context.instance().socket(zmq.SUB)
+        self._sock.setsockopt(zmq.LINGER, 0)
+        self._sock.setsockopt_string(zmq.SUBSCRIBE, topic)
+        self._sock.bind(self.endpoint)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def collect(self, timeout=None):
+        """Receive the available batches and write their records.
+
+        Args:
+            timeout (float, optional): Maximum time to wait for a batch (``None`` waits forever).
+
+        Returns:
+            int: The number of collected records.
+        """
+        records = []
+        if self._sock.poll(None if timeout is None else int(timeout * 1000)):
+            while True:
+                try:
+                    _, batch = self._sock.recv_multipart(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                records.extend(umsgpack.unpackb(batch))
+        if records:
+            self.writer.write_many(records)
+            self.collected += len(records)
+        return len(records)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._collector_loop, daemon=True)
+        self._thread.start()
+
+    def _collector_loop(self):
+        while not self._stop.is_set():
+            if not self.collect(timeout=self.poll_interval):
+                self.writer.flush()
+
+    def stop(self, timeout=1.0):
+        """Stop collecting, then write all collected records and close the socket."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.writer.flush()
+        self._sock.close()
@@ -0,0 +1,390 @@
+import itertools
+import math
+import threading
+
+from snout.api import lazymodule
+
+zmq = lazymodule('zmq')
+
+_sequence = itertools.count()
+
+
+class Metric(object):
+    """Base class of the metrics in a :class:`MetricsRegistry`.
+
+    Every thread records into its own shard (a plain dict), so recording never
+    takes a lock. Shards are only merged when a snapshot is taken; the shards of
+    finished threads are then folded into a single retired shard.
+
+    All recording methods take the value first and the label values second.
+
+    Args:
+        name (str): Metric name.
+        help (str, optional): Metric description.
+        labels (tuple, optional): Label names; values are passed as a tuple when recording.
+    """
+
+    kind = None
+
+    def __init__(self, name, help='', labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) pairs
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire()
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _retire(self):
+        # finished threads no longer record, so their shards can be merged for good
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for labels, value in shard.items():
+                    self._retired[labels] = self._merge(self._retired.get(labels), value)
+        self._shards = alive
+
+    def _merged(self):
+        with self._lock:
+            self._retire()
+            shards = [shard for _, shard in self._shards]
+            merged = {labels: self._merge(None, value) for labels, value in self._retired.items()}
+        for shard in shards:
+            for labels, value in shard.copy().items():
+                merged[labels] = self._merge(merged.get(labels), value)
+        return merged
+
+    def prune(self, label, values):
+        """Remove all series whose ``label`` has one of ``values`` (e.g. deleted agents)."""
+        index = self.labels.index(label)
+        values = set(values)
+        with self._lock:
+            for shard in [self._retired] + [shard for _, shard in self._shards]:
+                for labels in [labels for labels in list(shard) if labels[index] in values]:
+                    shard.pop(labels, None)
+
+    def _merge(self, a, b):
+        raise NotImplementedError(f'Please subclass Metric._merge() in {self.__class__.__name__}.')
+
+    def samples(self):
+        """Merged values of the metric.
+
+        Returns:
+            dict: Maps label value tuples to values.
+        """
+        return self._merged()
+
+    def _labelstr(self, values, extra=()):
+        pairs = list(zip(self.labels, values)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (
+            (k, str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+            for k, v in pairs
+        )
+        return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+    def exposition(self):
+        """The metric in the Prometheus text exposition format."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for values, value in sorted(self.samples().items(), key=lambda kv: str(kv[0])):
+            lines += self._lines(values, value)
+        return '\n'.join(lines)
+
+    def _lines(self, values, value):
+        return [f'{self.name}{self._labelstr(values)} {value}']
+
+
+class Counter(Metric):
+    """A monotonically increasing value."""
+
+    kind = 'counter'
+
+    def inc(self, value=1, labels=()):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + value
+
+    def _merge(self, a, b):
+        return b if a is None else a + b
+
+
+class Gauge(Metric):
+    """A value that can go up and down.
+
+    A gauge is either :meth:`set` (the most recent value wins across threads),
+    or changed with :meth:`inc`/:meth:`dec` (changes are summed across threads).
+    """
+
+    kind = 'gauge'
+
+    def set(self, value, labels=()):
+        shard = self._shard()
+        delta = shard.get(labels, (None, None, 0))[2]
+        shard[labels] = (next(_sequence), value, delta)
+
+    def inc(self, value=1, labels=()):
+        shard = self._shard()
+        seq, last, delta = shard.get(labels, (None, None, 0))
+        shard[labels] = (seq, last, delta + value)
+
+    def dec(self, value=1, labels=()):
+        self.inc(-value, labels)
+
+    def _merge(self, a, b):
+        if a is None:
+            return b
+        seq, last = max((a[0], a[1]), (b[0], b[1]), key=lambda x: -1 if x[0] is None else x[0])
+        return (seq, last, a[2] + b[2])
+
+    def samples(self):
+        return {labels: (last or 0) + delta for labels, (_, last, delta) in self._merged().items()}
+
+
+class Histogram(Metric):
+    """A distribution of values in HDR-style log-linear buckets.
+
+    Every power of two is split into ``subbuckets`` linear buckets, which
+    bounds the relative error of quantiles at ``1 / subbuckets`` over any
+    range of values, without configuring bucket boundaries.
+
+    Args:
+        subbuckets (int, optional): Linear buckets per power of two.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help='', labels=(), subbuckets=16):
+        super().__init__(name, help=help, labels=labels)
+        self.subbuckets = subbuckets
+
+    def _bucket(self, value):
+        if value <= 0:
+            return -(1 << 30)
+        mantissa, exponent = math.frexp(value)
+        return exponent * self.subbuckets + int((mantissa - 0.5) * 2 * self.subbuckets)
+
+    def upper_bound(self, bucket):
+        """The upper bound of the values in a bucket."""
+        if bucket == -(1 << 30):
+            return 0.0
+        exponent, sub = divmod(bucket, self.subbuckets)
+        return math.ldexp(0.5 + (sub + 1) / (2 * self.subbuckets), exponent)
+
+    def observe(self, value, labels=()):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [0, 0.0, {}]
+        entry[0] += 1
+        entry[1] += value
+        buckets = entry[2]
+        bucket = self._bucket(value)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+
+    def _merge(self, a, b):
+        count, total, buckets = b[0], b[1], dict(b[2])
+        if a is not None:
+            count += a[0]
+            total += a[1]
+            for bucket, n in a[2].items():
+                buckets[bucket] = buckets.get(bucket, 0) + n
+        return [count, total, buckets]
+
+    def quantile(self, q, labels=()):
+        """Estimate the ``q``-quantile (0 <= q <= 1) of the observed values."""
+        entry = self._merged().get(labels)
+        if not entry or not entry[0]:
+            return None
+        rank = q * entry[0]
+        seen = 0
+        for bucket in sorted(entry[2]):
+            seen += entry[2][bucket]
+            if seen >= rank:
+                return self.upper_bound(bucket)
+        return self.upper_bound(max(entry[2]))
+
+    def _lines(self, values, value):
+        count, total, buckets = value
+        lines = []
+        cumulative = 0
+        for bucket in sorted(buckets):
+            cumulative += buckets[bucket]
+            le = (('le', repr(self.upper_bound(bucket))),)
+            lines.append(f'{self.name}_bucket{self._labelstr(values, le)} {cumulative}')
+        lines.append(f'{self.name}_bucket{self._labelstr(values, (("le", "+Inf"),))} {count}')
+        lines.append(f'{self.name}_sum{self._labelstr(values)} {total}')
+        lines.append(f'{self.name}_count{self._labelstr(values)} {count}')
+        return lines
+
+
+class MetricsRegistry(object):
+    """A set of named metrics.
+
+    The metric factories return the existing metric if one of the same name was
+    already registered, so that modules can declare their metrics independently.
+
+    Args:
+        prune_batch (int, optional): Number of :meth:`forget` calls after which the
+            forgotten series are removed even if no snapshot is taken.
+    """
+
+    def __init__(self, prune_batch=1024):
+        self.prune_batch = prune_batch
+        self._metrics = {}
+        self._forgotten = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, **kwargs)
+            elif not isinstance(metric, cls):
+                raise TypeError(f'Metric {name} is a {metric.kind}, not a {cls.kind}.')
+            return metric
+
+    def counter(self, name, help='', labels=()):
+        return self._get(Counter, name, help=help, labels=labels)
+
+    def gauge(self, name, help='', labels=()):
+        return self._get(Gauge, name, help=help, labels=labels)
+
+    def histogram(self, name, help='', labels=(), subbuckets=16):
+        return self._get(Histogram, name, help=help, labels=labels, subbuckets=subbuckets)
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+    def prune(self, label, values):
+        """Remove the series whose ``label`` has one of ``values`` from all metrics."""
+        with self._lock:
+            metrics = [m for m in self._metrics.values() if label in m.labels]
+        for metric in metrics:
+            metric.prune(label, values)
+
+    def forget(self, label, value):
+        """Remove the series whose ``label`` has ``value`` before the next snapshot.
+
+        Removals are batched, so forgetting many label values (e.g. when many
+        agents are deleted) costs one pass over the series.
+        """
+        with self._lock:
+            self._forgotten.setdefault(label, set()).add(value)
+            pending = sum(len(values) for values in self._forgotten.values())
+        if pending >= self.prune_batch:
+            self._prune_forgotten()
+
+    def _prune_forgotten(self):
+        with self._lock:
+            forgotten, self._forgotten = self._forgotten, {}
+        for label, values in forgotten.items():
+            self.prune(label, values)
+
+    def snapshot(self):
+        """Merged samples of all metrics.
+
+        Returns:
+            dict: Maps metric names to their :meth:`Metric.samples`.
+        """
+        self._prune_forgotten()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.samples() for metric in metrics}
+
+    def exposition(self):
+        """All metrics in the Prometheus text exposition format."""
+        self._prune_forgotten()
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return '\n'.join(metric.exposition() for metric in metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer(object):
+    """Serve Prometheus-text snapshots of a registry on a local endpoint.
+
+    With an ``http://host:port`` endpoint, snapshots are served over HTTP (any
+    path). With an ``ipc://`` or ``tcp://`` endpoint, a ZMQ REP socket answers
+    every request with a snapshot.
+
+    Args:
+        endpoint (str, optional): Where to serve the snapshots.
+        registry (MetricsRegistry, optional): The registry to serve (defaults to :data:`REGISTRY`).
+    """
+
+    def __init__(self, endpoint='http://127.0.0.1:9464', registry=None):
+        self.endpoint = endpoint
+        self.registry = registry or REGISTRY
+        self._httpd = None
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.endpoint.startswith('http://'):
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            from urllib.parse import urlparse
+
+            url = urlparse(self.endpoint)
+            registry = self.registry
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = registry.exposition().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._httpd = ThreadingHTTPServer((url.hostname, url.port or 80), MetricsHandler)
+            self._httpd.daemon_threads = True
+            self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        else:
+            self._sock = zmq.Context.instance().socket(zmq.REP)
+            self._sock.setsockopt(zmq.LINGER, 0)
+            self._sock.bind(self.endpoint)
+            self._thread = threading.Thread(target=self._rep_loop, daemon=True)
+        self._stop.clear()
+        self._thread.start()
+        return self
+
+    @property
+    def address(self):
+        """The served endpoint, with the actual port for HTTP servers bound to port 0."""
+        if self._httpd:
+            host, port = self._httpd.server_address[:2]
+            return f'http://{host}:{port}'
+        return self.endpoint
+
+    def _rep_loop(self):
+        while not self._stop.is_set():
+            if self._sock.poll(100):
+                self._sock.recv()
+                self._sock.send_string(self.registry.exposition())
+        self._sock.close()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout)
@@ -0,0 +1,158 @@
+import threading
+import weakref
+from bisect import bisect_left
+from collections import deque
+
+
+class AgentRegistry(object):
+    """Weakly referenced, indexed registry of live agents.
+
+    The registry does not keep agents alive: agents that are garbage collected
+    are pruned automatically. Agents are indexed by class, nickname, app and
+    hierarchical name, so lookups by exact name, name prefix or type don't scan
+    all agents. Whenever the name or app of a registered agent changes, it has
+    to be re-indexed with :meth:`reindex`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._refs = {}
+        self._keys = {}
+        self._dead = deque()
+        self._indexes = {'class': {}, 'nickname': {}, 'app': {}, 'name': {}}
+        self._names = None
+
+    @staticmethod
+    def _keysof(agent):
+        app = agent.app
+        return {
+            'class': type(agent),
+            'nickname': agent._nickname,
+            'app': id(app) if app is not None else None,
+            'name': agent.name,
+        }
+
+    def _prune(self):
+        # weakref callbacks may run during garbage collection at any point, so they
+        # only queue the ids of dead agents, which are removed on the next access
+        while self._dead:
+            key, ref = self._dead.popleft()
+            if self._refs.get(key) is ref:
+                self._unindex(key)
+                del self._refs[key]
+
+    def _index(self, key, keys):
+        self._keys[key] = keys
+        for index, value in keys.items():
+            if value is not None:
+                self._indexes[index].setdefault(value, set()).add(key)
+        self._names = None
+
+    def _unindex(self, key):
+        for index, value in self._keys.pop(key).items():
+            ids = self._indexes[index].get(value)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del self._indexes[index][value]
+        self._names = None
+
+    def add(self, agent):
+        with self._lock:
+            self._prune()
+            key = id(agent)
+            if key in self._refs:
+                self._unindex(key)
+            self._refs[key] = weakref.ref(agent, lambda ref, key=key: self._dead.append((key, ref)))
+            self._index(key, self._keysof(agent))
+
+    def remove(self, agent):
+        with self._lock:
+            self._prune()
+            key = id(agent)
+            if key in self._refs:
+                self._unindex(key)
+                del self._refs[key]
+
+    def reindex(self, agent):
+        """Update the indexes of a registered agent after its name or app changed."""
+        with self._lock:
+            self._prune()
+            key = id(agent)
+            if key in self._refs:
+                keys = self._keysof(agent)
+                if keys != self._keys[key]:
+                    self._unindex(key)
+                    self._index(key, keys)
+
+    def _agents(self, ids):
+        agents = []
+        for key in ids:
+            agent = self._refs[key]()
+            if agent is not None:
+                agents.append(agent)
+        return agents
+
+    def _lookup(self, index, value):
+        with self._lock:
+            self._prune()
+            return self._agents(self._indexes[index].get(value, ()))
+
+    def __len__(self):
+        with self._lock:
+            self._prune()
+            return len(self._refs)
+
+    def __iter__(self):
+        with self._lock:
+            self._prune()
+            return iter(self._agents(list(self._refs)))
+
+    def __contains__(self, agent):
+        with self._lock:
+            self._prune()
+            ref = self._refs.get(id(agent))
+            return ref is not None and ref() is agent
+
+    def by_name(self, name):
+        """Agents with the hierarchical name ``name``."""
+        return self._lookup('name', name)
+
+    def by_prefix(self, prefix):
+        """Agents whose hierarchical name starts with ``prefix``."""
+        with self._lock:
+            self._prune()
+            if self._names is None:
+                self._names = sorted(self._indexes['name'])
+            ids = []
+            for name in self._names[bisect_left(self._names, prefix) :]:
+                if not name.startswith(prefix):
+                    break
+                ids.extend(self._indexes['name'][name])
+            return self._agents(ids)
+
+    def by_class(self, cls, subclasses=True):
+        """Agents of class ``cls`` (and, by default, of its subclasses)."""
+        with self._lock:
+            self._prune()
+            ids = []
+            for c, members in self._indexes['class'].items():
+                if c is cls or (subclasses and issubclass(c, cls)):
+                    ids.extend(members)
+            return self._agents(ids)
+
+    def by_nickname(self, nickname):
+        return self._lookup('nickname', nickname)
+
+    def by_app(self, app):
+        return self._lookup('app', id(app))
+
+    def search(self, term):
+        """Agents whose hierarchical name contains ``term`` (scans all names)."""
+        with self._lock:
+            self._prune()
+            ids = []
+            for name, members in self._indexes['name'].items():
+                if term in name:
+                    ids.extend(members)
+            return self._agents(ids)
@@ -0,0 +1,175 @@
+import threading
+from time import monotonic as timer
+
+from snout.api import lazymodule
+
+futures = lazymodule('concurrent.futures')
+
+
+class WorkItem(object):
+    """A run of an experiment, and the instruments it needs exclusively.
+
+    Args:
+        runid (int): The run id.
+        params (dict): The parameter variation of the run.
+        instruments (iterable): The instruments (e.g. InstrumentAPI instances) the run uses.
+    """
+
+    __slots__ = ('runid', 'params', 'instruments', 'bypassed')
+
+    def __init__(self, runid, params, instruments=()):
+        self.runid = runid
+        self.params = params
+        self.instruments = frozenset(instruments)
+        self.bypassed = 0
+
+    def __repr__(self):
+        return f'WorkItem({self.runid!r}, {self.params!r}, {set(self.instruments)!r})'
+
+
+class ExperimentScheduler(object):
+    """Run work items concurrently, unless they need the same instruments.
+
+    Items are started in FIFO order on a thread pool, as soon as all of their
+    instruments are free; the instruments are locked all at once, so items never
+    hold some instruments while waiting for others. Items that are blocked may be
+    overtaken by later items using other instruments, but once an item has been
+    overtaken ``max_bypass`` times, its instruments are reserved for it.
+
+    If a task raises an exception that is not an :class:`Exception` (e.g.
+    :class:`KeyboardInterrupt`), no further items are started, and :meth:`run`
+    raises it once the running items are done.
+
+    Args:
+        task (callable): Called with every :class:`WorkItem` on a worker thread.
+        workers (int, optional): Number of worker threads.
+        max_bypass (int, optional): How often an item may be overtaken.
+        lookahead (int, optional): Number of items taken from the input ahead of time.
+
+    Attributes:
+        results (dict): Maps run ids to the result of the task, or to the exception it raised.
+    """
+
+    def __init__(self, task, workers=4, max_bypass=8, lookahead=None):
+        self.task = task
+        self.workers = workers
+        self.max_bypass = max_bypass
+        self.lookahead = lookahead or 4 * workers
+        self.results = {}
+        self.completed = 0
+        self.failed = 0
+        self._busy = {}
+        self._cond = threading.Condition()
+        self._interrupt = None
+        self._t_start = None
+        self._t_stop = None
+
+    @property
+    def locked(self):
+        """Maps the locked instruments to the run id of the item using them."""
+        with self._cond:
+            return dict(self._busy)
+
+    @property
+    def elapsed(self):
+        if self._t_start is None:
+            return 0.0
+        return (self._t_stop or timer()) - self._t_start
+
+    @property
+    def runs_per_minute(self):
+        """Throughput of the completed (and failed) runs."""
+        elapsed = self.elapsed
+        return 60 * (self.completed + self.failed) / elapsed if elapsed else 0.0
+
+    @property
+    def stats(self):
+        return {
+            'completed': self.completed,
+            'failed': self.failed,
+            'elapsed': self.elapsed,
+            'runs_per_minute': self.runs_per_minute,
+        }
+
+    def _next(self, pending):
+        # the first item whose instruments are neither locked nor reserved for an
+        # earlier, starved item
+        reserved = set()
+        for i, item in enumerate(pending):
+            if not item.instruments & reserved and not any(
+                instrument in self._busy for instrument in item.instruments
+            ):
+                for earlier in pending[:i]:
+                    earlier.bypassed += 1
+                return pending.pop(i)
+            if item.bypassed >= self.max_bypass:
+                reserved |= item.instruments
+        return None
+
+    def _run(self, item):
+        result, failed = None, True
+        try:
+            result = self.task(item)
+            failed = False
+        except BaseException as e:
+            result = e
+            if not isinstance(e, Exception):
+                with self._cond:
+                    self._interrupt = self._interrupt or e
+        finally:
+            # the instruments must be released and the item counted, or run() waits forever
+            with self._cond:
+                for instrument in item.instruments:
+                    del self._busy[instrument]
+                self.results[item.runid] = result
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self._cond.notify_all()
+
+    def run(self, items):
+        """Run all items and wait for them.
+
+        Args:
+            items (iterable): :class:`WorkItem` objects, or ``(runid, params, instruments)``
+                tuples. The iterable is consumed lazily.
+
+        Returns:
+            dict: :attr:`results`.
+
+        Raises:
+            BaseException: The first non-:class:`Exception` raised by a task.
+        """
+        items = iter(items)
+        pending = []
+        running = 0
+        exhausted = False
+        self._interrupt = None
+        self._t_start, self._t_stop = timer(), None
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            with self._cond:
+                while self._interrupt is None:
+                    while not exhausted and len(pending) < self.lookahead:
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        pending.append(item if isinstance(item, WorkItem) else WorkItem(*item))
+                    item = self._next(pending) if running < self.workers else None
+                    if item is not None:
+                        for instrument in item.instruments:
+                            self._busy[instrument] = item.runid
+                        running += 1
+                        pool.submit(self._run, item)
+                        continue
+                    if exhausted and not pending and not running:
+                        break
+                    done = self.completed + self.failed
+                    self._cond.wait_for(lambda: self.completed + self.failed > done)
+                    running -= self.completed + self.failed - done
+        self._t_stop = timer()
+        if self._interrupt is not None:
+            raise self._interrupt
+        return self.results
@@ -0,0 +1,3 @@
+from enum import IntFlag
+
+Status = IntFlag('Status', 'Unknown Idle Ready Starting Running Stopping Stopped Complete Failed')
@@ -0,0 +1,168 @@
+import itertools
+import math
+import random
+from collections.abc import Sequence
+
+
+class ParameterSweep(Sequence):
+    """The variations of a Snoutfile ``parameters`` section, enumerated lazily.
+
+    Every parameter is a list of values (or a single value), and the sweep is
+    their cartesian product, in the order of :func:`itertools.product` (the last
+    parameter varies fastest). Variations are dicts mapping the parameter names to
+    values. They are computed from their index by mixed-radix decoding, so a
+    sweep of any size can be indexed, sliced, sampled and split into chunks
+    without materializing the grid.
+
+    Like :class:`range`, sweeps larger than ``sys.maxsize`` work but don't support
+    ``len()``; use :attr:`size` instead.
+
+    Args:
+        parameters (dict, optional): Maps parameter names to a value or a list of values.
+
+    Attributes:
+        size (int): The number of variations.
+    """
+
+    def __init__(self, parameters=None):
+        parameters = parameters or {}
+        self.names = list(parameters)
+        self.values = [
+            tuple(v) if isinstance(v, (list, tuple)) else (v,) for v in parameters.values()
+        ]
+        self.size = math.prod(len(v) for v in self.values)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f'ParameterSweep({dict(zip(self.names, self.values))!r})'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SweepView(self, range(self.size)[index])
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('ParameterSweep index out of range')
+        params = {}
+        for name, values in zip(reversed(self.names), reversed(self.values)):
+            index, i = divmod(index, len(values))
+            params[name] = values[i]
+        return {name: params[name] for name in self.names}
+
+    def __iter__(self):
+        for combination in itertools.product(*self.values):
+            yield dict(zip(self.names, combination))
+
+    def __contains__(self, params):
+        try:
+            self.index(params)
+            return True
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def index(self, params):
+        """The index of a variation.
+
+        Raises:
+            ValueError: If ``params`` is not a variation of the sweep.
+        """
+        index = 0
+        for name, values in zip(self.names, self.values):
+            index = index * len(values) + values.index(params[name])
+        return index
+
+    def sample(self, n, seed=None):
+        """Draw ``n`` distinct variations uniformly at random (all of them if ``n`` is larger).
+
+        Yields:
+            dict: The variations.
+        """
+        rng = random.Random(seed)
+        n = min(n, self.size)
+        if n > self.size // 2:
+            for index in rng.sample(range(self.size), n):
+                yield self[index]
+            return
+        seen = set()
+        while len(seen) < n:
+            index = rng.randrange(self.size)
+            if index not in seen:
+                seen.add(index)
+                yield self[index]
+
+    def latin_hypercube(self, n, seed=None):
+        """Draw ``n`` variations by Latin hypercube sampling.
+
+        Every parameter's value range is split into ``n`` equally likely strata,
+        and every stratum is used exactly once, so that each parameter is covered
+        evenly even by few samples.
+
+        Yields:
+            dict: The variations.
+        """
+        if not self.size:
+            return
+        rng = random.Random(seed)
+        strata = []
+        for _ in self.values:
+            order = list(range(n))
+            rng.shuffle(order)
+            strata.append(order)
+        for k in range(n):
+            yield {
+                name: values[int((strata[d][k] + rng.random()) / n * len(values))]
+                for d, (name, values) in enumerate(zip(self.names, self.values))
+            }
+
+    def chunks(self, size):
+        """Split the sweep into consecutive chunks of up to ``size`` variations.
+
+        Yields:
+            SweepView: The chunks.
+        """
+        for start in range(0, self.size, size):
+            yield SweepView(self, range(start, min(start + size, self.size)))
+
+    def shard(self, worker, workers):
+        """The contiguous share of worker ``worker`` (0-based) of ``workers`` workers.
+
+        Returns:
+            SweepView: The share of the worker.
+        """
+        if not 0 <= worker < workers:
+            raise ValueError(f'Worker {worker} is not one of {workers} workers.')
+        return SweepView(
+            self, range(self.size * worker // workers, self.size * (worker + 1) // workers)
+        )
+
+
+class SweepView(Sequence):
+    """A lazily evaluated range of the variations of a :class:`ParameterSweep`.
+
+    Views are small and picklable, so they can be handed to worker processes.
+
+    Args:
+        sweep (ParameterSweep): The sweep.
+        indices (range): The indices of the variations in the sweep.
+    """
+
+    def __init__(self, sweep, indices):
+        self.sweep = sweep
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __repr__(self):
+        return f'SweepView({self.sweep!r}, {self.indices!r})'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SweepView(self.sweep, self.indices[index])
+        return self.sweep[self.indices[index]]
+
+    def __iter__(self):
+        for index in self.indices:
+            yield self.sweep[index]
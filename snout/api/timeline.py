@@ -0,0 +1,203 @@
+import struct
+import time
+from array import array
+from collections.abc import Sequence
+
+from snout.api import lazymodule
+
+numpy = lazymodule.optional('numpy')
+
+SPILL_RECORD = struct.Struct('<dQQ')
+
+
+class StatusTimeline(Sequence):
+    """Bounded status history stored in preallocated typed arrays.
+
+    Transitions are kept in a ring buffer of three typed arrays (timestamp, old
+    flag, new flag), which start small and double in size up to ``capacity``.
+    When the buffer is full, the oldest transitions are overwritten or, if a
+    ``spill`` path is given, written to that file in chunks of half the
+    capacity. The spill file is truncated when the timeline first spills.
+
+    The timeline is a sequence of ``(timestamp, old, new)`` tuples and supports
+    :meth:`append`, so it can stand in for the former list of transitions. The
+    analytics methods use NumPy when it is installed.
+
+    Args:
+        capacity (int, optional): Maximum number of transitions kept in memory.
+        spill (str, optional): File receiving the transitions evicted from memory.
+        flag_type (type, optional): Flag type the old and new flags are returned as.
+    """
+
+    initial_size = 8
+
+    def __init__(self, capacity=4096, spill=None, flag_type=int):
+        self.capacity = max(2, int(capacity))
+        self.spill = spill
+        self.flag_type = flag_type
+        self._size = min(self.capacity, self.initial_size)
+        self._t = array('d', bytes(8 * self._size))
+        self._old = array('Q', bytes(8 * self._size))
+        self._new = array('Q', bytes(8 * self._size))
+        self._start = 0
+        self._len = 0
+        self.spilled = 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('StatusTimeline index out of range')
+        i = (self._start + index) % self._size
+        return (self._t[i], self.flag_type(self._old[i]), self.flag_type(self._new[i]))
+
+    def __repr__(self):
+        return f'StatusTimeline({list(self)!r})'
+
+    def append(self, transition):
+        """Record a ``(timestamp, old, new)`` transition."""
+        t, old, new = transition
+        if self._len == self._size < self.capacity:
+            self._grow()
+        if self._len == self.capacity:
+            if self.spill:
+                self._spill(self.capacity // 2)
+            else:
+                self._start = (self._start + 1) % self._size
+                self._len -= 1
+        i = (self._start + self._len) % self._size
+        self._t[i] = t
+        self._old[i] = int(old)
+        self._new[i] = int(new)
+        self._len += 1
+
+    def _grow(self):
+        size = min(self.capacity, 2 * self._size)
+        padding = bytes(8 * (size - self._len))
+        self._t = self._ordered(self._t) + array('d', padding)
+        self._old = self._ordered(self._old) + array('Q', padding)
+        self._new = self._ordered(self._new) + array('Q', padding)
+        self._start = 0
+        self._size = size
+
+    def _spill(self, count):
+        # a previous run's spill file is replaced, not appended to
+        with open(self.spill, 'ab' if self.spilled else 'wb') as f:
+            f.write(
+                b''.join(
+                    SPILL_RECORD.pack(self._t[i], self._old[i], self._new[i])
+                    for i in ((self._start + k) % self._size for k in range(count))
+                )
+            )
+        self._start = (self._start + count) % self._size
+        self._len -= count
+        self.spilled += count
+
+    def history(self):
+        """Iterate over all transitions, including those spilled to disk."""
+        if self.spill and self.spilled:
+            with open(self.spill, 'rb') as f:
+                for t, old, new in SPILL_RECORD.iter_unpack(f.read()):
+                    yield (t, self.flag_type(old), self.flag_type(new))
+        yield from self
+
+    def _ordered(self, column):
+        end = self._start + self._len
+        if end <= self._size:
+            return column[self._start : end]
+        return column[self._start :] + column[: end - self._size]
+
+    def arrays(self, spilled=False):
+        """The transitions as chronologically ordered typed arrays.
+
+        Args:
+            spilled (bool, optional): Include the transitions spilled to disk.
+
+        Returns:
+            tuple: ``(timestamps, old, new)`` arrays.
+        """
+        t, old, new = self._ordered(self._t), self._ordered(self._old), self._ordered(self._new)
+        if spilled and self.spill and self.spilled:
+            with open(self.spill, 'rb') as f:
+                records = list(SPILL_RECORD.iter_unpack(f.read()))
+            t = array('d', (r[0] for r in records)) + t
+            old = array('Q', (r[1] for r in records)) + old
+            new = array('Q', (r[2] for r in records)) + new
+        return t, old, new
+
+    def to_numpy(self):
+        """The in-memory transitions as NumPy arrays (requires NumPy).
+
+        Returns:
+            dict: ``t`` (float64), ``old`` and ``new`` (uint64) arrays.
+        """
+        if numpy is None:
+            raise ImportError('StatusTimeline.to_numpy() requires NumPy.')
+        t, old, new = self.arrays()
+        return {
+            't': numpy.frombuffer(t, dtype=numpy.float64),
+            'old': numpy.frombuffer(old, dtype=numpy.uint64),
+            'new': numpy.frombuffer(new, dtype=numpy.uint64),
+        }
+
+    def time_in_state(self, flag, until=None):
+        """Total time spent in states containing ``flag``.
+
+        Each transition's new state lasts until the next transition, the last
+        one until ``until`` (defaults to now). Spilled transitions are included.
+
+        Args:
+            flag (int): The status flag(s) to account for.
+            until (float, optional): End of the last state.
+
+        Returns:
+            float: Time in seconds.
+        """
+        if not self._len:
+            return 0.0
+        until = time.time() if until is None else until
+        t, _, new = self.arrays(spilled=True)
+        if numpy is not None:
+            t = numpy.frombuffer(t, dtype=numpy.float64)
+            durations = numpy.diff(t, append=until)
+            mask = (numpy.frombuffer(new, dtype=numpy.uint64) & numpy.uint64(int(flag))) != 0
+            return float(durations[mask].sum())
+        ends = list(t[1:]) + [until]
+        return sum(end - start for start, end, state in zip(t, ends, new) if state & int(flag))
+
+    def transition_counts(self, window, flag=None, start=None, end=None):
+        """Number of transitions per time window, including spilled transitions.
+
+        Args:
+            window (float): Window length in seconds.
+            flag (int, optional): Only count transitions into states containing ``flag``.
+            start (float, optional): Start of the first window (defaults to the first transition).
+            end (float, optional): End of the last window (defaults to the last transition).
+
+        Returns:
+            list: ``(window_start, count)`` tuples.
+        """
+        if not self._len:
+            return []
+        t, _, new = self.arrays(spilled=True)
+        start = t[0] if start is None else start
+        end = t[-1] if end is None else end
+        buckets = max(1, int((end - start) // window) + 1)
+        if numpy is not None:
+            t = numpy.frombuffer(t, dtype=numpy.float64)
+            keep = (t >= start) & (t <= end)
+            if flag is not None:
+                keep &= (numpy.frombuffer(new, dtype=numpy.uint64) & numpy.uint64(int(flag))) != 0
+            indices = ((t[keep] - start) // window).astype(numpy.int64)
+            counts = numpy.bincount(indices, minlength=buckets)[:buckets].tolist()
+        else:
+            counts = [0] * buckets
+            for ts, state in zip(t, new):
+                if start <= ts <= end and (flag is None or state & int(flag)):
+                    counts[min(int((ts - start) // window), buckets - 1)] += 1
+        return [(start + i * window, count) for i, count in enumerate(counts)]
@@ -0,0 +1,258 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from glob import glob
+from types import MappingProxyType
+
+from snout.api.cfg import Config, Snoutfile
+from snout.api.event import EventMgmtCapability, Notification
+from snout.api.log import Logger
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class Inotify(object):
+    """Minimal ctypes binding of the Linux inotify API, reporting changed file paths.
+
+    Attributes:
+        paths (set): The watched directories. A directory is dropped once its watch is
+            removed, e.g. because the directory was deleted.
+
+    Raises:
+        OSError: If inotify is not available.
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux.')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._watches = {}
+
+    def add_watch(self, path, mask=INOTIFY_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+        self._watches[wd] = path
+
+    @property
+    def paths(self):
+        return set(self._watches.values())
+
+    def read(self, timeout):
+        """Wait up to ``timeout`` seconds for events.
+
+        Returns:
+            set: Paths of the files with events, or None if the kernel's event queue
+            overflowed and events were lost.
+        """
+        paths = set()
+        overflow = False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return paths
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return None if overflow else paths
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset : offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                elif wd in self._watches and name:
+                    paths.add(os.sep.join([self._watches[wd], os.fsdecode(name)]))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SnoutfileWatcher(EventMgmtCapability, Logger):
+    """Keep an index of the Snoutfiles in the Snoutfile search paths up to date.
+
+    Changes are detected with inotify where available, and by polling the
+    directories otherwise. Directories that don't exist yet are watched once
+    they are created. Only added or changed files are parsed (through the
+    Snoutfile cache). For every change, a ``snoutfile.added``,
+    ``snoutfile.changed`` or ``snoutfile.removed`` event is emitted with the
+    file's path and its Snoutfile (None when removed). A file that becomes
+    invalid is removed from the index.
+
+    The index is replaced as a whole on every update, so readers always see a
+    consistent set of Snoutfiles.
+
+    Args:
+        paths (list, optional): Directories to watch (defaults to :meth:`Config.snoutfile_paths`).
+        pattern (str, optional): Pattern of the Snoutfile names.
+        backend (str, optional): ``'inotify'`` or ``'poll'`` (by default, inotify if available).
+        interval (float, optional): Polling interval (or event batching delay) in seconds.
+    """
+
+    def __init__(self, paths=None, pattern='*.snoutfile', backend=None, interval=1.0):
+        super().__init__()
+        self.paths = list(paths) if paths else Config.snoutfile_paths()
+        self.pattern = pattern
+        self.backend = backend
+        self.interval = interval
+        self._index = MappingProxyType({})
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def index(self):
+        """Read-only mapping of the paths of the known Snoutfiles to their Snoutfile."""
+        return self._index
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def check(self, paths=None):
+        """Detect and apply changes.
+
+        Args:
+            paths (iterable, optional): Only check these files (by default, scan all directories).
+
+        Returns:
+            list: ``(event, path)`` tuples of the applied changes.
+        """
+        with self._lock:
+            if paths is None:
+                candidates = set(self._stats)
+                for directory in self.paths:
+                    candidates.update(glob(os.sep.join([directory, self.pattern])))
+            else:
+                candidates = {
+                    p for p in paths if fnmatch.fnmatch(os.path.basename(p), self.pattern)
+                }
+            changes = []
+            for path in sorted(candidates):
+                stat = self._stat(path)
+                if stat != self._stats.get(path):
+                    if stat is None:
+                        changes.append(('snoutfile.removed', path))
+                    elif path in self._stats:
+                        changes.append(('snoutfile.changed', path))
+                    else:
+                        changes.append(('snoutfile.added', path))
+                    self._stats[path] = stat
+            applied = self._apply(changes)
+        for event, path, snoutfile in applied:
+            self.emitEvent(Notification(event, path, snoutfile))
+        return [(event, path) for event, path, _ in applied]
+
+    def _apply(self, changes):
+        index = dict(self._index)
+        applied = []
+        for event, path in changes:
+            if event == 'snoutfile.removed':
+                del self._stats[path]
+                if index.pop(path, None) is None:
+                    continue
+                snoutfile = None
+            else:
+                try:
+                    snoutfile = Snoutfile(path)
+                except Exception as e:
+                    self.logger.error(f'Snoutfile {path} could not be loaded ({e}).')
+                    if index.pop(path, None) is not None:
+                        applied.append(('snoutfile.removed', path, None))
+                    continue
+                index[path] = snoutfile
+                if event == 'snoutfile.changed' and path not in self._index:
+                    event = 'snoutfile.added'  # the previous version was invalid
+            applied.append((event, path, snoutfile))
+        self._index = MappingProxyType(index)
+        return applied
+
+    def start(self):
+        """Scan the directories, then watch them for changes on a background thread."""
+        inotify = None
+        if self.backend in (None, 'inotify'):
+            try:
+                inotify = Inotify()
+                self._watch_new_directories(inotify)
+            except OSError as e:
+                if inotify is not None:
+                    inotify.close()
+                    inotify = None
+                if self.backend == 'inotify':
+                    raise
+                self.logger.info(f'Watching Snoutfiles by polling ({e}).')
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watcher_loop, args=(inotify,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _watch_new_directories(self, inotify):
+        # returns whether a directory was added, as files may have been created in it
+        # before it was watched
+        added = False
+        for directory in self.paths:
+            if directory not in inotify.paths and os.path.isdir(directory):
+                inotify.add_watch(directory)
+                added = True
+        return added
+
+    def _watcher_loop(self, inotify):
+        next_scan = 0
+        try:
+            while not self._stop.is_set():
+                if inotify is None:
+                    self._stop.wait(self.interval)
+                    self.check()
+                    continue
+                if time.monotonic() >= next_scan:
+                    next_scan = time.monotonic() + self.interval
+                    try:
+                        if self._watch_new_directories(inotify):
+                            self.check()
+                    except OSError as e:
+                        self.logger.debug(f'Snoutfile directory could not be watched ({e}).')
+                paths = inotify.read(timeout=min(self.interval, 0.2))
+                if paths is None:
+                    self.logger.warning('Snoutfile change events were lost, rescanning.')
+                    self.check()
+                elif paths:
+                    # let editors finish writing before parsing
+                    self._stop.wait(min(self.interval, 0.1))
+                    more = inotify.read(timeout=0)
+                    self.check(None if more is None else paths | more)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
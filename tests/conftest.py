@@ -0,0 +1,50 @@
+import pytest
+
+from snout.api.cfg import Snoutfile, SnoutfileCache
+from snout.api.factory import Factory
+from snout.api.log import LogPipeline
+
+
+@pytest.fixture(autouse=True, scope='session')
+def log_dir(tmp_path_factory):
+    """Keep the logs of the test session out of the user log directory."""
+    LogPipeline.stop()
+    LogPipeline.log_dir = str(tmp_path_factory.mktemp('logs'))
+    yield LogPipeline.log_dir
+    LogPipeline.stop()
+    LogPipeline.log_dir = None
+
+
+@pytest.fixture(autouse=True, scope='session')
+def cache_dir(tmp_path_factory):
+    """Keep the caches of the test session out of the user cache directory."""
+    path = tmp_path_factory.mktemp('cache')
+    Factory._index_path = str(path / 'plugins.msgpack')
+    cache = Snoutfile.cache
+    Snoutfile.cache = SnoutfileCache(str(path / 'snoutfiles'))
+    yield path
+    Factory._index_path = None
+    Snoutfile.cache = cache
+
+
+@pytest.fixture
+def snoutfile_text():
+    """The text of a valid Snoutfile."""
+    return """
+meta:
+    name: Test
+    description: A test experiment
+    author: Tester
+    email: tester@example.com
+    date: 2021-03-04
+instrument:
+    sniffer:
+        class: sniffer
+steps:
+  - start:
+        instrument: sniffer
+        command: start
+        condition:
+            type: duration
+            criteria: 10
+"""
@@ -1,8 +1,11 @@
+import gc
 import logging
+import time
 
 import pytest
 
 from snout.api.agent import SnoutAgent, Status
+from snout.api.error import AgentDependencyError
 
 
 def test_classnames():
@@ -54,3 +57,127 @@ def test_snoutagent_logsomething():
     x.logger.critical('critical test')
     x.logger.exception('exception test')
     x.logger.log(logging.DEBUG, 'log test')
+
+
+class RegistryAgent(SnoutAgent):
+    pass
+
+
+def test_registry_lookups():
+    app = object()
+    root = RegistryAgent(name='root', app=app)
+    child = SnoutAgent(name='child', parent=root)
+    registry = SnoutAgent.registry
+    assert root in registry and child in SnoutAgent.instances
+    assert registry.by_name(child.name) == [child]
+    assert set(registry.by_prefix(root.name)) == {root, child}
+    assert registry.by_class(RegistryAgent) == [root]
+    assert child in registry.by_class(SnoutAgent)
+    assert registry.by_nickname('child') == [child]
+    assert set(registry.by_app(app)) == {root, child}
+    assert set(SnoutAgent.find_instance('RegistryAgent_root')) == {root, child}
+
+
+def test_registry_prunes_dead_agents():
+    agent = RegistryAgent(name='ephemeral')
+    name = agent.name
+    assert SnoutAgent.registry.by_name(name)
+    del agent
+    gc.collect()
+    assert not SnoutAgent.registry.by_name(name)
+
+
+def test_registry_reindex_on_reparent():
+    parent = RegistryAgent(name='newparent')
+    child = SnoutAgent(name='orphan')
+    assert SnoutAgent.registry.by_name(child.name) == [child]
+    child.parent = parent
+    assert set(SnoutAgent.registry.by_prefix(parent.name)) == {parent, child}
+    assert child not in SnoutAgent.registry.by_name('snout.api.agent.SnoutAgent_orphan')
+
+
+def test_name_cache_invalidation():
+    root = SnoutAgent(name='root')
+    mid = SnoutAgent(name='mid', parent=root)
+    leaf = SnoutAgent(name='leaf', parent=mid)
+    fullname = leaf.fullname
+    assert leaf.fullname is fullname
+    assert leaf.name.startswith(root.name)
+    other = SnoutAgent(name='other')
+    mid.parent = other
+    assert mid not in root.children and mid in other.children
+    assert leaf.name.startswith(other.name) and leaf.fullname != fullname
+    other.nickname = 'renamed'
+    assert other.name.endswith('SnoutAgent_renamed')
+    assert leaf.name.startswith(other.name)
+    assert SnoutAgent.registry.by_name(leaf.name) == [leaf]
+    mid.parent = None
+    assert leaf.name == '.'.join([mid.name, 'snout.api.agent.SnoutAgent_leaf'])
+
+
+def test_reparent_cycle():
+    root = SnoutAgent(name='root')
+    leaf = SnoutAgent(name='leaf', parent=SnoutAgent(name='mid', parent=root))
+    for parent in (leaf, root):
+        with pytest.raises(ValueError):
+            root.parent = parent
+    assert root.parent is None and root not in leaf.children
+
+
+class TreeAgent(SnoutAgent):
+    def __init__(self, *args, log=None, fail=False, delay=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.log = log
+        self.fail = fail
+        self.delay = delay
+
+    def runlogic(self, *args, **kwargs):
+        self.log.append(('run', self.nickname))
+        if self.fail:
+            raise RuntimeError('run failed')
+
+    def stoplogic(self):
+        time.sleep(self.delay)
+        self.log.append(('stop', self.nickname))
+
+
+def make_tree(**kwargs):
+    log = []
+    root = TreeAgent(name='root', log=log)
+    a = TreeAgent(name='a', parent=root, log=log, **kwargs)
+    b = TreeAgent(name='b', parent=root, log=log)
+    a1 = TreeAgent(name='a1', parent=a, log=log)
+    return log, root, a, b, a1
+
+
+def test_tree_traversal():
+    _, root, a, b, a1 = make_tree()
+    assert list(root.iter_depth_first()) == [root, a, a1, b]
+    assert list(root.iter_breadth_first()) == [root, a, b, a1]
+
+
+def test_run_tree_order_and_failures():
+    log, root, a, b, a1 = make_tree(fail=True)
+    results = root.run_tree()
+    assert log.index(('run', 'root')) == 0
+    assert ('run', 'a1') not in log
+    assert results[a] & Status.Failed
+    assert results[a1] & Status.Failed
+    assert results[b] & Status.Complete and not results[b] & Status.Failed
+
+
+def test_stop_tree_concurrent_and_dependencies():
+    log, root, a, b, a1 = make_tree(delay=0.2)
+    b.delay = 0.2
+    start = time.monotonic()
+    results = root.stop_tree(dependencies={b: [a1]})
+    assert time.monotonic() - start < 0.55
+    assert log[-1] == ('stop', 'root')
+    assert log.index(('stop', 'b')) < log.index(('stop', 'a1'))
+    assert all(status & Status.Stopped for status in results.values())
+
+
+def test_tree_dependency_cycle():
+    _, root, a, b, _ = make_tree()
+    with pytest.raises(AgentDependencyError):
+        root.run_tree(dependencies={a: [b], b: [a]})
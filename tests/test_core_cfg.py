@@ -1,6 +1,12 @@
+import os
+import threading
+import time
+from datetime import datetime
+
 import pytest
 
-from snout.api.cfg import Config
+from snout.api.cfg import Config, Settings, Snoutfile, SnoutfileCache
+from snout.api.error import SnoutfileError
 
 
 def test_cfg_appname():
@@ -26,3 +32,181 @@ def test_cfg_snoutfile_paths3():
 def test_cfg_snoutfile_paths_invalidtype():
     with pytest.raises(TypeError):
         Config.snoutfile_paths(2)
+
+
+def make_settings(tmp_path, delay=0.05):
+    settings = Settings(str(tmp_path / 'settings.yaml'))
+    settings.save_delay = delay
+    return settings
+
+
+def test_settings_write_behind(tmp_path):
+    settings = make_settings(tmp_path)
+    writes = []
+    save = settings.save
+    settings.save = lambda: writes.append(1) or save()
+    for i in range(100):
+        settings.set(f'app.test.key{i % 10}', str(i))
+    assert settings.pending
+    deadline = time.monotonic() + 5
+    while settings.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not settings.pending
+    assert len(writes) < 10
+    assert Settings(str(tmp_path / 'settings.yaml')).get('app.test.key9') == '99'
+    assert [p.name for p in tmp_path.iterdir()] == ['settings.yaml']
+
+
+def test_settings_writer_lifecycle(tmp_path):
+    path = tmp_path / 'settings.yaml'
+    settings = make_settings(tmp_path, delay=60)
+    settings.save_max_delay = 0.1
+    os.chmod(path, 0o644)
+    writes = []
+    save = settings.save
+    settings.save = lambda: writes.append(1) or save()
+    deadline = time.monotonic() + 5
+    while not writes and time.monotonic() < deadline:
+        settings.set('app.test.key', str(time.monotonic()))
+        time.sleep(0.01)
+    assert writes, 'the write was postponed past save_max_delay'
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    writer = settings._writer
+    settings.close()
+    assert not settings.pending and settings._writer is None
+    assert writer is None or not writer.is_alive()
+
+
+def test_settings_batch(tmp_path):
+    settings = make_settings(tmp_path, delay=60)
+    with settings.batch():
+        settings.set('app.batch.a', 'one')
+        settings.set('app.batch.b', 'two')
+    assert settings.flush()
+    assert Settings(str(tmp_path / 'settings.yaml')).get('app.batch.b') == 'two'
+    with pytest.raises(RuntimeError):
+        with settings.batch():
+            settings.set('app.batch.a', 'changed')
+            settings.set('app.batch.c', 'three')
+            settings.flush()  # uncommitted changes are not written
+            raise RuntimeError('abort')
+    assert settings.get('app.batch.a') == 'one'
+    with pytest.raises(ValueError):
+        settings.get('app.batch.c')
+    assert not settings.pending
+    reloaded = Settings(str(tmp_path / 'settings.yaml'))
+    assert reloaded.get('app.batch.a') == 'one'
+
+
+def test_settings_batch_other_threads(tmp_path):
+    settings = make_settings(tmp_path, delay=60)
+    other = threading.Thread(target=settings.set, args=('app.batch.other', 'kept'))
+    with pytest.raises(RuntimeError):
+        with settings.batch():
+            settings.set('app.batch.a', 'rolled back')
+            other.start()
+            other.join(0.1)
+            assert other.is_alive()  # waits for the batch
+            raise RuntimeError('abort')
+    other.join(5)
+    assert settings.get('app.batch.other') == 'kept'
+    with pytest.raises(ValueError):
+        settings.get('app.batch.a')
+
+
+def test_settings_key_index(tmp_path):
+    settings = make_settings(tmp_path, delay=60)
+    settings.set('app.instr.rate', '10')
+    settings.set('app.instr.mode', 'fast')
+    settings.set('app.other', 'x')
+    assert settings.get('app.instr.rate') == '10'
+    assert settings.get('app.instr') == {'rate': '10', 'mode': 'fast'}
+    assert settings.scan('app.instr') == {'app.instr.rate': '10', 'app.instr.mode': 'fast'}
+    assert settings.get_many(['app.other', 'app.missing']) == {
+        'app.other': 'x',
+        'app.missing': None,
+    }
+    section = settings.get('app')
+    section['other'] = 'modified'
+    settings.set('app.instr.rate', '20')
+    assert settings.get('app.other') == 'x'
+    assert settings.get('app')['instr']['rate'] == '20'
+    assert settings.scan('app') == {
+        'app.instr.rate': '20',
+        'app.instr.mode': 'fast',
+        'app.other': 'x',
+    }
+    with pytest.raises(ValueError):
+        settings.get('app.instr.rate.deeper')
+    settings.flush()
+    reloaded = Settings(str(tmp_path / 'settings.yaml'))
+    assert reloaded.scan('app') == settings.scan('app')
+
+
+def test_snoutfile_cache(tmp_path, snoutfile_text):
+    path = tmp_path / 'test.snoutfile'
+    path.write_text(snoutfile_text)
+    cache = SnoutfileCache(str(tmp_path / 'cache'))
+    parsed = []
+
+    def parse(text):
+        parsed.append(text)
+        return Snoutfile._parse(text)
+
+    data = cache.load(str(path), parse)
+    assert data['meta']['date'] == datetime(2021, 3, 4)
+    assert cache.load(str(path), parse) == data
+    assert (cache.hits, cache.misses, len(parsed)) == (1, 1, 1)
+    path.write_text(snoutfile_text.replace('Test\n', 'Changed\n'))
+    assert cache.load(str(path), parse)['meta']['name'] == 'Changed'
+    assert (cache.hits, cache.misses) == (1, 2)
+    # an unchanged file with a new mtime is recognized by its content hash
+    os.utime(path, ns=(0, 0))
+    assert cache.load(str(path), parse)['meta']['name'] == 'Changed'
+    assert (cache.hits, cache.misses) == (2, 2)
+    # entries older than the file are trusted without reading it
+    assert cache.load(str(path), parse)['meta']['name'] == 'Changed'
+    assert (cache.hits, cache.misses, len(parsed)) == (3, 2, 2)
+    # entries written by another parser are ignored
+    assert cache.load(str(path), parse, key='other')['meta']['name'] == 'Changed'
+    assert (cache.hits, cache.misses, len(parsed)) == (3, 3, 3)
+
+
+def test_snoutfile_schema_key(monkeypatch):
+    from strictyaml import Int, Map, Optional
+
+    key = Snoutfile.schema_key
+    assert len(key) == 64 and key == Snoutfile.schema_key
+    # a changed default changes the key
+    monkeypatch.setattr(Snoutfile, '_schema', Map({Optional('runs', default=2): Int()}))
+    monkeypatch.setattr(Snoutfile, '_schema_key', None)
+    other = Snoutfile.schema_key
+    monkeypatch.setattr(Snoutfile, '_schema', Map({Optional('runs', default=1): Int()}))
+    monkeypatch.setattr(Snoutfile, '_schema_key', None)
+    assert Snoutfile.schema_key not in (key, other)
+
+
+def test_snoutfile_uses_cache(tmp_path, monkeypatch, snoutfile_text):
+    path = tmp_path / 'test.snoutfile'
+    path.write_text(snoutfile_text)
+    monkeypatch.setattr(Snoutfile, 'cache', SnoutfileCache(str(tmp_path / 'cache')))
+    first = Snoutfile(str(path))
+    second = Snoutfile(str(path))
+    assert first.data == second.data
+    assert first.data['instrument']['sniffer']['class'] == 'sniffer'
+    assert (Snoutfile.cache.hits, Snoutfile.cache.misses) == (1, 1)
+
+
+def test_snoutfile_load_all(tmp_path, monkeypatch, snoutfile_text):
+    monkeypatch.setattr(Snoutfile, 'cache', SnoutfileCache(str(tmp_path / 'cache')))
+    paths = []
+    for name in ['b', 'bad', 'a']:
+        path = tmp_path / f'{name}.snoutfile'
+        path.write_text('steps: [' if name == 'bad' else snoutfile_text.replace('Test', name))
+        paths.append(str(path))
+    results = Snoutfile.load_all(paths, workers=2)
+    assert [r.data['meta']['name'] for r in (results[0], results[2])] == ['b', 'a']
+    assert isinstance(results[1], SnoutfileError) and results[1].path == paths[1]
+    assert Snoutfile.cache.misses == 2
+    assert Snoutfile.load_all(paths, workers=0)[2].data == results[2].data
+    assert Snoutfile.cache.hits == 2
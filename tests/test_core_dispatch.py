@@ -0,0 +1,138 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from snout.api.dispatch import InlineDispatch, PoolDispatch, ProcessPoolDispatch, ThreadPoolDispatch
+from snout.api.event import EventMgmtCapability, Notification
+
+
+def square(x):
+    return x * x
+
+
+def blocked_pool(overflow):
+    release = threading.Event()
+    received = []
+
+    def handler(x):
+        release.wait(5)
+        received.append(x)
+
+    pool = ThreadPoolDispatch(workers=1, maxsize=2, overflow=overflow)
+    pool.submit(handler, (0,), {})  # occupies the only worker
+    return pool, handler, release, received
+
+
+def test_inline_dispatch_stats():
+    policy = InlineDispatch()
+    received = []
+    policy.submit(received.append, (1,), {})
+    with pytest.raises(ZeroDivisionError):
+        policy.submit(lambda: 1 / 0, (), {})
+    stats = policy.stats[received.append]
+    assert received == [1]
+    assert stats.count == 1 and stats.errors == 0
+    assert stats.mean is not None and stats.min <= stats.max
+
+
+def test_pool_dispatch_invalid_overflow():
+    with pytest.raises(ValueError):
+        PoolDispatch(None, 1, overflow='explode')
+
+
+def test_threadpool_dispatch_emitevent():
+    received = []
+    lock = threading.Lock()
+
+    def handler(x):
+        with lock:
+            received.append(x)
+
+    policy = ThreadPoolDispatch(workers=2)
+    agent = EventMgmtCapability()
+    agent.registerEventHandler('testdispatch.pool', handler, policy=policy)
+    for i in range(20):
+        agent.emitEvent(Notification('testdispatch.pool', i))
+    assert policy.join(timeout=5)
+    agent.deregisterEventHandler('testdispatch.pool', handler)
+    assert sorted(received) == list(range(20))
+    assert policy.stats[handler].count == 20
+    policy.shutdown()
+
+
+def test_threadpool_dispatch_drop_oldest():
+    pool, handler, release, received = blocked_pool('drop_oldest')
+    for i in range(1, 5):
+        pool.submit(handler, (i,), {})
+    release.set()
+    assert pool.join(timeout=5)
+    assert received == [0, 3, 4]
+    assert pool.stats[handler].dropped == 2
+    pool.shutdown()
+
+
+def test_threadpool_dispatch_coalesce():
+    pool, handler, release, received = blocked_pool('coalesce')
+    for i in range(1, 5):
+        pool.submit(handler, (i,), {})
+    release.set()
+    assert pool.join(timeout=5)
+    assert received == [0, 1, 4]
+    assert pool.stats[handler].coalesced == 2
+    pool.shutdown()
+
+
+def test_threadpool_dispatch_block_reentrant():
+    pool = ThreadPoolDispatch(workers=1, maxsize=1, overflow='block')
+    received = []
+
+    def handler(x):
+        if x < 3:
+            for _ in range(2):
+                pool.submit(handler, (x + 1,), {})  # fills the pool from its own worker
+        received.append(x)
+
+    pool.submit(handler, (0,), {})
+    assert pool.join(timeout=5)
+    assert sorted(received) == [0, 1, 1, 2, 2, 2, 2] + [3] * 8
+    pool.shutdown()
+
+
+def test_pool_dispatch_cancelled():
+    pool = ThreadPoolDispatch(workers=1)
+    future = Future()
+    future.cancel()
+    with pool._cond:
+        pool._inflight += 1
+    pool._done(future, square, 0.0)
+    assert pool.stats[square].errors == 1
+    assert pool.join(timeout=1)
+    pool.shutdown()
+
+
+def test_pool_dispatch_logs_errors(caplog):
+    def failing():
+        raise RuntimeError('handler failure')
+
+    pool = ThreadPoolDispatch(workers=1)
+    pool.submit(failing, (), {})
+    assert pool.join(timeout=5)
+    pool.shutdown()
+    assert pool.stats[failing].errors == 1
+    (record,) = [r for r in caplog.records if r.name == 'Snout.events']
+    assert record.exc_info[1].args == ('handler failure',)
+
+
+def test_threadpool_dispatch_shared():
+    assert ThreadPoolDispatch.shared() is ThreadPoolDispatch.shared()
+
+
+def test_processpool_dispatch():
+    pool = ProcessPoolDispatch(workers=1)
+    for i in range(3):
+        pool.submit(square, (i,), {})
+    assert pool.join(timeout=30)
+    assert pool.stats[square].count == 3
+    assert pool.stats[square].errors == 0
+    pool.shutdown()
@@ -0,0 +1,315 @@
+import array
+import asyncio
+import time
+
+import pytest
+import zmq
+
+from snout.api.event import (
+    AsyncEventListener,
+    AsyncEventSystem,
+    EventListener,
+    EventMgmtCapability,
+    EventPublisher,
+    EventSystem,
+    Frames,
+    Notification,
+    TopicTable,
+)
+
+
+def test_eventsystem_emit():
+    assert EventSystem.emit('test', {'value': 1})
+
+
+def test_eventpublisher_async():
+    publisher = EventSystem.start_async(batch_size=8)
+    assert EventSystem.start_async() is publisher
+    for i in range(100):
+        assert EventSystem.emit('test', i)
+    assert EventSystem.stop_async(timeout=5) is publisher
+    assert EventSystem._publisher is None
+    stats = publisher.stats
+    assert stats['queued'] == 100
+    assert stats['sent'] + stats['dropped'] == 100
+    assert stats['backlog'] == 0
+
+
+def test_eventpublisher_stop_refuses_messages():
+    publisher = EventSystem.start_async()
+    assert publisher.stop(timeout=5)
+    assert publisher.put('test', 1) is None
+    assert EventSystem.emit('test', 1)  # sent synchronously while the publisher is installed
+    assert EventSystem.stop_async(timeout=5) is publisher
+    assert EventSystem._publisher is None
+    assert publisher.stats['queued'] == 0
+
+
+def test_eventpublisher_drop():
+    publisher = EventPublisher(maxsize=1, policy='drop')
+    assert publisher.put('test', 1)
+    assert not publisher.put('test', 2)
+    assert publisher.stats['queued'] == 1
+    assert publisher.stats['dropped'] == 1
+
+
+def test_eventpublisher_block_timeout():
+    publisher = EventPublisher(maxsize=1, policy='block', timeout=0.01)
+    assert publisher.put('test', 1)
+    assert not publisher.put('test', 2)
+    assert publisher.stats['dropped'] == 1
+
+
+def _publisher_socket(tmp_path):
+    addr = f'ipc://{tmp_path}/events.z'
+    sock = zmq.Context.instance().socket(zmq.PUB)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.bind(addr)
+    return addr, sock
+
+
+def test_eventlistener_stop_without_messages():
+    listener = EventListener(handlers={'test': lambda msg: None}, start=True, poll_interval=0.01)
+    assert listener.running
+    t0 = time.monotonic()
+    assert listener.close(timeout=1)
+    assert time.monotonic() - t0 < 1
+    assert not listener.running
+
+
+def test_eventlistener_multiplex(tmp_path):
+    addr1, sock1 = _publisher_socket(tmp_path)
+    received = {'alpha': [], 'beta': []}
+    listener = EventListener(
+        handlers={'alpha': received['alpha'].append},
+        addrs=[addr1],
+        burst=4,
+    )
+    listener.subscribe('beta', received['beta'].append)
+    with pytest.raises(TypeError):
+        listener.subscribe('gamma', 'not callable')
+    time.sleep(0.2)
+    for i in range(10):
+        sock1.send_multipart(EventSystem._pack('alpha', i))
+        sock1.send_multipart(EventSystem._pack('beta.sub', -i))
+    count = 0
+    deadline = time.monotonic() + 5
+    while count < 20 and time.monotonic() < deadline:
+        count += listener.listen(timeout=0.1)
+    assert received['alpha'] == list(range(10))
+    assert received['beta'] == [-i for i in range(10)]
+    listener.close()
+    sock1.close()
+
+
+def test_eventlistener_handler_errors_and_unsubscribe(tmp_path):
+    addr, sock = _publisher_socket(tmp_path)
+    received = []
+
+    def handler(msg):
+        if msg < 0:
+            raise ValueError(msg)
+        received.append(msg)
+
+    listener = EventListener(handlers={'test': handler}, addrs=[addr], start=True)
+    time.sleep(0.2)
+    for i in (-1, 1):
+        sock.send_multipart(EventSystem._pack('test', i))
+    deadline = time.monotonic() + 5
+    while not received and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert received == [1]
+    assert listener.running
+    listener.unsubscribe('test')
+    assert listener._handler('test') is None
+    assert listener.handlers == {}
+    listener.close()
+    sock.close()
+
+
+def test_async_eventlistener(tmp_path):
+    class TestEventSystem(AsyncEventSystem):
+        addr = f'ipc://{tmp_path}/async.z'
+
+    received = {'sync': [], 'async': []}
+    running = {'now': 0, 'max': 0}
+
+    async def async_handler(msg):
+        running['now'] += 1
+        running['max'] = max(running['max'], running['now'])
+        await asyncio.sleep(0.01)
+        received['async'].append(msg)
+        running['now'] -= 1
+
+    async def main():
+        listener = AsyncEventListener(
+            handlers={'sync': received['sync'].append, 'async': async_handler},
+            addrs=[TestEventSystem.addr],
+            max_concurrency=2,
+        )
+        TestEventSystem._socket()
+        listener.start()
+        assert listener.running
+        await asyncio.sleep(0.2)
+        for i in range(10):
+            assert await TestEventSystem.emit('sync', i)
+            assert await TestEventSystem.emit('async', i)
+        deadline = time.monotonic() + 5
+        while len(received['async']) < 10 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await listener.close()
+        assert not listener.running
+        TestEventSystem._sock.close()
+
+    asyncio.run(main())
+    assert received['sync'] == list(range(10))
+    assert sorted(received['async']) == list(range(10))
+    assert running['max'] <= 2
+
+
+def test_async_eventlistener_handler_errors(tmp_path, caplog):
+    class TestEventSystem(AsyncEventSystem):
+        addr = f'ipc://{tmp_path}/errors.z'
+
+    received = []
+
+    def sync_handler(msg):
+        raise ValueError('sync')
+
+    async def async_handler(msg):
+        raise ValueError('async')
+
+    async def main():
+        listener = AsyncEventListener(
+            handlers={'sync': sync_handler, 'async': async_handler, 'ok': received.append},
+            addrs=[TestEventSystem.addr],
+        )
+        TestEventSystem._socket()
+        listener.start()
+        await asyncio.sleep(0.2)
+        for topic in ('sync', 'async', 'ok'):
+            await TestEventSystem.emit(topic, 1)
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        assert listener.running
+        await listener.close()
+        TestEventSystem._sock.close()
+
+    with caplog.at_level('ERROR', logger='Snout.events'):
+        asyncio.run(main())
+    assert received == [1]
+    errors = [r.exc_info[1].args[0] for r in caplog.records if r.exc_info]
+    assert sorted(errors) == ['async', 'sync']
+
+
+def test_frames_roundtrip():
+    samples = array.array('f', range(12))
+    matrix = memoryview(bytearray(array.array('i', range(6)))).cast('i', [2, 3])
+    message = Frames([samples, matrix, b'raw'], meta={'rate': 2e6})
+    frames = EventSystem._pack('sdr.samples', message)
+    assert frames[2].obj is samples  # payloads are not copied on the way out
+    received = EventSystem._unpack(frames)
+    assert isinstance(received, Frames)
+    assert received.meta == {'rate': 2e6}
+    assert received[0].tolist() == samples.tolist()
+    assert received[1].tolist() == [[0, 1, 2], [3, 4, 5]]
+    assert received[2].tobytes() == b'raw'
+    with pytest.raises(ValueError):
+        Frames([]).pack()
+
+
+def test_eventsystem_emit_payload_ownership():
+    received = []
+    listener = EventListener(handlers={'sdr.owned': received.append}, addrs=[EventSystem.addr])
+    time.sleep(0.2)
+    samples = array.array('f', range(1024))
+    assert EventSystem.emit('sdr.owned', samples, binary=True)
+    samples[0] = -1.0  # the payload was copied, so it may be reused right away
+    tracker = EventSystem.emit('sdr.owned', samples, binary=True, track=True)
+    tracker.wait(5)
+    assert tracker.done
+    deadline = time.monotonic() + 5
+    while len(received) < 2 and time.monotonic() < deadline:
+        listener.listen(timeout=0.1)
+    listener.close()
+    assert received[0][0].format == 'f'
+    assert received[0][0].tolist() == list(range(1024))
+    assert received[1][0][0] == -1.0
+
+
+def test_eventlistener_frames(tmp_path):
+    addr, sock = _publisher_socket(tmp_path)
+    received = []
+    listener = EventListener(handlers={'sdr': received.append}, addrs=[addr])
+    time.sleep(0.2)
+    payload = bytearray(range(256)) * 1024
+    sock.send_multipart(EventSystem._pack('sdr', Frames.coerce(payload)), copy=False)
+    deadline = time.monotonic() + 5
+    while not received and time.monotonic() < deadline:
+        listener.listen(timeout=0.1)
+    assert isinstance(received[0][0], memoryview)
+    assert received[0][0] == payload
+    listener.close()
+    sock.close()
+
+
+def test_topictable_patterns():
+    table = TopicTable()
+    handlers = {p: (lambda p=p: p) for p in ['proto', 'proto.event', 'proto.*', 'proto.*.sub', '*']}
+    for pattern, handler in handlers.items():
+        table.register(pattern, handler)
+
+    def resolved(topic):
+        return sorted(h() for h, _ in table.resolve(topic))
+
+    assert resolved('proto') == ['*', 'proto']
+    assert resolved('proto.event') == ['*', 'proto', 'proto.*', 'proto.event']
+    assert resolved('proto.event.sub') == ['*', 'proto', 'proto.*', 'proto.*.sub']
+    assert resolved('other.event') == ['*']
+    assert table.resolve('proto.event') is table.resolve('proto.event')
+    table.deregister('proto.*', handlers['proto.*'])
+    assert resolved('proto.event') == ['*', 'proto', 'proto.event']
+    table.deregister('no.such.pattern', handlers['proto'])
+
+
+def test_emitevent_dispatch():
+    received = []
+    agent = EventMgmtCapability()
+    name = agent.eventName('TestProto', 'Dispatch')
+    agent.registerEventHandler(name, received.append)
+    assert agent.emitEvent(Notification(name, 1))
+    assert agent.emitEvent(Notification('testproto.other', 2))
+    agent.deregisterEventHandler(name, received.append)
+    assert agent.emitEvent(Notification(name, 3))
+    assert received == [1]
+
+
+def test_topictable_registration_order():
+    table = TopicTable()
+    handlers = [lambda i=i: i for i in range(4)]
+    for pattern, handler in zip(['a.b', 'a.*', 'a', '*'], handlers):
+        table.register(pattern, handler)
+    assert [h() for h, _ in table.resolve('a.b')] == [0, 1, 2, 3]
+
+
+def test_emitevent_global_delivery():
+    class Emitter(EventMgmtCapability):
+        pass
+
+    class OtherEmitter(EventMgmtCapability):
+        pass
+
+    received = []
+
+    def handler():
+        received.append('emitter')
+
+    emitter = Emitter()
+    emitter.registerEventHandler('global', handler)
+    try:
+        Emitter().emitEvent(Notification('global'))
+        OtherEmitter().emitEvent(Notification('global'))
+    finally:
+        emitter.deregisterEventHandler('global', handler)
+    assert received == ['emitter', 'emitter']
@@ -1,6 +1,12 @@
 import logging
+import threading
+from queue import Queue
 
-from snout.api.log import Logger
+import pytest
+
+from snout.api.agent import SnoutAgent
+from snout.api.event import EventMgmtCapability
+from snout.api.log import DeferredQueueHandler, Logger, LogPipeline, lazy, trace
 
 
 def test_debug():
@@ -36,3 +42,130 @@ def test_exception():
 def test_log():
     x = Logger()
     x.log(logging.DEBUG, 'log test')
+
+
+def test_pipeline_shared():
+    x = Logger()
+    y = Logger()
+    assert x._logger is y._logger
+    assert LogPipeline.handler() in x._logger.handlers
+
+
+def test_pipeline_agent_name():
+    received = []
+    events = EventMgmtCapability()
+    events.registerEventHandler('log', received.append)
+    agent = SnoutAgent(name='pipeline')
+    agent.logger.info('pipeline %s', 'test')
+    LogPipeline.flush()
+    events.deregisterEventHandler('log', received.append)
+    assert any(agent.fullname in msg and 'pipeline test' in msg for msg in received)
+
+
+def test_pipeline_failing_log_handler(monkeypatch):
+    monkeypatch.setattr(logging, 'raiseExceptions', False)
+    received = []
+    events = EventMgmtCapability()
+
+    def failing(msg):
+        raise RuntimeError('handler failure')
+
+    events.registerEventHandler('log', received.append)
+    events.registerEventHandler('log', failing)
+    agent = SnoutAgent(name='failing')
+    try:
+        for i in range(2):
+            agent.logger.info('delivered %d', i)
+            flusher = threading.Thread(target=LogPipeline.flush, daemon=True)
+            flusher.start()
+            flusher.join(5)
+            assert not flusher.is_alive()
+    finally:
+        events.deregisterEventHandler('log', failing)
+        events.deregisterEventHandler('log', received.append)
+    assert [any(f'delivered {i}' in msg for msg in received) for i in range(2)] == [True, True]
+
+
+def test_pipeline_restart():
+    x = Logger()
+    handler = LogPipeline.handler()
+    LogPipeline.stop()
+    assert handler not in x._logger.handlers
+    y = Logger()
+    y.info('restarted')
+    assert LogPipeline.handler() in x._logger.handlers
+    LogPipeline.flush()
+
+
+class Unrepresentable:
+    def __repr__(self):
+        raise AssertionError('traced while disabled')
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_trace_disabled():
+    @trace
+    def double(x):
+        return 2 * x
+
+    assert not Logger.logger.isEnabledFor(logging.DEBUG)
+    assert double(2) == 4
+    assert trace(level=logging.DEBUG)(lambda x: x)(Unrepresentable())
+
+
+def test_trace_sampled():
+    logger = logging.getLogger('Snout.test.trace')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = ListHandler()
+    logger.addHandler(handler)
+
+    @trace(sample=2, logger=logger)
+    def double(x):
+        return 2 * x
+
+    assert [double(i) for i in range(4)] == [0, 2, 4, 6]
+    assert handler.messages == [
+        'Calling double(0)',
+        "'double' returned 0",
+        'Calling double(2)',
+        "'double' returned 4",
+    ]
+
+
+def test_trace_invalid_sample():
+    with pytest.raises(ValueError):
+        trace(sample=0)
+
+
+def test_deferred_queue_handler():
+    queue = Queue()
+    logger = logging.getLogger('Snout.test.deferred')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(DeferredQueueHandler(queue))
+    calls = []
+    logger.debug('value %r', lazy(lambda: calls.append(1) or 'rendered'))
+    try:
+        raise ValueError('failed')
+    except ValueError:
+        logger.exception('error')
+    record, error = queue.get_nowait(), queue.get_nowait()
+    assert not calls
+    assert record.getMessage() == "value 'rendered'" and calls == [1]
+    assert error.exc_info is None and 'ValueError: failed' in error.exc_text
+
+
+def test_lazy():
+    calls = []
+    message = lazy(lambda: calls.append(1) or 'expensive')
+    assert not calls
+    assert str(message) == 'expensive' and calls == [1]
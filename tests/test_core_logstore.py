@@ -0,0 +1,94 @@
+import logging
+import time
+
+from click.testing import CliRunner
+
+from snout.api.logcli import cli
+from snout.api.logstore import LogStore, LogStoreHandler, LogStoreWriter
+
+
+def records(n, agents=('exp.a@0x1', 'exp.b@0x2')):
+    return [
+        {
+            't': 1000.0 + i,
+            'agent': agents[i % len(agents)],
+            'level': logging.INFO if i % 3 else logging.ERROR,
+            'logger': 'Snout.agents',
+            'msg': f'message {i}',
+            'exc': None,
+        }
+        for i in range(n)
+    ]
+
+
+def test_logstore_query(tmp_path):
+    writer = LogStoreWriter(str(tmp_path), max_segment_bytes=256, block_records=10)
+    writer.write_many(records(100))
+    writer.close()
+    store = LogStore(str(tmp_path))
+    assert len(store.segments()) > 1
+    assert len(list(store.query())) == 100
+    a = list(store.query(agent='exp.a@0x1'))
+    assert len(a) == 50 and all(r['agent'] == 'exp.a@0x1' for r in a)
+    assert len(list(store.query(agent='exp.', prefix=True))) == 100
+    window = list(store.query(agent='exp.b@0x2', start=1010, end=1019))
+    assert [r['t'] for r in window] == [1011.0, 1013.0, 1015.0, 1017.0, 1019.0]
+    assert len(list(store.query(level=logging.ERROR))) == 34
+    assert not list(store.query(agent='exp.c@0x3'))
+
+
+def test_logstore_backup_count(tmp_path):
+    writer = LogStoreWriter(str(tmp_path), max_segment_bytes=1, block_records=10, backup_count=2)
+    for i in range(5):
+        writer.write_many(records(10))
+        writer.flush()
+    writer.close()
+    assert len(LogStore(str(tmp_path)).segments()) <= 2
+
+
+def test_logstore_handler(tmp_path):
+    logger = logging.getLogger('Snout.test.logstore')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = LogStoreHandler(str(tmp_path))
+    logger.addHandler(handler)
+    logger.warning('stored %d', 1, extra={'agent': 'exp.a@0x1'})
+    handler.close()
+    logger.removeHandler(handler)
+    (record,) = LogStore(str(tmp_path)).query(agent='exp.a@0x1')
+    assert record['msg'] == 'stored 1'
+    assert record['level'] == logging.WARNING
+
+
+def test_logstore_handler_flushes_when_quiet(tmp_path):
+    handler = LogStoreHandler(str(tmp_path), flush_interval=0.05)
+    handler.handle(logging.makeLogRecord({'msg': 'quiet', 'agent': 'exp.a@0x1'}))
+    deadline = time.monotonic() + 5
+    while not list(LogStore(str(tmp_path)).query()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r['msg'] for r in LogStore(str(tmp_path)).query()] == ['quiet']
+    handler.close()
+    handler.close()  # e.g. again by logging.shutdown()
+
+
+def test_logstore_segment_names(tmp_path):
+    writers = [LogStoreWriter(str(tmp_path), block_records=1) for _ in range(2)]
+    for writer in writers:
+        writer.write_many(records(1))
+    for writer in writers:
+        writer.close()
+    assert len(LogStore(str(tmp_path)).segments()) == 2
+
+
+def test_logstore_cli(tmp_path):
+    writer = LogStoreWriter(str(tmp_path))
+    writer.write_many(records(10))
+    writer.close()
+    result = CliRunner().invoke(
+        cli, ['--path', str(tmp_path), '--agent', 'exp.a@0x1', '--level', 'error']
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines()[0].endswith('exp.a@0x1 - ERROR - message 0')
+    assert len(result.output.splitlines()) == 2
+    result = CliRunner().invoke(cli, ['--path', str(tmp_path), '--level', 'loud'])
+    assert result.exit_code == 2 and 'Invalid value' in result.output
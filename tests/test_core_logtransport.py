@@ -0,0 +1,41 @@
+import logging
+import time
+
+from snout.api.logstore import LogStore, LogStoreWriter
+from snout.api.logtransport import LogCollector, LogPublisher
+
+
+def test_logtransport_batches(tmp_path):
+    endpoint = f'ipc://{tmp_path}/log.z'
+    collector = LogCollector(endpoint=endpoint, writer=LogStoreWriter(str(tmp_path / 'store')))
+    publisher = LogPublisher(endpoint=endpoint, flush_interval=10)
+    logger = logging.getLogger('Snout.test.logtransport')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(publisher)
+
+    logger.info('connect', extra={'agent': 'exp.a@0x1'})
+    publisher.flush()
+    time.sleep(0.2)  # let the subscription reach the publisher
+    collector.collect(timeout=0.1)
+    collector.collected = 0
+    for i in range(10):
+        logger.info('record %d', i, extra={'agent': 'exp.a@0x1' if i % 2 else 'exp.b@0x2'})
+    publisher.flush()
+    deadline = time.monotonic() + 5
+    while collector.collected < 10 and time.monotonic() < deadline:
+        collector.collect(timeout=0.1)
+    logger.removeHandler(publisher)
+    publisher.close()
+    collector.stop()
+
+    store = LogStore(str(tmp_path / 'store'))
+    odd = [r['msg'] for r in store.query(agent='exp.a@0x1') if r['msg'] != 'connect']
+    assert odd == [f'record {i}' for i in range(1, 10, 2)]
+    assert len(list(store.query(agent='exp.b@0x2'))) == 5
+
+
+def test_logpublisher_close_unused():
+    publisher = LogPublisher(endpoint='ipc:///tmp/snout.test.unused.z')
+    publisher.flush()
+    publisher.close()
@@ -0,0 +1,160 @@
+import gc
+import threading
+import urllib.request
+
+import zmq
+
+from snout.api.agent import SnoutAgent, Status
+from snout.api.event import EventMgmtCapability, Notification
+from snout.api.metrics import REGISTRY, MetricsRegistry, MetricsServer
+
+
+class MetricsAgent(SnoutAgent):
+    def runlogic(self, *args, **kwargs):
+        pass
+
+    def stoplogic(self):
+        pass
+
+
+def test_counter_shards():
+    counter = MetricsRegistry().counter('requests_total', labels=('path',))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(labels=('/a',))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc(5, ('/b',))
+    assert counter.samples() == {('/a',): 4000, ('/b',): 5}
+    assert len(counter._shards) == 1  # the shards of the finished threads were merged
+    assert counter.samples() == {('/a',): 4000, ('/b',): 5}
+
+
+def test_gauge():
+    registry = MetricsRegistry()
+    gauge = registry.gauge('level')
+    gauge.set(3)
+    gauge.set(7)
+    assert gauge.samples() == {(): 7}
+    backlog = registry.gauge('backlog')
+    backlog.inc(5)
+    backlog.dec(2)
+    assert backlog.samples() == {(): 3}
+
+
+def test_histogram_quantiles():
+    histogram = MetricsRegistry().histogram('latency', subbuckets=32)
+    for i in range(1, 1001):
+        histogram.observe(i / 1000)
+    for q in (0.5, 0.9, 0.99):
+        assert abs(histogram.quantile(q) - q) / q < 1 / 32 + 0.002
+    assert histogram.quantile(0.5, labels=('missing',)) is None
+
+
+def test_registry_exposition():
+    registry = MetricsRegistry()
+    registry.counter('hits_total', 'Hits.', labels=('path',)).inc(labels=('/"x"',))
+    registry.histogram('size').observe(3)
+    assert registry.counter('hits_total') is registry['hits_total']
+    text = registry.exposition()
+    assert '# TYPE hits_total counter' in text
+    assert 'hits_total{path="/\\"x\\""} 1' in text
+    assert 'size_bucket{le="+Inf"} 1' in text
+    assert 'size_count 1' in text
+
+
+def test_agent_metrics():
+    agent = MetricsAgent(name='metrics')
+    agent.run()
+    agent.stop()
+    twin = MetricsAgent(name='metrics')
+    twin.run()
+    agent_id = agent._metrics_id
+    assert agent_id != twin._metrics_id
+    snapshot = REGISTRY.snapshot()
+    transitions = snapshot['snout_agent_status_transitions_total']
+    assert transitions[(agent_id, 'Running')] == 1
+    assert any(a == agent_id and 'Stopped' in s for a, s in transitions)
+    assert (agent_id, 'Idle') in snapshot['snout_agent_status_seconds_total']
+    assert snapshot['snout_agent_run_seconds'][(agent_id,)][0] == 1
+    assert snapshot['snout_agent_stop_seconds'][(agent_id,)][0] == 1
+    assert agent.status & Status.Stopped
+    del agent
+    gc.collect()
+    transitions = REGISTRY.snapshot()['snout_agent_status_transitions_total']
+    assert not any(a == agent_id for a, _ in transitions)
+    assert (twin._metrics_id, 'Running') in transitions
+
+
+def test_registry_forget():
+    registry = MetricsRegistry(prune_batch=2)
+    counter = registry.counter('calls_total', labels=('agent', 'op'))
+    for agent in 'abc':
+        counter.inc(labels=(agent, 'run'))
+    registry.forget('agent', 'a')
+    assert ('a', 'run') in counter.samples()
+    registry.forget('agent', 'b')
+    assert set(counter.samples()) == {('c', 'run')}
+
+
+def test_emit_event_metrics(monkeypatch):
+    class Emitter(EventMgmtCapability):
+        pass
+
+    monkeypatch.setattr(EventMgmtCapability, 'metrics_sample', 1)
+
+    def on_metrics_test(value):
+        pass
+
+    emitter = Emitter()
+    emitter.registerEventHandler('metricstest.ping', on_metrics_test)
+    try:
+        emitter.emitEvent(Notification('metricstest.ping', 1))
+    finally:
+        emitter.deregisterEventHandler('metricstest.ping', on_metrics_test)
+    snapshot = REGISTRY.snapshot()
+    assert snapshot['snout_events_emitted_total'][('metricstest.ping',)] >= 1
+    handler = on_metrics_test.__qualname__
+    assert snapshot['snout_event_handler_seconds'][('metricstest.ping', handler)][0] == 1
+
+
+def test_emit_event_metrics_sampled(monkeypatch):
+    monkeypatch.setattr(EventMgmtCapability, 'metrics_sample', 4)
+    emitter = EventMgmtCapability()
+    for _ in range(400):
+        emitter.emitEvent(Notification('metricstest.sampled'))
+    # one in four emits is counted, as four (other threads' emits may shift the sampling)
+    count = REGISTRY.snapshot()['snout_events_emitted_total'][('metricstest.sampled',)]
+    assert count % 4 == 0 and 300 <= count <= 500
+
+
+def test_metrics_server_http():
+    registry = MetricsRegistry()
+    registry.counter('served_total').inc()
+    server = MetricsServer('http://127.0.0.1:0', registry=registry).start()
+    try:
+        with urllib.request.urlopen(server.address + '/metrics', timeout=5) as response:
+            assert 'served_total 1' in response.read().decode('utf-8')
+    finally:
+        server.stop()
+
+
+def test_metrics_server_ipc(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('served_total').inc()
+    server = MetricsServer(f'ipc://{tmp_path}/metrics.z', registry=registry).start()
+    sock = zmq.Context.instance().socket(zmq.REQ)
+    sock.setsockopt(zmq.LINGER, 0)
+    try:
+        sock.connect(server.endpoint)
+        sock.send(b'')
+        assert sock.poll(5000)
+        assert 'served_total 1' in sock.recv_string()
+    finally:
+        sock.close()
+        server.stop()
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from snout.api.experiment import ExperimentAPI
+from snout.api.scheduler import ExperimentScheduler, WorkItem
+
+
+def test_scheduler_instrument_exclusivity():
+    lock = threading.Lock()
+    active = set()
+    overlaps = []
+    peak = [0]
+
+    def task(item):
+        with lock:
+            if active & item.instruments:
+                overlaps.append(item.runid)
+            active.update(item.instruments)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.02)
+        with lock:
+            active.difference_update(item.instruments)
+        if item.runid == 3:
+            raise RuntimeError('instrument failure')
+        return item.params['channel']
+
+    items = [(i, {'channel': i}, ['sniffer' if i % 2 else 'jammer']) for i in range(8)]
+    scheduler = ExperimentScheduler(task, workers=4)
+    results = scheduler.run(items)
+    assert not overlaps
+    assert peak[0] == 2
+    assert isinstance(results.pop(3), RuntimeError)
+    assert results == {i: i for i in range(8) if i != 3}
+    assert (scheduler.completed, scheduler.failed) == (7, 1)
+    assert scheduler.runs_per_minute > 0
+    assert not scheduler.locked
+
+
+def test_scheduler_reserves_for_starved_items():
+    order = []
+    items = [WorkItem(0, {}, ['a']), WorkItem(1, {}, ['a', 'b'])]
+    items += [WorkItem(i, {}, ['b']) for i in range(2, 10)]
+
+    def task(item):
+        order.append(item.runid)
+        time.sleep(0.01)
+
+    ExperimentScheduler(task, workers=2, max_bypass=1).run(items)
+    assert order.index(1) < 4
+
+
+def test_scheduler_interrupt():
+    def task(item):
+        if item.runid == 0:
+            raise KeyboardInterrupt
+        return item.runid
+
+    scheduler = ExperimentScheduler(task, workers=1)
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.run([(i, {}, ['a']) for i in range(4)])
+    assert not scheduler.locked
+    assert isinstance(scheduler.results[0], KeyboardInterrupt)
+    assert (scheduler.completed, scheduler.failed) == (0, 1)
+
+
+def test_experiment_runall_parallel():
+    class Experiment(ExperimentAPI):
+        runs = 2
+        parameters = {'channel': [1, 6, 11]}
+
+        def coordinate(self, params, runid):
+            return params['channel']
+
+        def instruments_for(self, runid, params):
+            return [params['channel']]
+
+    scheduler = Experiment().runall(workers=3)
+    assert scheduler.results == {i: [1, 6, 11][i % 3] for i in range(6)}
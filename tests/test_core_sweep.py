@@ -0,0 +1,68 @@
+import itertools
+import pickle
+
+import pytest
+
+from snout.api.experiment import ExperimentAPI
+from snout.api.sweep import ParameterSweep
+
+PARAMETERS = {'channel': [1, 6, 11], 'power': [10, 20], 'mode': 'fast', 'rate': [1.0, 2.0, 5.5]}
+
+
+def test_sweep_indexing():
+    sweep = ParameterSweep(PARAMETERS)
+    grid = [
+        dict(zip(PARAMETERS, combination))
+        for combination in itertools.product([1, 6, 11], [10, 20], ['fast'], [1.0, 2.0, 5.5])
+    ]
+    assert len(sweep) == 18
+    assert list(sweep) == grid
+    assert [sweep[i] for i in range(len(sweep))] == grid
+    assert sweep[-1] == grid[-1]
+    assert list(sweep[3:7]) == grid[3:7]
+    assert all(sweep.index(params) == i for i, params in enumerate(grid))
+    assert {'channel': 2, 'power': 10, 'mode': 'fast', 'rate': 1.0} not in sweep
+    with pytest.raises(IndexError):
+        sweep[18]
+    assert list(ParameterSweep({})) == [{}]
+
+
+def test_sweep_large_is_lazy():
+    sweep = ParameterSweep({f'p{i}': list(range(10)) for i in range(30)})
+    assert sweep.size == 10**30
+    assert sweep[10**30 - 1] == {f'p{i}': 9 for i in range(30)}
+    samples = list(sweep.sample(5, seed=1))
+    assert len(samples) == 5 and all(params in sweep for params in samples)
+
+
+def test_sweep_sampling():
+    sweep = ParameterSweep(PARAMETERS)
+    assert len({sweep.index(p) for p in sweep.sample(100, seed=0)}) == 18
+    lhs = list(sweep.latin_hypercube(6, seed=0))
+    assert len(lhs) == 6
+    # every parameter value is drawn equally often
+    for name, values in [('channel', [1, 6, 11]), ('power', [10, 20])]:
+        counts = [sum(p[name] == v for p in lhs) for v in values]
+        assert counts == [6 // len(values)] * len(values)
+
+
+def test_sweep_chunks_and_shards():
+    sweep = ParameterSweep(PARAMETERS)
+    chunks = list(sweep.chunks(5))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 3]
+    assert [p for chunk in chunks for p in chunk] == list(sweep)
+    shards = [sweep.shard(k, 4) for k in range(4)]
+    assert [p for shard in shards for p in shard] == list(sweep)
+    assert list(pickle.loads(pickle.dumps(shards[1]))) == list(shards[1])
+
+
+def test_experiment_variations():
+    experiment = ExperimentAPI()
+    experiment.parameters = {'channel': [1, 6], 'power': [10, 20, 30]}
+    experiment.runs = 2
+    assert experiment.parameter_variations == 6
+    work = experiment.variations()
+    assert next(work) == (0, {'channel': 1, 'power': 10})
+    assert [runid for runid, _ in work] == list(range(1, 12))
+    shard = experiment.sweep.shard(1, 2)
+    assert list(experiment.variations(runs=1, sweep=shard))[0] == (0, {'channel': 6, 'power': 10})
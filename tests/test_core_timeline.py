@@ -0,0 +1,95 @@
+import pytest
+
+import snout.api.timeline
+from snout.api.agent import SnoutAgent, Status
+from snout.api.timeline import StatusTimeline
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(snout.api.timeline, 'numpy', None)
+    return request.param
+
+
+def cycle(timeline, n, t0=0.0):
+    for i in range(n):
+        timeline.append((t0 + 2 * i, Status.Idle, Status.Running))
+        timeline.append((t0 + 2 * i + 1, Status.Running, Status.Idle))
+
+
+def test_timeline_ring_buffer():
+    timeline = StatusTimeline(capacity=4, flag_type=Status)
+    cycle(timeline, 3)
+    assert len(timeline) == 4
+    assert timeline[0] == (2.0, Status.Idle, Status.Running)
+    assert timeline[-1] == (5.0, Status.Running, Status.Idle)
+    assert [t for t, _, _ in timeline[1:3]] == [3.0, 4.0]
+    with pytest.raises(IndexError):
+        timeline[4]
+
+
+def test_timeline_spill(tmp_path):
+    spill = str(tmp_path / 'status.spill')
+    timeline = StatusTimeline(capacity=4, spill=spill, flag_type=Status)
+    cycle(timeline, 5)
+    assert timeline.spilled + len(timeline) == 10
+    history = list(timeline.history())
+    assert [t for t, _, _ in history] == [float(i) for i in range(10)]
+    assert history[0] == (0.0, Status.Idle, Status.Running)
+
+
+def test_timeline_grows_on_demand():
+    timeline = StatusTimeline(capacity=4096)
+    assert len(timeline._t) == StatusTimeline.initial_size
+    cycle(timeline, 10)
+    assert len(timeline._t) == 32
+    assert [t for t, _, _ in timeline] == [float(i) for i in range(20)]
+    cycle(timeline, 2100, t0=20.0)
+    assert len(timeline) == len(timeline._t) == 4096
+    assert timeline[-1][0] == 4219.0
+
+
+def test_timeline_spill_analytics(tmp_path, backend):
+    spill = tmp_path / 'status.spill'
+    spill.write_bytes(b'stale' * 100)
+    timeline = StatusTimeline(capacity=4, spill=str(spill))
+    cycle(timeline, 4)
+    assert timeline.spilled == 4
+    assert spill.stat().st_size == 4 * snout.api.timeline.SPILL_RECORD.size
+    assert timeline.time_in_state(Status.Running, until=8.0) == 4.0
+    assert timeline.transition_counts(4.0) == [(0.0, 4), (4.0, 4)]
+
+
+def test_timeline_analytics(backend):
+    timeline = StatusTimeline(capacity=16)
+    cycle(timeline, 4)
+    assert timeline.time_in_state(Status.Running, until=8.0) == 4.0
+    assert timeline.time_in_state(Status.Idle, until=10.0) == 6.0
+    assert timeline.transition_counts(4.0) == [(0.0, 4), (4.0, 4)]
+    assert timeline.transition_counts(4.0, flag=Status.Running) == [(0.0, 2), (4.0, 2)]
+    assert StatusTimeline().transition_counts(1.0) == []
+
+
+def test_timeline_to_numpy():
+    pytest.importorskip('numpy')
+    timeline = StatusTimeline(capacity=3)
+    cycle(timeline, 2)
+    arrays = timeline.to_numpy()
+    assert arrays['t'].tolist() == [1.0, 2.0, 3.0]
+    assert arrays['new'].tolist() == [int(Status.Idle), int(Status.Running), int(Status.Idle)]
+
+
+class SmallAgent(SnoutAgent):
+    statuslog_capacity = 8
+
+
+def test_snoutagent_statuslog_bounded():
+    agent = SmallAgent()
+    for _ in range(agent.statuslog_capacity):
+        agent.status = Status.Running
+        agent.status = Status.Idle
+    assert len(agent.statuslog) == agent.statuslog_capacity
+    assert agent.statuslog[-1][2] == Status.Idle
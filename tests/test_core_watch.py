@@ -0,0 +1,132 @@
+import os
+import time
+
+import pytest
+
+from snout.api.cfg import Snoutfile, SnoutfileCache
+from snout.api.watch import IN_Q_OVERFLOW, INOTIFY_EVENT, Inotify, SnoutfileWatcher
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    monkeypatch.setattr(Snoutfile, 'cache', SnoutfileCache(str(tmp_path / 'cache')))
+    directory = tmp_path / 'snoutfiles'
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def events():
+    received = []
+    watcher = SnoutfileWatcher(paths=['unused'])
+    handlers = {
+        event: (lambda path, snoutfile, event=event: received.append((event, path)))
+        for event in ('snoutfile.added', 'snoutfile.changed', 'snoutfile.removed')
+    }
+    for event, handler in handlers.items():
+        watcher.registerEventHandler(event, handler)
+    yield received
+    for event, handler in handlers.items():
+        watcher.deregisterEventHandler(event, handler)
+
+
+def test_watcher_check(watched, events, snoutfile_text):
+    a = watched / 'a.snoutfile'
+    a.write_text(snoutfile_text)
+    (watched / 'ignored.txt').write_text('not a snoutfile')
+    watcher = SnoutfileWatcher(paths=[str(watched)], backend='poll')
+    assert watcher.check() == [('snoutfile.added', str(a))]
+    index = watcher.index
+    assert index[str(a)].data['meta']['name'] == 'Test'
+    assert watcher.check() == []
+
+    a.write_text(snoutfile_text.replace('Test\n', 'Changed\n'))
+    b = watched / 'b.snoutfile'
+    b.write_text('steps: [')
+    assert watcher.check() == [('snoutfile.changed', str(a))]
+    assert watcher.index[str(a)].data['meta']['name'] == 'Changed'
+    assert index[str(a)].data['meta']['name'] == 'Test'  # earlier snapshots are unchanged
+
+    # a file that becomes invalid is dropped until it is fixed
+    a.write_text('steps: [')
+    assert watcher.check() == [('snoutfile.removed', str(a))]
+    assert str(a) not in watcher.index
+    a.write_text(snoutfile_text)
+    assert watcher.check() == [('snoutfile.added', str(a))]
+
+    a.unlink()
+    assert watcher.check() == [('snoutfile.removed', str(a))]
+    assert dict(watcher.index) == {}
+    assert [event for event, _ in events] == [
+        'snoutfile.added',
+        'snoutfile.changed',
+        'snoutfile.removed',
+        'snoutfile.added',
+        'snoutfile.removed',
+    ]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def inotify_or_skip():
+    try:
+        return Inotify()
+    except OSError:
+        pytest.skip('inotify is not available')
+
+
+def test_inotify_overflow():
+    inotify = inotify_or_skip()
+    fd = inotify.fd
+    inotify.fd, write = os.pipe()
+    os.set_blocking(inotify.fd, False)
+    try:
+        os.write(write, INOTIFY_EVENT.pack(-1, IN_Q_OVERFLOW, 0, 0))
+        assert inotify.read(timeout=1) is None
+        assert inotify.read(timeout=0) == set()
+    finally:
+        os.close(write)
+        inotify.close()
+        os.close(fd)
+
+
+@pytest.mark.parametrize('backend', ['inotify', 'poll'])
+def test_watcher_missing_directory(tmp_path, backend, snoutfile_text):
+    if backend == 'inotify':
+        inotify_or_skip().close()
+    directory = tmp_path / 'later'
+    watcher = SnoutfileWatcher(paths=[str(directory)], backend=backend, interval=0.05).start()
+    try:
+        directory.mkdir()
+        path = directory / 'late.snoutfile'
+        path.write_text(snoutfile_text)
+        assert wait_for(lambda: str(path) in watcher.index)
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.parametrize('backend', ['inotify', 'poll'])
+def test_watcher_thread(watched, events, backend, snoutfile_text):
+    if backend == 'inotify':
+        inotify_or_skip().close()
+    watcher = SnoutfileWatcher(paths=[str(watched)], backend=backend, interval=0.05).start()
+    try:
+        path = watched / 'hot.snoutfile'
+        path.write_text(snoutfile_text)
+        assert wait_for(lambda: str(path) in watcher.index)
+        path.write_text(snoutfile_text.replace('Test\n', 'Reloaded\n'))
+        assert wait_for(lambda: watcher.index[str(path)].data['meta']['name'] == 'Reloaded')
+        path.unlink()
+        assert wait_for(lambda: str(path) not in watcher.index)
+    finally:
+        watcher.stop()
+    assert [event for event, _ in events] == [
+        'snoutfile.added',
+        'snoutfile.changed',
+        'snoutfile.removed',
+    ]
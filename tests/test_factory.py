@@ -35,3 +35,64 @@ def test_factory_instance():
     i = f.instance('fancy')
     f2 = i(MAIN)
     assert isinstance(f2, snout.api.factory.Factory)
+
+
+def test_factory_lazy_index(tmp_path, monkeypatch):
+    Factory = snout.api.factory.Factory
+    monkeypatch.setattr(Factory, '_index_path', str(tmp_path / 'plugins.msgpack'))
+    monkeypatch.setattr(Factory, '_plugins', {})
+    plugins = Factory.entry_points()
+    assert plugins['apitest_fancy'].value == 'snout.api.factory:Factory'
+    assert plugins['apitest_fancy']._loaded is None
+    assert (tmp_path / 'plugins.msgpack').exists()
+
+    # later lookups are served from the index without scanning
+    def no_scan():
+        raise AssertionError('entry points were scanned')
+
+    monkeypatch.setattr(Factory, '_plugins', {})
+    monkeypatch.setattr(Factory, '_scan', staticmethod(no_scan))
+    assert Factory(MAIN).instance(VARIANT) is Factory
+    assert Factory.entry_points()['apitest_fancy']._loaded is Factory
+    assert Factory.entry_points()['apitest_']._loaded is None
+    assert Factory.plugins()['apitest_'] is Factory
+
+
+def test_factory_plugins_resolve_on_access():
+    plugins = snout.api.factory.Factory.plugins()
+    assert isinstance(plugins.ref('apitest_fancy'), snout.api.factory.EntryPointRef)
+    assert plugins['apitest_fancy'] is snout.api.factory.Factory
+    assert dict(plugins.items())['apitest_fancy'] is snout.api.factory.Factory
+    assert plugins.get('missing_plugin') is None
+
+
+def test_factory_index(monkeypatch):
+    Factory = snout.api.factory.Factory
+    plugins = dict(Factory.entry_points())
+    plugins['apitest_extra_underscores'] = snout.api.factory.EntryPointRef(
+        'apitest_extra_underscores', 'snout.api.factory:Factory'
+    )
+    plugins['nounderscore'] = snout.api.factory.EntryPointRef('nounderscore', 'x:y')
+    monkeypatch.setattr(Factory, '_plugins', plugins)
+    index = Factory.index()
+    assert (MAIN, 'extra_underscores') in index
+    assert ('nounderscore', '') not in index
+    assert Factory(MAIN).instance('extra_underscores') is Factory
+    assert Factory.resolve_many([(MAIN, None), (MAIN, VARIANT), (MAIN, 'missing')]) == [
+        Factory,
+        Factory,
+        None,
+    ]
+    assert 'extra_underscores' in Factory(MAIN).ls(ret=True)
+
+
+def test_agent_factory_many():
+    from snout.api.agent import SnoutAgent
+
+    class ApiTestAgent(SnoutAgent):
+        __base_agent__ = MAIN
+
+    made = ApiTestAgent.factory_many(['', VARIANT, ('missing', {})], MAIN)
+    assert isinstance(made[0], snout.api.factory.Factory)
+    assert made[1].main == MAIN
+    assert made[2] is None
@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = [
+    'arrow',
+    'asyncio',
+    'click',
+    'concurrent.futures',
+    'http.server',
+    'importlib.metadata',
+    'logging.handlers',
+    'numpy',
+    'strictyaml',
+    'tabulate',
+    'umsgpack',
+    'zmq',
+]
+
+# cumulative import time budgets in microseconds (the best of three runs), scaled
+# by SNOUT_IMPORT_BUDGET_SCALE on slow machines; wall-clock budgets are only
+# checked when SNOUT_BENCHMARKS is set
+IMPORT_BUDGETS = {
+    'snout.api.status': 15000,
+    'snout.api.error': 15000,
+    'snout.api.agent': 80000,
+    'snout.api.cfg': 90000,
+    'snout.api.factory': 60000,
+}
+
+
+def run(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+
+def importtime(module):
+    """Cumulative import time of ``module`` in microseconds, from ``python -X importtime``."""
+    for line in reversed(run('-X', 'importtime', '-c', f'import {module}').stderr.splitlines()):
+        _, _, cumulative, name = (part.strip() for part in line.replace(':', '|', 1).split('|'))
+        if name == module:
+            return int(cumulative)
+    raise AssertionError(f'{module} not found in the import time report')
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS))
+def test_heavy_modules_are_lazy(module):
+    code = f'import json, sys, {module}; print(json.dumps(sorted(sys.modules)))'
+    loaded = set(json.loads(run('-c', code).stdout))
+    assert [heavy for heavy in HEAVY_MODULES if heavy in loaded] == []
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(
+    not os.environ.get('SNOUT_BENCHMARKS'), reason='set SNOUT_BENCHMARKS=1 to check timings'
+)
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS))
+def test_import_time_budget(module):
+    budget = IMPORT_BUDGETS[module] * float(os.environ.get('SNOUT_IMPORT_BUDGET_SCALE', 1))
+    assert min(importtime(module) for _ in range(3)) <= budget
+
+
+def test_lazy_attributes():
+    code = 'import sys, snout.api; snout.api.Status; print("snout.api.agent" in sys.modules)'
+    assert run('-c', code).stdout.strip() == 'False'
+    import snout.api
+    from snout.api.agent import SnoutAgent
+
+    assert snout.api.SnoutAgent is SnoutAgent
+    with pytest.raises(AttributeError):
+        snout.api.NoSuchThing